@@ -0,0 +1,277 @@
+"""Binary traces of the operations a program performs on a MemoryManager.
+
+A trace is a 16-byte header followed by fixed-width records. Every
+allocation is one ALLOC record followed by one ALLOC_REF record per
+reference the new object starts with. Traces are only ever appended to, and
+replay memory-maps them, so replaying costs no more than reading the records.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from collectors import CollectionResult
+from object_store import FLAG_REACHABLE, FLAG_ROOT
+
+MAGIC = b'GCTRACE1'
+HEADER_SIZE = 16
+
+# Record kinds. a and b hold:
+ALLOC = 1         # object id, size; flags holds the object's flags
+ALLOC_REF = 2     # source id, target id of a reference the object starts with
+ADD_REF = 3       # source id, target id
+REMOVE_REF = 4    # source id, target id
+ADD_ROOT = 5      # object id
+REMOVE_ROOT = 6   # object id
+COLLECT = 7
+START = 8         # start of a collection advanced by STEP records
+STEP = 9          # budget in nanoseconds
+
+RECORD = np.dtype({'names': ['op', 'flags', 'a', 'b'],
+                   'formats': ['u1', 'u1', '<i8', '<i8'],
+                   'offsets': [0, 1, 8, 16],
+                   'itemsize': 24})
+
+
+class TraceWriter:
+    """Appends records to a trace file through an in-memory buffer"""
+
+    def __init__(self, path: str, total_memory: int, buffer_records: int = 65536):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + np.int64(total_memory).tobytes())
+        self._buffer = np.zeros(buffer_records, dtype=RECORD)
+        self._used = 0
+        self.records = 0
+
+    def event(self, op: int, a: int = 0, b: int = 0):
+        if self._used == len(self._buffer):
+            self.flush()
+        record = self._buffer[self._used]
+        record['op'], record['a'], record['b'] = op, a, b
+        self._used += 1
+        self.records += 1
+
+    def allocations(self, obj_ids: np.ndarray, sizes: np.ndarray, flags: np.ndarray,
+                    ref_counts: np.ndarray, ref_targets: np.ndarray):
+        """Record a batch of allocations, each followed by its references"""
+        n = len(obj_ids)
+        records = np.zeros(n + len(ref_targets), dtype=RECORD)
+        # Each ALLOC record comes after the references of the objects before it
+        alloc_at = np.arange(n) + np.cumsum(ref_counts) - ref_counts
+        is_ref = np.ones(len(records), dtype=bool)
+        is_ref[alloc_at] = False
+        records['op'][alloc_at] = ALLOC
+        records['flags'][alloc_at] = flags
+        records['a'][alloc_at] = obj_ids
+        records['b'][alloc_at] = sizes
+        records['op'][is_ref] = ALLOC_REF
+        records['a'][is_ref] = np.repeat(obj_ids, ref_counts)
+        records['b'][is_ref] = ref_targets
+        self.append(records)
+
+    def append(self, records: np.ndarray):
+        if self._used + len(records) > len(self._buffer):
+            self.flush()
+        if len(records) > len(self._buffer):
+            self._file.write(records.tobytes())
+        else:
+            self._buffer[self._used:self._used + len(records)] = records
+            self._used += len(records)
+        self.records += len(records)
+
+    def flush(self):
+        self._file.write(self._buffer[:self._used].tobytes())
+        self._used = 0
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class TraceReader:
+    """Memory-mapped view of a trace file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as trace:
+            header = trace.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an allocation trace")
+        self.path = path
+        self.total_memory = int(np.frombuffer(header, dtype='<i8', offset=len(MAGIC))[0])
+        self.records = np.memmap(path, dtype=RECORD, mode='r', offset=HEADER_SIZE)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+@dataclass
+class ReplayResult:
+    # Records replayed; short of the trace's length if it was exhausted
+    records: int = 0
+    seconds: float = 0.0
+    # True if an allocation did not fit even after a collection, which ends
+    # the replay early
+    exhausted: bool = False
+    # Records naming objects the replaying heap had already freed, which
+    # happens when the recorded program touched garbage its collector had
+    # not freed yet
+    skipped: int = 0
+    collections: List[CollectionResult] = field(default_factory=list)
+
+
+def replay(trace: TraceReader, manager, chunk_records: int = 1 << 20,
+           progress: Optional[Callable[[int], None]] = None) -> ReplayResult:
+    """Feed a trace to a manager, which may use any collector and allocation
+    policy and should be fresh.
+
+    Runs of allocation records are replayed as allocate_with_references
+    batches. When a batch does not fit the manager collects and retries, so
+    a smaller or more fragmented heap than the recorded one still replays.
+    progress, if given, is called with the records replayed so far after
+    every chunk.
+    """
+    result = ReplayResult()
+    start = time.perf_counter()
+    records = trace.records
+    while result.records < len(records):
+        # A chunk never ends inside the references of an allocation
+        end = min(result.records + chunk_records, len(records))
+        while end < len(records) and records['op'][end] == ALLOC_REF:
+            end += 1
+        # Records up to the allocation that did not fit count as replayed
+        result.records += _replay_chunk(np.asarray(records[result.records:end]), manager, result)
+        if result.records < end:
+            result.exhausted = True
+            break
+        if progress is not None:
+            progress(end)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _replay_chunk(chunk: np.ndarray, manager, result: ReplayResult) -> int:
+    # Returns how many of the chunk's records were replayed
+    ops = chunk['op']
+    is_allocation = (ops == ALLOC) | (ops == ALLOC_REF)
+    # Boundaries between runs of allocation records and single other records
+    boundaries = np.flatnonzero(np.diff(is_allocation.astype(np.int8)) != 0) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(chunk)]])
+    for run_start, run_end in zip(starts.tolist(), ends.tolist()):
+        if is_allocation[run_start]:
+            replayed = _replay_allocations(chunk[run_start:run_end], manager, result)
+            if replayed < run_end - run_start:
+                return run_start + replayed
+            continue
+        for op, a, b in zip(ops[run_start:run_end].tolist(), chunk['a'][run_start:run_end].tolist(),
+                            chunk['b'][run_start:run_end].tolist()):
+            if op == COLLECT:
+                result.collections.append(manager.run_garbage_collection())
+            elif op == START:
+                manager.start_collection()
+            elif op == STEP:
+                if not manager.is_done() and manager.step(a / 1e6):
+                    result.collections.append(manager.last_collection)
+            elif op == ADD_REF:
+                result.skipped += not _apply(manager.add_reference, a, b)
+            elif op == REMOVE_REF:
+                result.skipped += not _apply(manager.remove_reference, a, b)
+            elif op == ADD_ROOT:
+                result.skipped += not _apply(manager.add_root, a)
+            elif op == REMOVE_ROOT:
+                manager.remove_root(a)
+            else:
+                raise ValueError(f"Unknown trace record kind {op}")
+    return len(chunk)
+
+
+def _apply(operation, *ids) -> bool:
+    # Run a manager operation, returning False if it named a freed object
+    try:
+        operation(*ids)
+    except KeyError:
+        return False
+    return True
+
+
+def _replay_allocations(run: np.ndarray, manager, result: ReplayResult) -> int:
+    # Returns how many of the run's records were replayed: all of them, or
+    # those before the first allocation that did not fit
+    is_alloc = run['op'] == ALLOC
+    allocs = run[is_alloc]
+    owners = np.cumsum(is_alloc)[~is_alloc] - 1
+    ref_counts = np.bincount(owners, minlength=len(allocs))
+    ref_targets = run['b'][~is_alloc]
+    ref_ends = np.cumsum(ref_counts)
+    # Objects rooted for the replay's own sake, see below
+    pinned: List[int] = []
+    done = 0
+    while done < len(allocs):
+        # Ids are handed out in order, so the manager continues from the
+        # recorded id
+        manager.next_id = int(allocs['a'][done])
+        first_ref = int(ref_ends[done - 1]) if done else 0
+        allocated = len(manager.allocate_with_references(
+            allocs['b'][done:], ref_counts[done:], ref_targets[first_ref:],
+            (allocs['flags'][done:] & FLAG_ROOT) != 0,
+            (allocs['flags'][done:] & FLAG_REACHABLE) != 0))
+        done += allocated
+        if done < len(allocs):
+            # The recorded program still held the objects the rest of the run
+            # references, so they must survive the collection the replay adds
+            first_ref = int(ref_ends[done - 1]) if done else 0
+            held = np.unique(ref_targets[first_ref:])
+            held = held[(held >= allocs['a'][0]) & (held < manager.next_id)]
+            slots = manager.store.slots_of(held)
+            held = held[slots >= 0]
+            held = held[(manager.store.column('flags')[slots[slots >= 0]] & FLAG_ROOT) == 0]
+            for obj_id in held.tolist():
+                manager.add_root(obj_id)
+            pinned.extend(held.tolist())
+            collection = manager.run_garbage_collection()
+            result.collections.append(collection)
+            if not allocated and collection.kind == 'full' and not collection.objects_freed:
+                return int(np.flatnonzero(is_alloc)[done])
+    for obj_id in pinned:
+        manager.remove_root(obj_id)
+    return len(run)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from allocators import ALLOCATORS
+    from collectors import COLLECTORS
+    from memory_manager import MemoryManager
+
+    parser = argparse.ArgumentParser(description="Replay an allocation trace against "
+                                                 "collectors and allocation policies")
+    parser.add_argument('trace')
+    parser.add_argument('--collectors', nargs='+', choices=sorted(COLLECTORS), default=['mark_sweep'])
+    parser.add_argument('--policies', nargs='+', choices=sorted(ALLOCATORS), default=['first_fit'])
+    parser.add_argument('--heap-size', type=int, help="defaults to the recorded heap size")
+    args = parser.parse_args()
+
+    trace = TraceReader(args.trace)
+    heap_size = args.heap_size or trace.total_memory
+    print(f"{len(trace)} records, heap {heap_size}")
+    for collector in args.collectors:
+        for policy in args.policies:
+            try:
+                manager = MemoryManager(heap_size, allocation_policy=policy, collector=collector)
+            except ValueError as error:
+                print(f"{collector:<15}{policy:<16}skipped: {error}")
+                continue
+            result = replay(trace, manager)
+            pauses = [pause for collection in result.collections
+                      for pause in collection.pause_times()]
+            print(f"{collector:<15}{policy:<16}{result.seconds:8.3f} s  "
+                  f"{result.records / result.seconds / 1e6:6.2f} Mrec/s  "
+                  f"{len(result.collections):5} GCs  "
+                  f"max pause {max(pauses, default=0) / 1e6:8.2f} ms  "
+                  f"{manager.store.count:9} live"
+                  f"{'  exhausted' if result.exhausted else ''}")
@@ -0,0 +1,941 @@
+import heapq
+import random
+from operator import attrgetter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class Allocator:
+    """Hands out address ranges inside an arena of total_memory units"""
+
+    name = ''
+
+    def __init__(self, total_memory: int):
+        self.total_memory = total_memory
+        self.free_bytes = total_memory
+        # Memory handed out beyond what was requested (rounding waste)
+        self.internal_waste = 0
+
+    def allocate(self, size: int) -> int:
+        """Return the address of a new block, or -1 if there is no room"""
+        raise NotImplementedError
+
+    def free(self, address: int, size: int):
+        raise NotImplementedError
+
+    def largest_free_block(self) -> int:
+        raise NotImplementedError
+
+    def reset(self, addresses: np.ndarray, sizes: np.ndarray):
+        """Rebuild the free space so that exactly the given blocks are in use"""
+        raise NotImplementedError
+
+    def allocate_many(self, sizes: np.ndarray) -> np.ndarray:
+        """Allocate sizes in order until one does not fit and return their addresses"""
+        addresses = []
+        for size in sizes.tolist():
+            address = self.allocate(size)
+            if address < 0:
+                break
+            addresses.append(address)
+        return np.asarray(addresses, dtype=np.int64)
+
+    def free_many(self, addresses: np.ndarray, sizes: np.ndarray):
+        for address, size in zip(addresses.tolist(), sizes.tolist()):
+            self.free(address, size)
+
+
+class SemispaceAllocator(Allocator):
+    """Bump allocation inside one half of the arena; the other half is the
+    to-space that a copying collector evacuates survivors into"""
+
+    name = 'semispace'
+
+    def __init__(self, total_memory: int):
+        super().__init__(total_memory)
+        self.semispace_size = total_memory // 2
+        self.from_space = 0
+        self.top = 0
+        self.free_bytes = self.semispace_size
+
+    @property
+    def to_space(self) -> int:
+        return self.semispace_size - self.from_space
+
+    def allocate(self, size: int) -> int:
+        if size > self.free_bytes:
+            return -1
+        address = self.top
+        self.top += size
+        self.free_bytes -= size
+        return address
+
+    def allocate_many(self, sizes: np.ndarray) -> np.ndarray:
+        ends = np.cumsum(sizes)
+        fits = int(np.searchsorted(ends, self.free_bytes, side='right'))
+        addresses = self.top + ends[:fits] - sizes[:fits]
+        allocated = int(ends[fits - 1]) if fits else 0
+        self.top += allocated
+        self.free_bytes -= allocated
+        return addresses
+
+    def free(self, address: int, size: int):
+        # Space is only reclaimed wholesale when the semispaces flip
+        pass
+
+    def largest_free_block(self) -> int:
+        return self.free_bytes
+
+    def reset(self, addresses: np.ndarray, sizes: np.ndarray):
+        # Blocks are only freed by a flip, so the top is the end of the highest
+        # block, and every block lies in the same semispace
+        if len(addresses):
+            self.from_space = 0 if addresses.max() < self.semispace_size else self.semispace_size
+            self.top = int((addresses + sizes).max())
+        else:
+            self.top = self.from_space
+        self.free_bytes = self.semispace_size - (self.top - self.from_space)
+
+    def flip(self, live_bytes: int):
+        """Make the to-space, now holding live_bytes of survivors, the allocation space"""
+        self.from_space = self.to_space
+        self.top = self.from_space + live_bytes
+        self.free_bytes = self.semispace_size - live_bytes
+
+
+class _Node:
+    __slots__ = ('address', 'size', 'priority', 'left', 'right', 'max_size')
+
+    def __init__(self, address: int, size: int, priority: float):
+        self.address = address
+        self.size = size
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_size = size
+
+
+class AddressTree:
+    """Treap of free blocks keyed by address, augmented with the largest
+    block size in each subtree so fit queries are O(log n)"""
+
+    def __init__(self):
+        self.root = None
+        # A private generator keeps tree shapes reproducible between runs
+        self._priorities = random.Random(0)
+
+    def insert(self, address: int, size: int):
+        node = _Node(address, size, self._priorities.random())
+        # Walk down to where the new node's priority puts it; the ancestors'
+        # largest block can only grow
+        parent = None
+        current = self.root
+        while current is not None and current.priority > node.priority:
+            if size > current.max_size:
+                current.max_size = size
+            parent = current
+            current = current.left if address < current.address else current.right
+        node.left, node.right = self._split(current, address)
+        self._update(node)
+        self._attach(parent, node)
+
+    def build(self, addresses: List[int], sizes: List[int]):
+        """Replace the tree with blocks given in ascending address order, in O(n)"""
+        nodes = []
+        spine = []
+        for address, size in zip(addresses, sizes):
+            node = _Node(address, size, self._priorities.random())
+            nodes.append(node)
+            # Cartesian tree construction along the right spine
+            popped = None
+            while spine and spine[-1].priority < node.priority:
+                popped = spine.pop()
+            node.left = popped
+            if spine:
+                spine[-1].right = node
+            spine.append(node)
+        # Children always have lower priority than their parent
+        for node in sorted(nodes, key=attrgetter('priority')):
+            self._update(node)
+        self.root = spine[0] if spine else None
+
+    def remove(self, address: int):
+        path = []
+        current = self.root
+        while current.address != address:
+            path.append(current)
+            current = current.left if address < current.address else current.right
+        self._attach(path[-1] if path else None, self._merge(current.left, current.right),
+                     address)
+        # Refresh the ancestors' largest block until one is unaffected
+        for ancestor in reversed(path):
+            previous = ancestor.max_size
+            self._update(ancestor)
+            if ancestor.max_size == previous:
+                break
+
+    def _attach(self, parent, node, address: Optional[int] = None):
+        # Hang node (which may be None) below parent on the side address falls on
+        if address is None:
+            address = node.address
+        if parent is None:
+            self.root = node
+        elif address < parent.address:
+            parent.left = node
+        else:
+            parent.right = node
+
+    def find(self, size: int, lowest_address: int = 0) -> Optional[int]:
+        """Lowest address at or above lowest_address of a block of at least size"""
+        return self._find(self.root, size, lowest_address)
+
+    def max_size(self) -> int:
+        return self.root.max_size if self.root else 0
+
+    def _find(self, node, size, lowest_address):
+        while node is not None and node.max_size >= size:
+            if node.address < lowest_address:
+                node = node.right
+                continue
+            found = self._find(node.left, size, lowest_address)
+            if found is not None:
+                return found
+            if node.size >= size:
+                return node.address
+            node = node.right
+        return None
+
+    @staticmethod
+    def _update(node):
+        node.max_size = node.size
+        if node.left is not None and node.left.max_size > node.max_size:
+            node.max_size = node.left.max_size
+        if node.right is not None and node.right.max_size > node.max_size:
+            node.max_size = node.right.max_size
+
+    def _split(self, node, address):
+        # Returns (nodes below address, nodes at or above address)
+        if node is None:
+            return None, None
+        if node.address < address:
+            left, right = self._split(node.right, address)
+            node.right = left
+            self._update(node)
+            return node, right
+        left, right = self._split(node.left, address)
+        node.left = right
+        self._update(node)
+        return left, node
+
+    def _merge(self, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            self._update(left)
+            return left
+        right.left = self._merge(left, right.left)
+        self._update(right)
+        return right
+
+
+def _runs(starts: np.ndarray, lengths: np.ndarray):
+    # Start and end of each run of blocks that touch, in address order
+    if not len(starts):
+        return starts, starts
+    order = np.argsort(starts, kind='stable')
+    starts = starts[order]
+    ends = starts + lengths[order]
+    run_begins = np.ones(len(starts), dtype=bool)
+    run_begins[1:] = starts[1:] != ends[:-1]
+    run_ends = np.append(run_begins[1:], True)
+    return starts[run_begins], ends[run_ends]
+
+
+class FreeListAllocator(Allocator):
+    """Free-list allocator with immediate coalescing of neighbouring holes.
+
+    Subclasses decide how holes are indexed and which hole a request takes.
+    """
+
+    def __init__(self, total_memory: int):
+        super().__init__(total_memory)
+        self.free_bytes = 0
+        self._by_start: Dict[int, int] = {}
+        self._by_end: Dict[int, int] = {}
+        if total_memory > 0:
+            self._put(0, total_memory)
+
+    def allocate(self, size: int) -> int:
+        address = self._find(size)
+        if address is None:
+            return -1
+        block = self._by_start[address]
+        self._take(address, block)
+        if block > size:
+            self._put(address + size, block - size)
+        return address
+
+    def allocate_many(self, sizes: np.ndarray) -> np.ndarray:
+        # Carve the whole batch out of one hole when the policy can find one
+        total = int(sizes.sum())
+        if total > 0 and len(sizes) > 1:
+            address = self.allocate(total)
+            if address >= 0:
+                return address + np.cumsum(sizes) - sizes
+        return super().allocate_many(sizes)
+
+    def free(self, address: int, size: int):
+        start, end = address, address + size
+        previous = self._by_end.get(start)
+        if previous is not None:
+            self._take(previous, start - previous)
+            start = previous
+        following = self._by_start.get(end)
+        if following is not None:
+            self._take(end, following)
+            end += following
+        self._put(start, end - start)
+
+    def free_many(self, addresses: np.ndarray, sizes: np.ndarray):
+        if len(addresses) < max(64, self.holes() // 8):
+            # Blocks that touch are freed as one, so they are not coalesced
+            # one by one
+            starts, ends = _runs(addresses, sizes)
+            super().free_many(starts, ends - starts)
+            return
+        # Large sweeps merge the freed blocks with the existing holes in one
+        # sorted pass and rebuild the index, instead of coalescing one by one
+        starts = np.concatenate([np.fromiter(self._by_start.keys(), dtype=np.int64, count=self.holes()),
+                                 addresses])
+        lengths = np.concatenate([np.fromiter(self._by_start.values(), dtype=np.int64, count=self.holes()),
+                                  sizes])
+        starts, ends = _runs(starts, lengths)
+        self._rebuild(starts.tolist(), ends.tolist())
+
+    def reset(self, addresses: np.ndarray, sizes: np.ndarray):
+        """Rebuild the free list so that exactly the given blocks are in use"""
+        order = np.argsort(addresses, kind='stable')
+        starts = addresses[order]
+        ends = starts + sizes[order]
+        hole_starts = np.concatenate([[0], ends])
+        hole_ends = np.concatenate([starts, [self.total_memory]])
+        keep = hole_ends > hole_starts
+        self._rebuild(hole_starts[keep].tolist(), hole_ends[keep].tolist())
+
+    def holes(self) -> int:
+        return len(self._by_start)
+
+    def _rebuild(self, starts: List[int], ends: List[int]):
+        sizes = [end - start for start, end in zip(starts, ends)]
+        self._by_start = dict(zip(starts, sizes))
+        self._by_end = dict(zip(ends, starts))
+        self.free_bytes = sum(sizes)
+        self._reset_index(starts, sizes)
+
+    def _reset_index(self, starts: List[int], sizes: List[int]):
+        raise NotImplementedError
+
+    def _put(self, address: int, size: int):
+        self._by_start[address] = size
+        self._by_end[address + size] = address
+        self.free_bytes += size
+        self._insert(address, size)
+
+    def _take(self, address: int, size: int):
+        del self._by_start[address]
+        del self._by_end[address + size]
+        self.free_bytes -= size
+        self._remove(address, size)
+
+    def _insert(self, address: int, size: int):
+        raise NotImplementedError
+
+    def _remove(self, address: int, size: int):
+        raise NotImplementedError
+
+    def _find(self, size: int) -> Optional[int]:
+        raise NotImplementedError
+
+
+class FirstFitAllocator(FreeListAllocator):
+    name = 'first_fit'
+
+    def __init__(self, total_memory: int):
+        self._tree = AddressTree()
+        super().__init__(total_memory)
+
+    def largest_free_block(self) -> int:
+        return self._tree.max_size()
+
+    def _insert(self, address: int, size: int):
+        self._tree.insert(address, size)
+
+    def _remove(self, address: int, size: int):
+        self._tree.remove(address)
+
+    def _reset_index(self, starts: List[int], sizes: List[int]):
+        self._tree.build(starts, sizes)
+
+    def _find(self, size: int) -> Optional[int]:
+        return self._tree.find(size)
+
+
+class NextFitAllocator(FirstFitAllocator):
+    name = 'next_fit'
+
+    def __init__(self, total_memory: int):
+        self._cursor = 0
+        super().__init__(total_memory)
+
+    def allocate(self, size: int) -> int:
+        address = super().allocate(size)
+        if address >= 0:
+            self._cursor = address + size
+        return address
+
+    def _find(self, size: int) -> Optional[int]:
+        # Resume after the previous allocation, wrapping around once
+        address = self._tree.find(size, self._cursor)
+        if address is None:
+            address = self._tree.find(size)
+        return address
+
+
+class BestFitAllocator(FreeListAllocator):
+    name = 'best_fit'
+
+    def __init__(self, total_memory: int):
+        # Distinct hole sizes in a treap, each stored as both key and size so
+        # the smallest fitting size is a successor query; each size keeps its
+        # holes in insertion order
+        self._sizes = AddressTree()
+        self._holes: Dict[int, Dict[int, None]] = {}
+        super().__init__(total_memory)
+
+    def largest_free_block(self) -> int:
+        return self._sizes.max_size()
+
+    def _insert(self, address: int, size: int):
+        holes = self._holes.get(size)
+        if holes is None:
+            holes = self._holes[size] = {}
+            self._sizes.insert(size, size)
+        holes[address] = None
+
+    def _remove(self, address: int, size: int):
+        holes = self._holes[size]
+        del holes[address]
+        if not holes:
+            del self._holes[size]
+            self._sizes.remove(size)
+
+    def _reset_index(self, starts: List[int], sizes: List[int]):
+        self._holes = {}
+        for address, size in zip(starts, sizes):
+            self._holes.setdefault(size, {})[address] = None
+        distinct = sorted(self._holes)
+        self._sizes.build(distinct, distinct)
+
+    def _find(self, size: int) -> Optional[int]:
+        best = self._sizes.find(1, size)
+        if best is None:
+            return None
+        return next(iter(self._holes[best]))
+
+
+class SegregatedFitAllocator(FreeListAllocator):
+    """Holes are kept in power-of-two size classes; class k holds holes of
+    size [2**k, 2**(k+1)), each in its own address-ordered tree"""
+
+    name = 'segregated_fit'
+
+    def __init__(self, total_memory: int):
+        self._classes: List[AddressTree] = [AddressTree() for _ in range(max(total_memory, 1).bit_length())]
+        # Bit k is set while class k has at least one hole
+        self._nonempty = 0
+        super().__init__(total_memory)
+
+    def largest_free_block(self) -> int:
+        if not self._nonempty:
+            return 0
+        return self._classes[self._nonempty.bit_length() - 1].max_size()
+
+    def _insert(self, address: int, size: int):
+        size_class = size.bit_length() - 1
+        self._classes[size_class].insert(address, size)
+        self._nonempty |= 1 << size_class
+
+    def _remove(self, address: int, size: int):
+        size_class = size.bit_length() - 1
+        holes = self._classes[size_class]
+        holes.remove(address)
+        if holes.root is None:
+            self._nonempty &= ~(1 << size_class)
+
+    def _reset_index(self, starts: List[int], sizes: List[int]):
+        # Holes arrive in address order, so each class can be built in O(n)
+        addresses: List[List[int]] = [[] for _ in self._classes]
+        lengths: List[List[int]] = [[] for _ in self._classes]
+        for address, size in zip(starts, sizes):
+            size_class = size.bit_length() - 1
+            addresses[size_class].append(address)
+            lengths[size_class].append(size)
+        self._nonempty = 0
+        for size_class, holes in enumerate(self._classes):
+            holes.build(addresses[size_class], lengths[size_class])
+            if holes.root is not None:
+                self._nonempty |= 1 << size_class
+
+    def _find(self, size: int) -> Optional[int]:
+        size_class = size.bit_length() - 1
+        # No hole is larger than the heap, whose size sets the last class
+        if size <= 0 or size_class >= len(self._classes):
+            return None
+        # Any hole in a larger class fits, so take the smallest such class
+        larger = self._nonempty >> (size_class + 1)
+        if larger:
+            bigger_class = size_class + (larger & -larger).bit_length()
+            return self._classes[bigger_class].find(1)
+        return self._classes[size_class].find(size)
+
+
+class BuddyAllocator(Allocator):
+    """Binary buddy allocator.
+
+    Every block is a power-of-two number of min_block granules aligned to its
+    own size. Each order keeps the set of its free blocks' indices and a heap
+    of them for finding the lowest, so splitting on allocate and coalescing
+    on free both take O(log n) steps, and memory follows the number of free
+    blocks rather than the heap's size.
+    """
+
+    name = 'buddy'
+
+    def __init__(self, total_memory: int, min_block: int = 1):
+        super().__init__(total_memory)
+        self.min_block = min_block
+        granules = total_memory // min_block
+        self.max_order = max(granules.bit_length() - 1, 0)
+        self._free_all()
+
+    def _free_all(self):
+        granules = self.total_memory // self.min_block
+        self._free: List[set] = [set() for _ in range(self.max_order + 1)]
+        # Min-heaps of each order's free indices. Blocks taken by coalescing
+        # stay in them until they surface, so a heap may hold indices that
+        # are no longer free, or the same one twice.
+        self._lowest: List[List[int]] = [[] for _ in range(self.max_order + 1)]
+        self.free_bytes = 0
+        self.internal_waste = 0
+
+        # Carve the arena into the largest aligned power-of-two blocks
+        granule = 0
+        for order in range(self.max_order, -1, -1):
+            if granules & (1 << order):
+                self._set_free(order, granule >> order)
+                self.free_bytes += (1 << order) * self.min_block
+                granule += 1 << order
+
+    def reset(self, addresses: np.ndarray, sizes: np.ndarray):
+        self._free_all()
+        for address, size in zip(addresses.tolist(), sizes.tolist()):
+            self._claim(address, size)
+
+    def order_for(self, size: int) -> int:
+        granules = -(-size // self.min_block)
+        return max(granules - 1, 0).bit_length()
+
+    def block_size(self, size: int) -> int:
+        return (1 << self.order_for(size)) * self.min_block
+
+    def allocate(self, size: int) -> int:
+        order = self.order_for(size)
+        available = order
+        while available <= self.max_order and not self._free[available]:
+            available += 1
+        if available > self.max_order:
+            return -1
+
+        # The lowest free block, for the same address order a bitmap scan gives
+        free, lowest = self._free[available], self._lowest[available]
+        while lowest[0] not in free:
+            heapq.heappop(lowest)
+        index = heapq.heappop(lowest)
+        free.discard(index)
+        # Split down to the requested order, keeping the upper halves free
+        while available > order:
+            available -= 1
+            index *= 2
+            self._set_free(available, index + 1)
+
+        block = (1 << order) * self.min_block
+        self.free_bytes -= block
+        self.internal_waste += block - size
+        return (index << order) * self.min_block
+
+    def free(self, address: int, size: int):
+        order = self.order_for(size)
+        block = (1 << order) * self.min_block
+        self.free_bytes += block
+        self.internal_waste -= block - size
+
+        index = (address // self.min_block) >> order
+        # Coalesce with the buddy for as long as it is free too
+        while order < self.max_order and index ^ 1 in self._free[order]:
+            self._clear_free(order, index ^ 1)
+            index >>= 1
+            order += 1
+        self._set_free(order, index)
+
+    def largest_free_block(self) -> int:
+        for order in range(self.max_order, -1, -1):
+            if self._free[order]:
+                return (1 << order) * self.min_block
+        return 0
+
+    def _claim(self, address: int, size: int):
+        # Allocate the block of size at address, splitting the free block
+        # that contains it
+        order = self.order_for(size)
+        index = (address // self.min_block) >> order
+        containing = order
+        while index >> (containing - order) not in self._free[containing]:
+            containing += 1
+        self._clear_free(containing, index >> (containing - order))
+        while containing > order:
+            containing -= 1
+            # Keep free the half that does not hold the block
+            self._set_free(containing, (index >> (containing - order)) ^ 1)
+
+        block = (1 << order) * self.min_block
+        self.free_bytes -= block
+        self.internal_waste += block - size
+
+    def _set_free(self, order: int, index: int):
+        self._free[order].add(index)
+        lowest = self._lowest[order]
+        heapq.heappush(lowest, index)
+        # Rebuild a heap that is mostly indices no longer free
+        if len(lowest) > 2 * len(self._free[order]) + 64:
+            lowest[:] = self._free[order]
+            heapq.heapify(lowest)
+
+    def _clear_free(self, order: int, index: int):
+        self._free[order].discard(index)
+
+
+class GenerationalAllocator(Allocator):
+    """Bump-allocated nursery at the bottom of the arena, with the old
+    generation above it managed by one of the regular allocation policies"""
+
+    name = 'generational'
+
+    def __init__(self, total_memory: int, nursery_size: int, old_policy: str):
+        super().__init__(total_memory)
+        self.nursery_size = nursery_size
+        self.nursery_top = 0
+        self.old = make_allocator(old_policy, total_memory - nursery_size)
+        self._sync()
+
+    def allocate(self, size: int) -> int:
+        if size > self.nursery_size:
+            # Too big to ever fit the nursery, so it is pretenured
+            return self.allocate_old(size)
+        if self.nursery_top + size > self.nursery_size:
+            return -1
+        address = self.nursery_top
+        self.nursery_top += size
+        self._sync()
+        return address
+
+    def allocate_old(self, size: int) -> int:
+        address = self.old.allocate(size)
+        self._sync()
+        return address + self.nursery_size if address >= 0 else -1
+
+    def promote_many(self, sizes: np.ndarray) -> np.ndarray:
+        """Old-generation addresses for the prefix of sizes that fits"""
+        addresses = self.old.allocate_many(sizes)
+        self._sync()
+        return addresses + self.nursery_size
+
+    def reset(self, addresses: np.ndarray, sizes: np.ndarray):
+        # The nursery is only emptied by reset_nursery, so its top is the end
+        # of its highest block
+        young = addresses < self.nursery_size
+        self.nursery_top = int((addresses[young] + sizes[young]).max()) if young.any() else 0
+        self.old.reset(addresses[~young] - self.nursery_size, sizes[~young])
+        self._sync()
+
+    def reset_nursery(self, top: int):
+        self.nursery_top = top
+        self._sync()
+
+    def free(self, address: int, size: int):
+        # Nursery space is only reclaimed by reset_nursery
+        if address >= self.nursery_size:
+            self.old.free(address - self.nursery_size, size)
+            self._sync()
+
+    def free_many(self, addresses: np.ndarray, sizes: np.ndarray):
+        old = addresses >= self.nursery_size
+        self.old.free_many(addresses[old] - self.nursery_size, sizes[old])
+        self._sync()
+
+    def largest_free_block(self) -> int:
+        return max(self.nursery_size - self.nursery_top, self.old.largest_free_block())
+
+    def _sync(self):
+        self.free_bytes = self.nursery_size - self.nursery_top + self.old.free_bytes
+        self.internal_waste = self.old.internal_waste
+
+
+# States of a region in a RegionAllocator
+REGION_FREE = 0
+# Allocated into by the program since the last collection
+REGION_YOUNG = 1
+REGION_OLD = 2
+# Part of a single object too large for one region
+REGION_HUMONGOUS = 3
+
+# Which of a RegionAllocator's bump cursors an allocation goes through
+MUTATOR = 0
+EVACUATION = 1
+
+
+class RegionAllocator(Allocator):
+    """The arena divided into fixed-size regions, each bump-allocated into
+    and reclaimed as a whole once nothing in it is live.
+
+    The program allocates through one open region and a collector evacuates
+    survivors through another, each taking a fresh free region when the
+    current one cannot fit the next object; the tail it leaves behind is
+    only reclaimed with the region. Objects larger than a region get a run
+    of whole regions to themselves. The program may not take the last
+    reserve free regions, so evacuation always has somewhere to copy to,
+    nor hold more than young_limit young regions, if set, so that a
+    collector can bound how much it has to evacuate. Freed blocks only lower
+    their region's live bytes.
+    """
+
+    name = 'regions'
+
+    def __init__(self, total_memory: int, region_size: int, reserve: float = 0.1):
+        super().__init__(total_memory)
+        self.region_size = max(1, min(region_size, total_memory))
+        self.region_count = -(-total_memory // self.region_size)
+        starts = np.arange(self.region_count, dtype=np.int64) * self.region_size
+        self.capacity = np.minimum(starts + self.region_size, total_memory) - starts
+        self._capacity_ends = np.concatenate([[0], np.cumsum(self.capacity)])
+        self.reserve = max(1, int(np.ceil(reserve * self.region_count))) if self.region_count > 1 else 0
+        self.young_limit: Optional[int] = None
+        self.state = np.full(self.region_count, REGION_FREE, dtype=np.uint8)
+        # Bytes of the blocks in use in each region
+        self.live = np.zeros(self.region_count, dtype=np.int64)
+        # Open region and bytes bumped into it, for each cursor
+        self._region = [-1, -1]
+        self._top = [0, 0]
+        self._sync()
+
+    def region_of(self, addresses):
+        return addresses // self.region_size
+
+    def regions(self, state: int) -> np.ndarray:
+        """Indexes of the regions in the given state"""
+        return np.flatnonzero(self.state == state)
+
+    def allocate(self, size: int) -> int:
+        if size > self.region_size:
+            return self._allocate_humongous(size)
+        addresses = self._bump_many(MUTATOR, np.array([size], dtype=np.int64))
+        return int(addresses[0]) if len(addresses) else -1
+
+    def allocate_many(self, sizes: np.ndarray) -> np.ndarray:
+        return self._bump_many(MUTATOR, sizes)
+
+    def evacuate_many(self, sizes: np.ndarray) -> np.ndarray:
+        """Addresses in old regions for the prefix of sizes that fits, taking
+        reserved regions too; for a collector copying survivors"""
+        return self._bump_many(EVACUATION, sizes)
+
+    def evacuation_room(self) -> int:
+        """Bytes evacuate_many can still hand out"""
+        region = self._region[EVACUATION]
+        tail = int(self.capacity[region]) - self._top[EVACUATION] if region >= 0 else 0
+        return int(self.capacity[self.state == REGION_FREE].sum()) + tail
+
+    def free(self, address: int, size: int):
+        self.free_many(np.array([address], dtype=np.int64), np.array([size], dtype=np.int64))
+
+    def free_many(self, addresses: np.ndarray, sizes: np.ndarray):
+        regions = self.region_of(addresses)
+        humongous = self.state[regions] == REGION_HUMONGOUS
+        for address, size in zip(addresses[humongous].tolist(), sizes[humongous].tolist()):
+            self.release(np.arange(self.region_of(address), self.region_of(address + size - 1) + 1))
+        regions = regions[~humongous]
+        self.live -= np.bincount(regions, weights=sizes[~humongous],
+                                 minlength=self.region_count).astype(np.int64)
+        # Regions left empty are free again, unless a cursor is still open in them
+        empty = np.unique(regions[self.live[regions] == 0])
+        self.release(empty[~np.isin(empty, self._region)])
+
+    def release(self, regions: np.ndarray):
+        """Free whole regions, closing any cursor open in them"""
+        if not len(regions):
+            return
+        for cursor, region in enumerate(self._region):
+            if region in regions:
+                self._region[cursor], self._top[cursor] = -1, 0
+        self.state[regions] = REGION_FREE
+        self.live[regions] = 0
+        self._sync()
+
+    def promote(self, regions: np.ndarray):
+        """Make regions old, closing any cursor open in them"""
+        for cursor, region in enumerate(self._region):
+            if region in regions:
+                self._retire(cursor)
+        self.state[regions] = REGION_OLD
+        self._sync()
+
+    def retire(self):
+        """Close both cursors, so that the next allocations take fresh regions"""
+        self._retire(MUTATOR)
+        self._retire(EVACUATION)
+        self._sync()
+
+    def largest_free_block(self) -> int:
+        # Runs of free regions only change with region states, which _sync
+        # follows; the open tails shrink with every bump
+        tails = [int(self.capacity[region]) - top
+                 for region, top in zip(self._region, self._top) if region >= 0]
+        return max(tails + [self._largest_run])
+
+    def reset(self, addresses: np.ndarray, sizes: np.ndarray):
+        # Every region holding a block is closed, so it is reclaimed only
+        # by evacuating it
+        self._region, self._top = [-1, -1], [0, 0]
+        self.state[:] = REGION_FREE
+        regions = self.region_of(addresses)
+        humongous = sizes > self.region_size
+        self.live = np.bincount(regions[~humongous], weights=sizes[~humongous],
+                                minlength=self.region_count).astype(np.int64)
+        self.state[self.live > 0] = REGION_OLD
+        for address, size in zip(addresses[humongous].tolist(), sizes[humongous].tolist()):
+            self._claim_humongous(address, size)
+        self._sync()
+
+    def _bump_many(self, cursor: int, sizes: np.ndarray) -> np.ndarray:
+        # Fill the open region with as many of the following objects as fit,
+        # then open the next one, until an object fits nowhere
+        sizes = np.asarray(sizes, dtype=np.int64)
+        addresses = np.empty(len(sizes), dtype=np.int64)
+        ends = np.cumsum(sizes)
+        humongous = np.flatnonzero(sizes > self.region_size)
+        done = 0
+        while done < len(sizes):
+            if sizes[done] > self.region_size:
+                address = self._allocate_humongous(int(sizes[done])) if cursor == MUTATOR else -1
+                if address < 0:
+                    break
+                addresses[done] = address
+                done += 1
+                continue
+            region, top = self._region[cursor], self._top[cursor]
+            fit = 0
+            if region >= 0:
+                base = int(ends[done - 1]) if done else 0
+                following = int(np.searchsorted(humongous, done))
+                stop = int(humongous[following]) if following < len(humongous) else len(sizes)
+                fit = min(int(np.searchsorted(ends, base + self.capacity[region] - top, side='right')),
+                          stop) - done
+            if fit <= 0:
+                if not self._open(cursor, int(sizes[done])):
+                    break
+                continue
+            start = region * self.region_size + top - base
+            addresses[done:done + fit] = start + ends[done:done + fit] - sizes[done:done + fit]
+            allocated = int(ends[done + fit - 1]) - base
+            self._top[cursor] += allocated
+            self.live[region] += allocated
+            self.free_bytes -= allocated
+            done += fit
+        return addresses[:done]
+
+    def _open(self, cursor: int, size: int) -> bool:
+        # Retire the cursor's region and take the lowest free one that fits size
+        self._retire(cursor)
+        free = self.state == REGION_FREE
+        if cursor == MUTATOR and (free.sum() <= self.reserve or (
+                self.young_limit is not None
+                and (self.state == REGION_YOUNG).sum() >= self.young_limit)):
+            self._sync()
+            return False
+        fitting = np.flatnonzero(free & (self.capacity >= size))
+        if not len(fitting):
+            self._sync()
+            return False
+        region = int(fitting[0])
+        self.state[region] = REGION_YOUNG if cursor == MUTATOR else REGION_OLD
+        self._region[cursor], self._top[cursor] = region, 0
+        self._sync()
+        return True
+
+    def _retire(self, cursor: int):
+        region = self._region[cursor]
+        self._region[cursor], self._top[cursor] = -1, 0
+        if region >= 0 and self.live[region] == 0:
+            self.state[region] = REGION_FREE
+
+    def _allocate_humongous(self, size: int) -> int:
+        # The first run of free regions long enough, leaving the reserve
+        starts, ends = self._free_runs()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            stop = int(np.searchsorted(self._capacity_ends, self._capacity_ends[start] + size))
+            if stop > end:
+                continue
+            if (self.state == REGION_FREE).sum() - (stop - start) < self.reserve:
+                return -1
+            address = start * self.region_size
+            self._claim_humongous(address, size)
+            self._sync()
+            return address
+        return -1
+
+    def _claim_humongous(self, address: int, size: int):
+        regions = np.arange(self.region_of(address), self.region_of(address + size - 1) + 1)
+        self.state[regions] = REGION_HUMONGOUS
+        self.live[regions] = self.capacity[regions]
+        self.live[regions[-1]] -= int(self._capacity_ends[regions[-1] + 1]) - (address + size)
+
+    def _free_runs(self):
+        # First region and end of each run of free regions
+        free = np.concatenate([[False], self.state == REGION_FREE, [False]])
+        edges = np.flatnonzero(free[1:] != free[:-1])
+        return edges[::2], edges[1::2]
+
+    def _sync(self):
+        tails = sum(int(self.capacity[region]) - top
+                    for region, top in zip(self._region, self._top) if region >= 0)
+        self.free_bytes = int(self.capacity[self.state == REGION_FREE].sum()) + tails
+        starts, ends = self._free_runs()
+        runs = self._capacity_ends[ends] - self._capacity_ends[starts]
+        self._largest_run = int(runs.max()) if len(runs) else 0
+
+
+ALLOCATORS = {
+    allocator.name: allocator
+    for allocator in (FirstFitAllocator, NextFitAllocator, BestFitAllocator,
+                      SegregatedFitAllocator, BuddyAllocator)
+}
+
+
+def make_allocator(policy: str, total_memory: int) -> Allocator:
+    try:
+        return ALLOCATORS[policy](total_memory)
+    except KeyError:
+        raise ValueError(f"Unknown allocation policy: {policy}") from None
@@ -0,0 +1,399 @@
+"""Headless benchmarks of MemoryManager under seeded workload models.
+
+Run as a script to benchmark every combination of the given workloads,
+collectors, allocation policies, GC triggers, heap sizes and object counts,
+for example:
+
+    python benchmark.py --workloads uniform linked_list --collectors mark_sweep \
+        ref_counting --heap-sizes 1000000 --objects 200000 --output results.json
+"""
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gc_stats import GCStats
+from memory_manager import MemoryManager
+
+
+class Workload:
+    """A seeded model of a program's allocations.
+
+    step() allocates about count objects into the manager and returns how
+    many it allocated; fewer than asked means the heap is full. Roots are
+    kept in a window of the live_roots most recent ones, and older roots are
+    dropped as new ones arrive, so the live set stays bounded and the
+    objects only reachable from dropped roots become garbage.
+    """
+
+    name = ''
+
+    def __init__(self, seed: int = 0, live_roots: int = 256, max_size: int = 16):
+        self.rng = np.random.default_rng(seed)
+        self.live_roots = live_roots
+        self.max_size = max_size
+        self.roots = deque()
+        self.bytes_allocated = 0
+
+    def step(self, manager: MemoryManager, count: int) -> int:
+        raise NotImplementedError
+
+    def sizes(self, count: int) -> np.ndarray:
+        return self.rng.integers(1, self.max_size + 1, size=count)
+
+    def allocate(self, manager: MemoryManager, sizes: np.ndarray, ref_counts: np.ndarray,
+                 ref_targets: np.ndarray, is_root: np.ndarray) -> np.ndarray:
+        obj_ids = manager.allocate_with_references(sizes, ref_counts, ref_targets, is_root)
+        self.bytes_allocated += int(sizes[:len(obj_ids)].sum())
+        self.roots.extend(obj_ids[is_root[:len(obj_ids)]].tolist())
+        while len(self.roots) > self.live_roots:
+            manager.remove_root(self.roots.popleft())
+        return obj_ids
+
+
+class UniformWorkload(Workload):
+    """Each object references up to max_references objects picked uniformly
+    from the live roots and the objects allocated before it in its batch.
+
+    Those are the objects the program is known to hold, so the graph never
+    depends on when a collector frees garbage and every collector sees the
+    same program.
+    """
+
+    name = 'uniform'
+
+    def __init__(self, seed: int = 0, root_probability: float = 0.05,
+                 max_references: int = 3, **kwargs):
+        super().__init__(seed, **kwargs)
+        self.root_probability = root_probability
+        self.max_references = max_references
+
+    def root_weights(self, roots: np.ndarray) -> np.ndarray:
+        return np.ones(len(roots))
+
+    def step(self, manager: MemoryManager, count: int) -> int:
+        rng = self.rng
+        roots = np.fromiter(self.roots, dtype=np.int64, count=len(self.roots))
+        weights = np.cumsum(self.root_weights(roots))
+        root_weight = weights[-1] if len(weights) else 0.0
+        # Object i picks from the roots and batch objects 0 .. i-1, each of
+        # which weighs one
+        ref_counts = rng.integers(0, self.max_references + 1, size=count)
+        if root_weight == 0:
+            ref_counts[0] = 0
+        owners = np.repeat(np.arange(count), ref_counts)
+        picks = rng.random(len(owners)) * (root_weight + owners)
+        to_root = picks < root_weight
+        ref_targets = manager.next_id + (picks - root_weight).astype(np.int64)
+        ref_targets[to_root] = roots[np.searchsorted(weights, picks[to_root], side='right')]
+        is_root = rng.random(count) < self.root_probability
+        obj_ids = self.allocate(manager, self.sizes(count), ref_counts, ref_targets, is_root)
+        self.referenced(ref_targets[:int(ref_counts[:len(obj_ids)].sum())])
+        return len(obj_ids)
+
+    def referenced(self, ref_targets: np.ndarray):
+        """Called with the targets of the references just allocated"""
+
+
+class PowerLawWorkload(UniformWorkload):
+    """Preferential attachment: a root is picked with probability
+    proportional to its in-degree plus one, so in-degrees follow a power law"""
+
+    name = 'power_law'
+
+    def __init__(self, seed: int = 0, **kwargs):
+        super().__init__(seed, **kwargs)
+        self.in_degree = np.zeros(1024, dtype=np.int64)
+
+    def root_weights(self, roots: np.ndarray) -> np.ndarray:
+        self._reserve(roots)
+        return self.in_degree[roots] + 1.0
+
+    def referenced(self, ref_targets: np.ndarray):
+        self._reserve(ref_targets)
+        np.add.at(self.in_degree, ref_targets, 1)
+
+    def _reserve(self, obj_ids: np.ndarray):
+        if len(obj_ids) and obj_ids.max() >= len(self.in_degree):
+            grown = np.zeros(max(2 * len(self.in_degree), int(obj_ids.max()) + 1), dtype=np.int64)
+            grown[:len(self.in_degree)] = self.in_degree
+            self.in_degree = grown
+
+
+class _StructureWorkload(Workload):
+    # Allocates whole structures of a fixed shape, each reachable only from
+    # its last object, which becomes a root. A structure cut short by a full
+    # heap never gets its root, so its objects are garbage.
+
+    # References of the objects of one structure, as offsets from its first id
+    shape_counts: np.ndarray
+    shape_targets: np.ndarray
+
+    def __init__(self, seed: int = 0, live_roots: int = 8, **kwargs):
+        # Each root keeps a whole structure alive, so fewer are kept
+        super().__init__(seed, live_roots=live_roots, **kwargs)
+
+    def step(self, manager: MemoryManager, count: int) -> int:
+        size = len(self.shape_counts)
+        structures = -(-count // size)
+        first_ids = manager.next_id + size * np.arange(structures)
+        ref_counts = np.tile(self.shape_counts, structures)
+        ref_targets = (np.tile(self.shape_targets, structures)
+                       + np.repeat(first_ids, len(self.shape_targets)))
+        is_root = np.zeros(size * structures, dtype=bool)
+        is_root[size - 1::size] = True
+        return len(self.allocate(manager, self.sizes(size * structures),
+                                 ref_counts, ref_targets, is_root))
+
+
+class LinkedListWorkload(_StructureWorkload):
+    """Singly linked lists of list_length objects, each referencing the one
+    allocated before it"""
+
+    name = 'linked_list'
+
+    def __init__(self, seed: int = 0, list_length: int = 1024, **kwargs):
+        super().__init__(seed, **kwargs)
+        self.shape_counts = np.ones(list_length, dtype=np.int64)
+        self.shape_counts[0] = 0
+        self.shape_targets = np.arange(list_length - 1)
+
+
+class TreeWorkload(_StructureWorkload):
+    """Complete trees of depth levels with the given arity, allocated
+    bottom-up so parents can reference their children"""
+
+    name = 'tree'
+
+    def __init__(self, seed: int = 0, arity: int = 2, depth: int = 10, **kwargs):
+        super().__init__(seed, **kwargs)
+        size = (arity ** depth - 1) // (arity - 1)
+        # Node b in breadth-first order has children arity*b+1 .. arity*b+arity
+        # and is allocated at offset size-1-b
+        nodes = np.arange(size - 1, -1, -1)
+        children = arity * nodes[:, None] + np.arange(1, arity + 1)
+        children = np.where(children < size, children, -1)
+        self.shape_counts = (children >= 0).sum(axis=1)
+        self.shape_targets = size - 1 - children[children >= 0]
+
+
+class ChurnWorkload(Workload):
+    """Short-lived objects: each references up to max_references of the
+    window objects allocated just before it in its batch, and few are ever
+    rooted, so nearly everything dies young"""
+
+    name = 'churn'
+
+    def __init__(self, seed: int = 0, root_probability: float = 0.01,
+                 max_references: int = 2, window: int = 64, live_roots: int = 32, **kwargs):
+        super().__init__(seed, live_roots=live_roots, **kwargs)
+        self.root_probability = root_probability
+        self.max_references = max_references
+        self.window = window
+
+    def step(self, manager: MemoryManager, count: int) -> int:
+        rng = self.rng
+        ref_counts = rng.integers(0, self.max_references + 1, size=count)
+        # Object i picks among the window objects allocated just before it
+        # in its batch
+        owners = np.repeat(np.arange(count), ref_counts)
+        offsets = owners - rng.integers(1, self.window + 1, size=len(owners))
+        keep = offsets >= 0
+        ref_targets = manager.next_id + offsets[keep]
+        ref_counts = np.bincount(owners[keep], minlength=count)
+        is_root = rng.random(count) < self.root_probability
+        return len(self.allocate(manager, self.sizes(count), ref_counts, ref_targets, is_root))
+
+
+WORKLOADS = {
+    workload.name: workload
+    for workload in (UniformWorkload, PowerLawWorkload, LinkedListWorkload, TreeWorkload,
+                     ChurnWorkload)
+}
+
+
+def run_benchmark(workload: str, objects: int, heap_size: int, collector: str = 'mark_sweep',
+                  allocation_policy: str = 'first_fit', seed: int = 0, batch_size: int = 4096,
+                  trace_memory: bool = True, trace_path: Optional[str] = None,
+                  trigger: Optional[str] = None) -> Dict:
+    """Allocate objects objects of a workload into a fresh heap, collecting
+    whenever it is full, and return the measurements.
+
+    With a trigger (see gc_triggers) the manager also collects on its own,
+    and those collections are measured like the runner's and left out of
+    allocation time. The run stops early if a full collection frees nothing
+    and the heap still has no room, and ends with one more collection in any
+    case. Pause times come from CollectionResult.pause_times(), so the
+    reference counting collector's batched frees count as pauses, while
+    their time is part of allocation time. trace_memory records peak Python
+    memory with tracemalloc, which slows the run down a little. trace_path
+    records the run as an allocation trace for allocation_trace.replay.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    allocated = 0
+    allocation_ns = 0
+    exhausted = False
+    manager = None
+    try:
+        manager = MemoryManager(total_memory=heap_size, seed=seed,
+                                allocation_policy=allocation_policy, collector=collector,
+                                trace_path=trace_path, trigger=trigger)
+        # Every collection is measured here, wherever it was started
+        stats = manager.stats = GCStats(window=None)
+        model = WORKLOADS[workload](seed)
+
+        while allocated < objects:
+            requested = min(batch_size, objects - allocated)
+            start = time.perf_counter_ns()
+            collection_ns = stats.total_ns
+            count = model.step(manager, requested)
+            allocation_ns += time.perf_counter_ns() - start - (stats.total_ns - collection_ns)
+            allocated += count
+            if count < requested:
+                result = manager.run_garbage_collection()
+                # A minor collection that frees nothing may still make room
+                # by promoting, so only a fruitless full one ends the run
+                if count == 0 and result.kind == 'full' and not result.objects_freed:
+                    exhausted = True
+                    break
+        # Collectors with deferred work, like reference counting's batches,
+        # only report it when they collect
+        manager.run_garbage_collection()
+        peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        if manager is not None:
+            manager.close_trace()
+
+    pause_ms = np.asarray(stats.pauses(), dtype=np.float64) / 1e6
+    percentiles = (np.percentile(pause_ms, [50, 90, 99]).tolist() if len(pause_ms)
+                   else [0.0, 0.0, 0.0])
+    census = manager.census()
+    return {
+        'workload': workload,
+        'collector': collector,
+        'allocation_policy': allocation_policy,
+        'trigger': trigger,
+        'heap_size': heap_size,
+        'objects': objects,
+        'seed': seed,
+        'objects_allocated': allocated,
+        'exhausted': exhausted,
+        'allocation_seconds': allocation_ns / 1e9,
+        'objects_per_second': allocated / (allocation_ns / 1e9) if allocation_ns else 0.0,
+        'bytes_per_second': model.bytes_allocated / (allocation_ns / 1e9) if allocation_ns else 0.0,
+        'collections': stats.collections,
+        'gc_seconds': stats.total_ns / 1e9,
+        # Collection work that allocations did, also part of allocation_seconds
+        'deferred_seconds': manager.collector.deferred_ns / 1e9,
+        'pause_ms_p50': percentiles[0],
+        'pause_ms_p90': percentiles[1],
+        'pause_ms_p99': percentiles[2],
+        'pause_ms_max': float(pause_ms.max()) if len(pause_ms) else 0.0,
+        'peak_memory_bytes': peak_memory,
+        'live_objects': census['objects'],
+        'unreachable_objects': census['unreachable'],
+        'used_memory': census['used_memory'],
+        # Heap footprint: the most memory in use when a collection started
+        'peak_used_memory': max((record.used_before for record in stats.records), default=0),
+        'largest_free_block': census['largest_free_block'],
+        # Share of the allocated blocks lost to rounding up request sizes
+        'internal_fragmentation': manager.internal_fragmentation(),
+    }
+
+
+def run_suite(workloads: Sequence[str], objects: Sequence[int], heap_sizes: Sequence[int],
+              collectors: Sequence[str] = ('mark_sweep',),
+              allocation_policies: Sequence[str] = ('first_fit',), seed: int = 0,
+              triggers: Sequence[Optional[str]] = (None,),
+              **kwargs) -> Tuple[List[Dict], List[str]]:
+    """Run every combination of the arguments and return the results and the
+    combinations that could not run, such as mark_compact on a buddy heap"""
+    results, skipped = [], []
+    for workload, count, heap_size, collector, policy, trigger in itertools.product(
+            workloads, objects, heap_sizes, collectors, allocation_policies, triggers):
+        try:
+            results.append(run_benchmark(workload, count, heap_size, collector, policy,
+                                         seed, trigger=trigger, **kwargs))
+        except ValueError as error:
+            skipped.append(f"{workload}/{collector}/{policy}: {error}")
+    return results, skipped
+
+
+def environment() -> Dict[str, str]:
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'machine': platform.machine()}
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    import argparse
+
+    from collectors import COLLECTORS
+    from allocators import ALLOCATORS
+    from gc_triggers import TRIGGERS
+
+    parser = argparse.ArgumentParser(description="Benchmark MemoryManager without the GUI")
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    parser.add_argument('--objects', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--heap-sizes', type=int, nargs='+', default=[400_000])
+    parser.add_argument('--collectors', nargs='+', choices=sorted(COLLECTORS), default=['mark_sweep'])
+    parser.add_argument('--policies', nargs='+', choices=sorted(ALLOCATORS), default=['first_fit'])
+    parser.add_argument('--triggers', nargs='+', choices=['none', *sorted(TRIGGERS)], default=['none'],
+                        help="let the manager collect on its own; none only collects when full")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=4096)
+    parser.add_argument('--no-memory', action='store_true',
+                        help="do not trace peak Python memory")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--record', metavar='PATH',
+                        help="record the run as an allocation trace; needs a single combination")
+    args = parser.parse_args(argv)
+    combinations = (len(args.workloads) * len(args.objects) * len(args.heap_sizes)
+                    * len(args.collectors) * len(args.policies) * len(args.triggers))
+    if args.record and combinations > 1:
+        parser.error("--record needs exactly one workload, object count, heap size, "
+                     "collector, policy and trigger")
+
+    results, skipped = run_suite(args.workloads, args.objects, args.heap_sizes, args.collectors,
+                                 args.policies, args.seed,
+                                 [None if trigger == 'none' else trigger for trigger in args.triggers],
+                                 batch_size=args.batch_size,
+                                 trace_memory=not args.no_memory, trace_path=args.record)
+    for reason in skipped:
+        print(f"skipped {reason}", file=sys.stderr)
+    # Name columns are as wide as their longest value, plus a gap
+    names = {'workload': args.workloads, 'collector': args.collectors, 'policy': args.policies,
+             'trigger': args.triggers}
+    width = {column: max(map(len, [column, *values])) + 2 for column, values in names.items()}
+    print(f"{'workload':<{width['workload']}}{'collector':<{width['collector']}}"
+          f"{'policy':<{width['policy']}}{'trigger':<{width['trigger']}}{'heap':>10}{'objects':>10}"
+          f"{'Mobj/s':>8}{'GCs':>6}{'GC s':>8}{'defer s':>8}{'p50 ms':>8}{'p99 ms':>8}"
+          f"{'used %':>7}{'int %':>7}{'peak MB':>9}")
+    for row in results:
+        peak = row['peak_memory_bytes']
+        print(f"{row['workload']:<{width['workload']}}{row['collector']:<{width['collector']}}"
+              f"{row['allocation_policy']:<{width['policy']}}"
+              f"{row['trigger'] or 'none':<{width['trigger']}}"
+              f"{row['heap_size']:>10}{row['objects_allocated']:>10}"
+              f"{row['objects_per_second'] / 1e6:>8.2f}{row['collections']:>6}"
+              f"{row['gc_seconds']:>8.3f}{row['deferred_seconds']:>8.3f}"
+              f"{row['pause_ms_p50']:>8.2f}{row['pause_ms_p99']:>8.2f}"
+              f"{row['peak_used_memory'] / row['heap_size'] * 100:>7.1f}"
+              f"{row['internal_fragmentation']:>7.1f}"
+              f"{peak / 2 ** 20 if peak is not None else float('nan'):>9.1f}"
+              f"{'  exhausted' if row['exhausted'] else ''}")
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'environment': environment(), 'results': results}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
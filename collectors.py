@@ -0,0 +1,1214 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Union
+
+import numpy as np
+
+from allocators import (REGION_HUMONGOUS, REGION_OLD, REGION_YOUNG, Allocator,
+                        FreeListAllocator, GenerationalAllocator, RegionAllocator,
+                        SemispaceAllocator, make_allocator)
+from marking import breadth_first_order, gather_references, mark_reachable
+from object_store import FLAG_MARKED, FLAG_REACHABLE, FLAG_ROOT, FLAG_YOUNG
+from parallel_marking import ParallelMarker
+
+
+@dataclass
+class CollectionResult:
+    collector: str
+    # 'full' for whole-heap collections, 'minor' for nursery-only (or
+    # young-only) ones and 'mixed' for ones that add some old regions
+    kind: str = 'full'
+    objects_marked: int = 0
+    objects_freed: int = 0
+    bytes_freed: int = 0
+    bytes_moved: int = 0
+    # Wall time of each phase in nanoseconds, in the order the phases ran
+    phase_times: Dict[str, int] = field(default_factory=dict)
+    # Length of each stop-the-world increment in nanoseconds, when the
+    # collection ran in several steps
+    pauses: List[int] = field(default_factory=list)
+    # Filled in by MemoryManager: heap occupancy around the collection and
+    # the nanoseconds spent collecting, summed over every step
+    used_before: int = 0
+    used_after: int = 0
+    objects_before: int = 0
+    objects_after: int = 0
+    wall_time: int = 0
+
+    def pause_times(self) -> List[int]:
+        """Stop-the-world pauses in nanoseconds; a collection that ran in one
+        go is a single pause"""
+        return self.pauses or [self.wall_time]
+
+
+class Collector:
+    """A garbage collection strategy that runs against a MemoryManager"""
+
+    name = ''
+    # True between start() and the step() that finishes the collection
+    in_progress = False
+    # Whether full-heap marks go through mark(), so a parallel marker can
+    # run them
+    marks_heap = False
+    # Parallel marker used for full-heap marks instead of the serial one
+    marker: Optional[ParallelMarker] = None
+    # Nanoseconds spent in reclaim(), which allocations pay for
+    deferred_ns = 0
+    # Bytes of garbage found by a collection that reclaim() has not freed yet
+    pending_bytes = 0
+
+    def create_allocator(self, policy: str, total_memory: int) -> Allocator:
+        return make_allocator(policy, total_memory)
+
+    def attach(self, manager):
+        """Check that the manager's configuration suits this collector"""
+
+    def restore(self, manager):
+        """Rebuild whatever this collector keeps outside the heap once the
+        manager's heap has been loaded from a snapshot"""
+
+    def save_state(self) -> Dict:
+        """Counters kept outside the heap that a snapshot carries, as JSON
+        values"""
+        return {}
+
+    def load_state(self, state: Dict):
+        """Take back what save_state returned, before restore runs"""
+
+    def on_allocate(self, manager, slots: np.ndarray):
+        """Called once new objects have been placed in the given slots"""
+
+    def write_barrier(self, manager, source_id: Optional[int], old_target: Optional[int],
+                      new_target: Optional[int]):
+        """Called after a reference from source_id to old_target is removed
+        and/or one to new_target is added. source_id is None when the
+        reference is the root set's."""
+
+    def collect(self, manager) -> CollectionResult:
+        raise NotImplementedError
+
+    def reclaim(self, manager, size: int) -> bool:
+        """Called when an allocation of size does not fit. Collectors that
+        leave garbage for allocations to sweep free some of it here, and
+        return False once none is left."""
+        return False
+
+    def start(self, manager):
+        """Begin a collection that step() advances"""
+        self.in_progress = True
+
+    def step(self, manager, budget_ns: int) -> Optional[CollectionResult]:
+        """Advance a started collection by about budget_ns and return its
+        result once it has finished.
+
+        Collectors that cannot be interrupted run the whole collection here.
+        """
+        if not self.in_progress:
+            return None
+        self.in_progress = False
+        return self.collect(manager)
+
+    def close(self):
+        """Shut down the parallel marker's worker processes, if any"""
+        if self.marker is not None:
+            self.marker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def mark(self, manager) -> np.ndarray:
+        """Mark everything reachable from the root objects and return the bitmap"""
+        store = manager.store
+        mark = mark_reachable if self.marker is None else self.marker.mark
+        return mark(store.column('ref_start'), store.column('ref_count'),
+                    store.ref_buffer[:store.ref_used], store.slot_of_id,
+                    store.slots_of(manager.root_objects), store.count)
+
+    @staticmethod
+    def release(manager, dead: np.ndarray, free_blocks: bool = True) -> int:
+        """Remove the dead slots from the heap and return the bytes they held"""
+        store = manager.store
+        dead_sizes = store.column('size')[dead]
+        if free_blocks:
+            manager.allocator.free_many(store.column('address')[dead], dead_sizes)
+        bytes_freed = int(dead_sizes.sum())
+        manager.used_memory -= bytes_freed
+        store.retain(~dead)
+        # Every survivor is reachable by definition
+        store.mark_all_reachable()
+        return bytes_freed
+
+
+class MarkSweepCollector(Collector):
+    name = 'mark_sweep'
+    marks_heap = True
+
+    def __init__(self, workers: int = 1):
+        # With more than one worker the mark phase runs in a process pool
+        if workers > 1:
+            self.marker = ParallelMarker(workers)
+
+    def collect(self, manager) -> CollectionResult:
+        result = CollectionResult(self.name)
+
+        # Mark phase
+        start = time.perf_counter_ns()
+        marked = self.mark(manager)
+        result.objects_marked = int(marked.sum())
+        result.objects_freed = len(marked) - result.objects_marked
+
+        # Sweep phase
+        swept = time.perf_counter_ns()
+        result.bytes_freed = self.release(manager, ~marked)
+        result.phase_times = {'mark': swept - start, 'sweep': time.perf_counter_ns() - swept}
+        return result
+
+
+class LazySweepCollector(MarkSweepCollector):
+    """Mark-sweep whose pause only marks. The garbage it finds stays in the
+    heap and is swept in address order, a chunk at a time, by allocations
+    that do not fit; its results count that garbage as freed.
+
+    Marks are epochs: an object is marked when its epoch column holds the
+    number of the latest collection, so no pass clears marks, and marks stay
+    with objects as sweeping moves them between slots. Until it is swept,
+    garbage can still be pointed at again, like any object in the simulated
+    programs. Referencing or rooting it from a live object, or allocating
+    an object that references it, marks it and whatever it references that
+    is not swept yet, and sweeping then leaves them alone. References to
+    garbage swept before that dangle, as they would after an eager sweep.
+    """
+
+    name = 'lazy_sweep'
+    # Objects swept per unit of work between checks for a block that fits
+    sweep_chunk_size = 256
+
+    def __init__(self, workers: int = 1):
+        super().__init__(workers)
+        self.epoch = 0
+        # Ids found unmarked by the latest collection in address order,
+        # swept from sweep_position on
+        self.doomed = np.empty(0, dtype=np.int64)
+        self.sweep_position = 0
+        self.objects_swept = 0
+
+    def save_state(self) -> Dict:
+        return {'epoch': self.epoch, 'objects_swept': self.objects_swept}
+
+    def load_state(self, state: Dict):
+        self.epoch = state.get('epoch', 0)
+        self.objects_swept = state.get('objects_swept', 0)
+
+    def restore(self, manager):
+        # Garbage not swept yet is whatever the latest collection did not
+        # mark and nothing revived
+        store = manager.store
+        doomed = np.flatnonzero(store.column('epoch') != self.epoch)
+        self.doomed = store.column('id')[doomed[np.argsort(store.column('address')[doomed],
+                                                           kind='stable')]]
+        self.sweep_position = 0
+        self.pending_bytes = int(store.column('size')[doomed].sum())
+
+    def collect(self, manager) -> CollectionResult:
+        result = CollectionResult(self.name)
+        store = manager.store
+
+        # Garbage left from the previous collection goes first, or the mark
+        # would list it again
+        start = time.perf_counter_ns()
+        if self.sweep_position < len(self.doomed):
+            self._sweep(manager, len(self.doomed))
+        self.pending_bytes = 0
+
+        marking = time.perf_counter_ns()
+        marked = self.mark(manager)
+        self.epoch += 1
+        live, dead = np.flatnonzero(marked), np.flatnonzero(~marked)
+        store.column('epoch')[live] = self.epoch
+        store.set_flags(live, FLAG_REACHABLE)
+        store.clear_flags(dead, FLAG_REACHABLE)
+        result.objects_marked = len(live)
+        result.objects_freed = len(dead)
+        result.bytes_freed = self.pending_bytes = int(store.column('size')[dead].sum())
+        self.doomed = store.column('id')[dead[np.argsort(store.column('address')[dead],
+                                                         kind='stable')]]
+        self.sweep_position = 0
+        end = time.perf_counter_ns()
+        result.phase_times = {'sweep': marking - start, 'mark': end - marking}
+        return result
+
+    def reclaim(self, manager, size: int) -> bool:
+        if self.sweep_position >= len(self.doomed):
+            return False
+        start = time.perf_counter_ns()
+        allocator = manager.allocator
+        while True:
+            self._sweep(manager, self.sweep_chunk_size)
+            if (self.sweep_position >= len(self.doomed)
+                    or allocator.largest_free_block() >= size):
+                break
+        self.deferred_ns += time.perf_counter_ns() - start
+        return True
+
+    def on_allocate(self, manager, slots: np.ndarray):
+        store = manager.store
+        store.column('epoch')[slots] = self.epoch
+        if self.sweep_position < len(self.doomed):
+            self._revive(store, store.slot_of_id[gather_references(
+                store.column('ref_start'), store.column('ref_count'), store.ref_buffer, slots)])
+
+    def write_barrier(self, manager, source_id: Optional[int], old_target: Optional[int],
+                      new_target: Optional[int]):
+        if new_target is None or self.sweep_position >= len(self.doomed):
+            return
+        store = manager.store
+        # A reference from garbage does not make its target live
+        if source_id is not None and store.column('epoch')[store.slot(source_id)] != self.epoch:
+            return
+        self._revive(store, store.slots_of([new_target]))
+
+    def _revive(self, store, slots: np.ndarray):
+        # Mark the unswept garbage among slots and everything it references
+        epoch = store.column('epoch')
+        while True:
+            slots = slots[slots >= 0]
+            slots = np.unique(slots[epoch[slots] != self.epoch])
+            if not len(slots):
+                return
+            epoch[slots] = self.epoch
+            store.set_flags(slots, FLAG_REACHABLE)
+            self.pending_bytes -= int(store.column('size')[slots].sum())
+            slots = store.slot_of_id[gather_references(
+                store.column('ref_start'), store.column('ref_count'), store.ref_buffer, slots)]
+
+    def _sweep(self, manager, count: int):
+        # Free the next count doomed ids, skipping revived ones
+        store = manager.store
+        ids = self.doomed[self.sweep_position:self.sweep_position + count]
+        self.sweep_position += len(ids)
+        slots = store.slot_of_id[ids]
+        slots = slots[slots >= 0]
+        slots = slots[store.column('epoch')[slots] != self.epoch]
+        sizes = store.column('size')[slots]
+        manager.allocator.free_many(store.column('address')[slots], sizes)
+        manager.used_memory -= int(sizes.sum())
+        self.pending_bytes -= int(sizes.sum())
+        store.remove_many(slots)
+        self.objects_swept += len(slots)
+
+
+class IncrementalCollector(Collector):
+    """Mark-sweep that runs in time-bounded steps using tri-color marking:
+    white objects are unmarked, grey ones are marked and waiting on the
+    worklist, black ones are marked and scanned.
+
+    The program may allocate and change references between steps. New
+    objects start black, and the write barrier shades both the new target of
+    a reference (insertion, Dijkstra-style) and the target it replaced
+    (deletion, Yuasa-style), so no live object is left white. Simulated
+    programs can point at any live object, even one that was unreachable
+    when marking began, which is why deletion alone is not enough here.
+    Once the worklist is empty the white objects are swept in chunks too; a
+    white object the barrier shades before its chunk is swept survives.
+    Survivors' marks are cleared in the step that finishes the sweep, which
+    already passes over every object to set its reachable bit, so starting a
+    collection only costs shading the roots.
+    """
+
+    name = 'incremental'
+    # Objects scanned, or swept, per unit of work between budget checks.
+    # Sweeping returns blocks to the allocator one by one, so its unit is smaller
+    chunk_size = 4096
+    sweep_chunk_size = 256
+
+    def __init__(self):
+        self.grey: List[np.ndarray] = []
+        # Ids found white when marking finished, swept from sweep_position on
+        self.doomed: Optional[np.ndarray] = None
+        self.sweep_position = 0
+        self.result: Optional[CollectionResult] = None
+
+    def collect(self, manager) -> CollectionResult:
+        # Collecting, or finishing a collection in progress, without a budget
+        # is a single pause however many steps it takes
+        start = time.perf_counter_ns()
+        earlier = len(self.result.pauses) if self.in_progress else 0
+        if not self.in_progress:
+            self.start(manager)
+        result = None
+        while result is None:
+            result = self.step(manager, 2 ** 62)
+        del result.pauses[earlier:]
+        result.pauses.append(time.perf_counter_ns() - start)
+        return result
+
+    def start(self, manager):
+        start = time.perf_counter_ns()
+        self.in_progress = True
+        self.result = CollectionResult(self.name)
+        store = manager.store
+        self.grey = []
+        self.doomed = None
+        self._shade(manager, store.slots_of(manager.root_objects))
+        end = time.perf_counter_ns()
+        self._account('mark', start, end)
+        self.result.pauses.append(end - start)
+
+    def step(self, manager, budget_ns: int) -> Optional[CollectionResult]:
+        if not self.in_progress:
+            return None
+        start = time.perf_counter_ns()
+        deadline = start + budget_ns
+        store = manager.store
+        result = self.result
+
+        # Every step does at least one chunk of work so collection progresses
+        marked_chunk = bool(self.grey)
+        while self.grey:
+            ids = self.grey.pop()
+            if len(ids) > self.chunk_size:
+                self.grey.append(ids[self.chunk_size:])
+                ids = ids[:self.chunk_size]
+            # Blacken the chunk by shading everything it references
+            slots = store.slot_of_id[ids]
+            slots = slots[slots >= 0]
+            self._shade(manager, store.slot_of_id[gather_references(
+                store.column('ref_start'), store.column('ref_count'), store.ref_buffer, slots)])
+            if time.perf_counter_ns() >= deadline:
+                break
+        swept = time.perf_counter_ns()
+        self._account('mark', start, swept)
+
+        if not self.grey and (swept < deadline or not marked_chunk):
+            if self.doomed is None:
+                # Marking is complete: everything still white is garbage
+                white = (store.column('flags') & FLAG_MARKED) == 0
+                self.doomed = store.column('id')[white]
+                self.sweep_position = 0
+                result.objects_marked = store.count - len(self.doomed)
+            while self.sweep_position < len(self.doomed):
+                ids = self.doomed[self.sweep_position:self.sweep_position + self.sweep_chunk_size]
+                self.sweep_position += len(ids)
+                slots = store.slot_of_id[ids]
+                slots = slots[slots >= 0]
+                slots = slots[(store.column('flags')[slots] & FLAG_MARKED) == 0]
+                sizes = store.column('size')[slots]
+                manager.allocator.free_many(store.column('address')[slots], sizes)
+                manager.used_memory -= int(sizes.sum())
+                result.objects_freed += len(slots)
+                result.bytes_freed += int(sizes.sum())
+                store.remove_many(slots)
+                if time.perf_counter_ns() >= deadline:
+                    break
+        end = time.perf_counter_ns()
+        self._account('sweep', swept, end)
+        result.pauses.append(end - start)
+
+        if self.grey or self.doomed is None or self.sweep_position < len(self.doomed):
+            return None
+        # Every survivor is reachable by definition, and is left unmarked for
+        # the next collection
+        store.mark_all_reachable()
+        store.column('flags')[:] &= ~np.uint8(FLAG_MARKED)
+        self.in_progress = False
+        self.result = None
+        self.doomed = None
+        return result
+
+    def restore(self, manager):
+        # A snapshot taken during a collection holds its marks
+        manager.store.column('flags')[:] &= ~np.uint8(FLAG_MARKED)
+
+    def on_allocate(self, manager, slots: np.ndarray):
+        # New objects are allocated black, so only what they point at needs
+        # shading; this keeps marking work bounded while the program allocates
+        if self.in_progress:
+            store = manager.store
+            store.column('flags')[slots] |= FLAG_MARKED
+            self._shade(manager, store.slot_of_id[gather_references(
+                store.column('ref_start'), store.column('ref_count'), store.ref_buffer, slots)])
+
+    def write_barrier(self, manager, source_id: Optional[int], old_target: Optional[int],
+                      new_target: Optional[int]):
+        if not self.in_progress:
+            return
+        targets = [target for target in (old_target, new_target) if target is not None]
+        self._shade(manager, manager.store.slots_of(targets))
+
+    def _shade(self, manager, slots: np.ndarray):
+        # Turn white slots grey. A slot listed twice is queued twice, which
+        # only costs a rescan that shades nothing new
+        flags = manager.store.column('flags')
+        slots = slots[slots >= 0]
+        slots = slots[(flags[slots] & FLAG_MARKED) == 0]
+        if len(slots):
+            flags[slots] |= FLAG_MARKED
+            self.grey.append(manager.store.column('id')[slots])
+
+    def _account(self, phase: str, start: int, end: int):
+        if end > start:
+            self.result.phase_times[phase] = self.result.phase_times.get(phase, 0) + end - start
+
+
+class MarkCompactCollector(Collector):
+    """Sliding (LISP2-style) compaction: survivors keep their address order
+    and slide down to the bottom of the heap"""
+
+    name = 'mark_compact'
+    marks_heap = True
+
+    def attach(self, manager):
+        # Sliding breaks buddy alignment, so only free-list heaps can compact
+        if not isinstance(manager.allocator, FreeListAllocator):
+            raise ValueError("mark_compact needs a free-list allocation policy, "
+                             f"not {manager.allocation_policy}")
+
+    def collect(self, manager) -> CollectionResult:
+        result = CollectionResult(self.name)
+        store = manager.store
+
+        # Mark phase
+        start = time.perf_counter_ns()
+        marked = self.mark(manager)
+        result.objects_marked = int(marked.sum())
+        result.objects_freed = len(marked) - result.objects_marked
+
+        # Compute forwarding addresses with a prefix sum over survivors in
+        # address order
+        forwarded = time.perf_counter_ns()
+        result.bytes_freed = self.release(manager, ~marked, free_blocks=False)
+        addresses = store.column('address')
+        sizes = store.column('size')
+        order = np.argsort(addresses, kind='stable')
+        forwarding = np.empty_like(addresses)
+        forwarding[order] = np.cumsum(sizes[order]) - sizes[order]
+
+        # References hold object ids rather than raw addresses, so updating
+        # them is a no-op; relocation rewrites the address column and leaves
+        # a single hole at the top of the heap
+        relocated = time.perf_counter_ns()
+        moved = forwarding != addresses
+        result.bytes_moved = int(sizes[moved].sum())
+        store.move(np.flatnonzero(moved), forwarding[moved])
+        manager.allocator.reset(forwarding, sizes)
+
+        end = time.perf_counter_ns()
+        result.phase_times = {'mark': forwarded - start,
+                              'forward': relocated - forwarded,
+                              'relocate': end - relocated}
+        return result
+
+
+class CopyingCollector(Collector):
+    """Semispace collector: survivors are evacuated breadth-first into the
+    to-space in Cheney scan order, so tracing and copying only touch live data.
+
+    The allocation policy is ignored; allocation bumps through the from-space.
+    """
+
+    name = 'copying'
+
+    def create_allocator(self, policy: str, total_memory: int) -> Allocator:
+        return SemispaceAllocator(total_memory)
+
+    def collect(self, manager) -> CollectionResult:
+        result = CollectionResult(self.name)
+        store = manager.store
+        allocator = manager.allocator
+
+        # Copy phase: the breadth-first order is the order the scan pointer
+        # would visit objects, so to-space addresses are a prefix sum over it
+        start = time.perf_counter_ns()
+        order = breadth_first_order(store.column('ref_start'), store.column('ref_count'),
+                                    store.ref_buffer, store.slot_of_id,
+                                    store.slots_of(manager.root_objects),
+                                    store.count)
+        sizes = store.column('size')[order]
+        live_bytes = int(sizes.sum())
+        result.objects_marked = len(order)
+        result.objects_freed = store.count - len(order)
+        result.bytes_moved = live_bytes
+        result.bytes_freed = manager.used_memory - live_bytes
+
+        store.evacuate(order, allocator.to_space + np.cumsum(sizes) - sizes)
+        manager.used_memory = live_bytes
+
+        # Flip phase: the whole from-space becomes free at once
+        flipped = time.perf_counter_ns()
+        allocator.flip(live_bytes)
+        result.phase_times = {'copy': flipped - start, 'flip': time.perf_counter_ns() - flipped}
+        return result
+
+
+class GenerationalCollector(Collector):
+    """Nursery plus old generation.
+
+    Minor collections trace only the nursery, starting from young roots and
+    from the remembered set of old objects that may point into it, so their
+    cost follows the nursery size. Survivors slide to the bottom of the
+    nursery and are promoted after promotion_age collections; every
+    full_every-th collection traces the whole heap instead.
+    """
+
+    name = 'generational'
+    marks_heap = True
+
+    def __init__(self, nursery_fraction: float = 0.25, promotion_age: int = 2,
+                 full_every: int = 8):
+        self.nursery_fraction = nursery_fraction
+        self.promotion_age = promotion_age
+        self.full_every = full_every
+        self.young_ids = []
+        # Old objects that may hold references to young objects
+        self.remembered: Set[int] = set()
+        self.collections = 0
+
+    def create_allocator(self, policy: str, total_memory: int) -> Allocator:
+        nursery_size = max(1, int(total_memory * self.nursery_fraction))
+        return GenerationalAllocator(total_memory, nursery_size, policy)
+
+    def on_allocate(self, manager, slots: np.ndarray):
+        store = manager.store
+        young = store.column('address')[slots] < manager.allocator.nursery_size
+        store.column('flags')[slots[young]] |= FLAG_YOUNG
+        self.young_ids.extend(store.column('id')[slots[young]].tolist())
+        if not young.all():
+            # Pretenured objects may already point at young objects
+            self._remember(manager, slots[~young])
+
+    def save_state(self) -> Dict:
+        return {'collections': self.collections}
+
+    def load_state(self, state: Dict):
+        self.collections = state.get('collections', 0)
+
+    def restore(self, manager):
+        store = manager.store
+        young = (store.column('flags') & FLAG_YOUNG) != 0
+        self.young_ids = store.column('id')[young].tolist()
+        self.remembered = set()
+        self._remember(manager, np.flatnonzero(~young))
+
+    def write_barrier(self, manager, source_id: Optional[int], old_target: Optional[int],
+                      new_target: Optional[int]):
+        # Roots are scanned directly, so only heap references need remembering
+        if source_id is None or new_target is None:
+            return
+        store = manager.store
+        flags = store.column('flags')
+        if not flags[store.slot(source_id)] & FLAG_YOUNG and flags[store.slot(new_target)] & FLAG_YOUNG:
+            self.remembered.add(source_id)
+
+    def collect(self, manager) -> CollectionResult:
+        self.collections += 1
+        if self.collections % self.full_every == 0:
+            return self.collect_full(manager)
+        return self.collect_minor(manager)
+
+    def collect_minor(self, manager) -> CollectionResult:
+        result = CollectionResult(self.name, kind='minor')
+        store = manager.store
+        flags = store.column('flags')
+
+        def is_young(slots):
+            return (flags[slots] & FLAG_YOUNG) != 0
+
+        # Mark phase: young roots plus young objects referenced from the
+        # remembered set, never leaving the nursery
+        start = time.perf_counter_ns()
+        young = store.slots_of(self.young_ids)
+        young = young[young >= 0]
+        remembered = store.slots_of(list(self.remembered))
+        remembered = remembered[remembered >= 0]
+        from_old = store.slot_of_id[gather_references(
+            store.column('ref_start'), store.column('ref_count'), store.ref_buffer, remembered)]
+        from_old = from_old[from_old >= 0]
+        roots = np.concatenate([young[(flags[young] & FLAG_ROOT) != 0], from_old[is_young(from_old)]])
+        marked = mark_reachable(store.column('ref_start'), store.column('ref_count'),
+                                store.ref_buffer, store.slot_of_id, roots, store.count,
+                                admit=is_young)
+
+        # Evacuate phase: nursery garbage disappears, survivors move
+        evacuated = time.perf_counter_ns()
+        dead = young[~marked[young]]
+        survivor_ids = store.column('id')[young[marked[young]]]
+        result.objects_marked = len(survivor_ids)
+        result.objects_freed = len(dead)
+        result.bytes_freed = int(store.column('size')[dead].sum())
+        manager.used_memory -= result.bytes_freed
+        store.remove_many(dead)
+        result.bytes_moved = self._evacuate(manager, store.slots_of(survivor_ids))
+
+        result.phase_times = {'mark': evacuated - start,
+                              'evacuate': time.perf_counter_ns() - evacuated}
+        return result
+
+    def collect_full(self, manager) -> CollectionResult:
+        result = CollectionResult(self.name)
+        store = manager.store
+
+        # Mark phase
+        start = time.perf_counter_ns()
+        marked = self.mark(manager)
+        result.objects_marked = int(marked.sum())
+        result.objects_freed = len(marked) - result.objects_marked
+
+        # Sweep phase: old garbage returns its blocks to the old generation
+        swept = time.perf_counter_ns()
+        result.bytes_freed = self.release(manager, ~marked)
+
+        # Evacuate phase
+        evacuated = time.perf_counter_ns()
+        young = store.slots_of(self.young_ids)
+        result.bytes_moved = self._evacuate(manager, young[young >= 0])
+
+        result.phase_times = {'mark': swept - start, 'sweep': evacuated - swept,
+                              'evacuate': time.perf_counter_ns() - evacuated}
+        return result
+
+    def _evacuate(self, manager, survivors: np.ndarray) -> int:
+        # Age the nursery survivors, promote the old enough ones and slide
+        # the rest to the bottom of the nursery. Returns the bytes moved.
+        store = manager.store
+        allocator = manager.allocator
+        ages = store.column('age')
+        flags = store.column('flags')
+        addresses = store.column('address')
+        sizes = store.column('size')
+
+        ages[survivors] = np.minimum(ages[survivors].astype(np.int64) + 1, 255)
+        store.set_flags(survivors, FLAG_REACHABLE)
+        candidates = survivors[ages[survivors] >= self.promotion_age]
+        promoted_addresses = allocator.promote_many(sizes[candidates])
+        promoted = candidates[:len(promoted_addresses)]
+        store.move(promoted, promoted_addresses)
+        flags[promoted] &= ~np.uint8(FLAG_YOUNG)
+        bytes_moved = int(sizes[promoted].sum())
+
+        staying = survivors[~np.isin(survivors, promoted)]
+        staying = staying[np.argsort(addresses[staying], kind='stable')]
+        slid = np.cumsum(sizes[staying]) - sizes[staying]
+        bytes_moved += int(sizes[staying][slid != addresses[staying]].sum())
+        store.move(staying, slid)
+        allocator.reset_nursery(int(sizes[staying].sum()))
+        self.young_ids = store.column('id')[staying].tolist()
+
+        # Promoted objects may still point into the nursery; sources that
+        # no longer do leave the remembered set
+        remembered = store.slots_of(list(self.remembered))
+        self.remembered = set()
+        self._remember(manager, np.concatenate([remembered[remembered >= 0], promoted]))
+        return bytes_moved
+
+    def _remember(self, manager, sources: np.ndarray):
+        # Add every source slot that references a young object
+        store = manager.store
+        counts = store.column('ref_count')[sources].astype(np.int64)
+        owners = np.repeat(sources, counts)
+        targets = store.slot_of_id[gather_references(
+            store.column('ref_start'), store.column('ref_count'), store.ref_buffer, sources)]
+        young = targets >= 0
+        young[young] = (store.column('flags')[targets[young]] & FLAG_YOUNG) != 0
+        self.remembered.update(store.column('id')[np.unique(owners[young])].tolist())
+
+
+class GarbageFirstCollector(Collector):
+    """Region-based collection in the style of G1.
+
+    The heap is a RegionAllocator. Each pause evacuates a collection set of
+    regions: every young region, plus the old regions with the most garbage
+    that the pause time target leaves room for. Survivors are traced from
+    the roots inside the set and from the remembered sets of its regions,
+    which list the objects elsewhere that may reference into them, so a
+    pause does not trace the rest of the heap. Survivors are copied into
+    old regions and the set's regions are freed whole.
+
+    Live bytes per old region come from marking pauses, which trace the whole
+    heap once old regions fill past mark_threshold of it, free the garbage
+    they find and rank the old regions by garbage as candidates for the
+    following mixed pauses. Regions more than live_threshold live are left
+    out. Pause costs are predicted per byte in the collection set and per
+    remembered object scanned, from averages over past pauses, and after
+    each pause the number of young regions the program may fill before the
+    next one is set to what the target allows.
+
+    The allocation policy is ignored.
+    """
+
+    name = 'garbage_first'
+    marks_heap = True
+    # Candidates are spread over at least this many mixed pauses
+    mixed_count_target = 8
+    # Bounds on the share of regions that may be young
+    min_young = 0.05
+    max_young = 0.6
+    # Weight of the previous value in the cost averages
+    history = 0.7
+
+    def __init__(self, pause_target_ms: float = 10.0, region_size: Optional[int] = None,
+                 mark_threshold: float = 0.45, live_threshold: float = 0.85):
+        self.pause_target_ms = pause_target_ms
+        # By default a 256th of the heap, but never too small for typical objects
+        self.region_size = region_size
+        self.mark_threshold = mark_threshold
+        self.live_threshold = live_threshold
+        # Ids of objects outside each region that may reference into it
+        self.remembered: List[Set[int]] = []
+        # Old regions to evacuate, most garbage first, and how many the last
+        # marking found
+        self.candidates: List[int] = []
+        self.candidate_count = 0
+        self.mark_pending = False
+        # Bytes left live by the last marking
+        self.marked_live = 0
+        # Predicted pause cost: nanoseconds per byte in the collection set,
+        # per remembered object scanned and per pause
+        self.ns_per_byte = 0.0
+        self.ns_per_entry = 0.0
+        self.ns_overhead = 0.0
+
+    def create_allocator(self, policy: str, total_memory: int) -> Allocator:
+        region_size = self.region_size or max(total_memory // 256, 128)
+        allocator = RegionAllocator(total_memory, region_size)
+        # Young regions start at their lowest share, until pauses are measured
+        allocator.young_limit = max(1, int(self.min_young * allocator.region_count))
+        self.remembered = [set() for _ in range(allocator.region_count)]
+        return allocator
+
+    def restore(self, manager):
+        store = manager.store
+        self.remembered = [set() for _ in range(manager.allocator.region_count)]
+        self._remember(manager, np.arange(store.count))
+        self.candidates = []
+
+    def on_allocate(self, manager, slots: np.ndarray):
+        # Young objects need no remembering, so only humongous ones do
+        humongous = slots[manager.store.column('size')[slots] > manager.allocator.region_size]
+        if len(humongous):
+            self._remember(manager, humongous)
+
+    def write_barrier(self, manager, source_id: Optional[int], old_target: Optional[int],
+                      new_target: Optional[int]):
+        # Roots are scanned directly, and young regions are in every
+        # collection set, so only references from old objects are remembered
+        if source_id is None or new_target is None:
+            return
+        store = manager.store
+        allocator = manager.allocator
+        addresses = store.column('address')
+        source = allocator.region_of(int(addresses[store.slot(source_id)]))
+        target = allocator.region_of(int(addresses[store.slot(new_target)]))
+        if (source != target and allocator.state[source] != REGION_YOUNG
+                and allocator.state[target] != REGION_HUMONGOUS):
+            self.remembered[target].add(source_id)
+
+    def collect(self, manager) -> CollectionResult:
+        allocator = manager.allocator
+        young = allocator.regions(REGION_YOUNG)
+        if self.mark_pending or not (len(young) or self.candidates):
+            return self.collect_full(manager)
+        free_before = allocator.free_bytes
+        result = self.collect_mixed(manager, young)
+        # Once the candidates run out, the next pause marks the heap if old
+        # regions passed mark_threshold of it and half way from what the
+        # last marking left live to a full heap. So does a pause that left
+        # no more free space than it found.
+        occupied = allocator.total_memory - allocator.free_bytes
+        limit = max(self.mark_threshold * allocator.total_memory,
+                    (self.marked_live + allocator.total_memory) // 2)
+        self.mark_pending = (allocator.free_bytes <= free_before
+                             or (not self.candidates and occupied >= limit))
+        self._size_young(allocator)
+        return result
+
+    def collect_mixed(self, manager, young: np.ndarray) -> CollectionResult:
+        store = manager.store
+        allocator = manager.allocator
+        addresses = store.column('address')
+        sizes = store.column('size')
+        flags = store.column('flags')
+        ids = store.column('id')
+
+        # Select phase: the collection set and the objects in it
+        start = time.perf_counter_ns()
+        old = self._choose_old(manager, young)
+        result = CollectionResult(self.name, kind='mixed' if len(old) else 'minor')
+        collection_set = np.concatenate([young, old])
+        in_set = np.zeros(allocator.region_count, dtype=bool)
+        in_set[collection_set] = True
+        set_bytes = int(allocator.live[collection_set].sum())
+        regions = allocator.region_of(addresses)
+
+        def admit(slots):
+            return in_set[regions[slots]]
+
+        members = np.flatnonzero(in_set[regions])
+
+        # Scan phase: roots in the set, and references into it from
+        # remembered objects outside it
+        scanned = time.perf_counter_ns()
+        remembered = set().union(*(self.remembered[region] for region in collection_set.tolist()))
+        sources = store.slots_of(list(remembered))
+        sources = sources[sources >= 0]
+        sources = sources[~admit(sources)]
+        targets = store.slot_of_id[gather_references(
+            store.column('ref_start'), store.column('ref_count'), store.ref_buffer, sources)]
+        targets = targets[targets >= 0]
+        roots = np.concatenate([members[(flags[members] & FLAG_ROOT) != 0], targets[admit(targets)]])
+
+        # Evacuate phase: survivors are copied in address order; any that
+        # do not fit stay where they are and keep their region
+        evacuated = time.perf_counter_ns()
+        marked = mark_reachable(store.column('ref_start'), store.column('ref_count'),
+                                store.ref_buffer, store.slot_of_id, roots, store.count,
+                                admit=admit)
+        survivors = members[marked[members]]
+        survivors = survivors[np.argsort(addresses[survivors], kind='stable')]
+        dead = members[~marked[members]]
+        moved_from = addresses[survivors]
+        new_addresses = allocator.evacuate_many(sizes[survivors])
+        moved, stuck = survivors[:len(new_addresses)], survivors[len(new_addresses):]
+        store.move(moved, new_addresses)
+        store.set_flags(survivors, FLAG_REACHABLE)
+        result.objects_marked = len(survivors)
+        result.objects_freed = len(dead)
+        result.bytes_freed = int(sizes[dead].sum())
+        result.bytes_moved = int(sizes[moved].sum())
+
+        # Release phase: regions left with stuck survivors become old, the
+        # rest are freed whole
+        released = time.perf_counter_ns()
+        kept = np.unique(regions[stuck])
+        if len(kept):
+            gone = np.concatenate([dead, moved])
+            gone_addresses = np.concatenate([addresses[dead], moved_from[:len(moved)]])
+            left = np.isin(allocator.region_of(gone_addresses), kept)
+            allocator.free_many(gone_addresses[left], sizes[gone][left])
+            allocator.promote(kept)
+        emptied = collection_set[~np.isin(collection_set, kept)]
+        allocator.release(emptied)
+        for region in emptied.tolist():
+            self.remembered[region] = set()
+        # Everything that may now reference across regions from an old one
+        remember = np.concatenate([ids[moved], ids[stuck], ids[sources]])
+        manager.used_memory -= result.bytes_freed
+        if len(dead) > store.count // 8:
+            # Most young objects die, and dropping them in one pass is then
+            # cheaper than swapping each out
+            keep = np.ones(store.count, dtype=bool)
+            keep[dead] = False
+            store.retain(keep)
+        else:
+            store.remove_many(dead)
+        self._remember(manager, store.slots_of(remember))
+        end = time.perf_counter_ns()
+
+        result.phase_times = {'select': scanned - start, 'scan': evacuated - scanned,
+                              'evacuate': released - evacuated, 'release': end - released}
+        if remembered:
+            self.ns_per_entry = self._average(self.ns_per_entry, (evacuated - scanned) / len(remembered))
+        if set_bytes:
+            self.ns_per_byte = self._average(self.ns_per_byte, (end - evacuated) / set_bytes)
+        self.ns_overhead = self._average(self.ns_overhead, scanned - start)
+        return result
+
+    def collect_full(self, manager) -> CollectionResult:
+        result = CollectionResult(self.name)
+        store = manager.store
+        allocator = manager.allocator
+
+        # Mark phase
+        start = time.perf_counter_ns()
+        allocator.retire()
+        marked = self.mark(manager)
+        result.objects_marked = int(marked.sum())
+        result.objects_freed = len(marked) - result.objects_marked
+
+        # Sweep phase: regions with nothing live are freed, and every region
+        # left is old, its live bytes now known
+        swept = time.perf_counter_ns()
+        result.bytes_freed = self.release(manager, ~marked)
+        allocator.promote(allocator.regions(REGION_YOUNG))
+
+        # Remember phase: the remembered sets are rebuilt from live objects
+        # only, and the old regions ranked by garbage
+        remembered = time.perf_counter_ns()
+        self.remembered = [set() for _ in range(allocator.region_count)]
+        self._remember(manager, np.arange(store.count))
+        old = allocator.regions(REGION_OLD)
+        garbage = allocator.capacity[old] - allocator.live[old]
+        eligible = allocator.live[old] <= self.live_threshold * allocator.capacity[old]
+        order = np.argsort(-garbage[eligible], kind='stable')
+        self.candidates = old[eligible][order].tolist()
+        self.candidate_count = len(self.candidates)
+        self.marked_live = manager.used_memory
+        self.mark_pending = False
+        end = time.perf_counter_ns()
+
+        # Until pauses have been measured, marking's cost per live byte and
+        # per reference stands in for evacuation's
+        if not self.ns_per_byte and manager.used_memory:
+            self.ns_per_byte = (swept - start) / manager.used_memory
+        if not self.ns_per_entry and store.ref_live:
+            self.ns_per_entry = (swept - start) / store.ref_live
+        result.phase_times = {'mark': swept - start, 'sweep': remembered - swept,
+                              'remember': end - remembered}
+        self._size_young(allocator)
+        return result
+
+    def _choose_old(self, manager, young: np.ndarray) -> np.ndarray:
+        # Take candidates in order while the predicted pause stays within the
+        # target and their survivors fit, but at least a share of them
+        allocator = manager.allocator
+        live = allocator.live
+        budget = (self.pause_target_ms * 1e6 - self.ns_overhead
+                  - sum(self._cost(allocator, region) for region in young.tolist()))
+        room = allocator.evacuation_room() - int(live[young].sum())
+        minimum = -(-self.candidate_count // self.mixed_count_target)
+        chosen = []
+        while self.candidates:
+            region = self.candidates[0]
+            if allocator.state[region] != REGION_OLD:
+                # Freed since the marking
+                self.candidates.pop(0)
+                continue
+            cost = self._cost(allocator, region)
+            if live[region] > room or (len(chosen) >= minimum and cost > budget):
+                break
+            chosen.append(self.candidates.pop(0))
+            budget -= cost
+            room -= int(live[region])
+        return np.asarray(chosen, dtype=np.int64)
+
+    def _size_young(self, allocator):
+        # As many young regions as a pause can evacuate within the target
+        # once the overhead is paid, assuming they are full
+        region_ns = self.ns_per_byte * allocator.region_size
+        regions = ((self.pause_target_ms * 1e6 - self.ns_overhead) / region_ns
+                   if region_ns else allocator.region_count)
+        lowest = max(1, int(self.min_young * allocator.region_count))
+        allocator.young_limit = int(min(max(regions, lowest), self.max_young * allocator.region_count))
+
+    def _cost(self, allocator, region: int) -> float:
+        return (self.ns_per_byte * int(allocator.live[region])
+                + self.ns_per_entry * len(self.remembered[region]))
+
+    def _average(self, previous: float, sample: float) -> float:
+        return sample if not previous else self.history * previous + (1 - self.history) * sample
+
+    def _remember(self, manager, sources: np.ndarray):
+        # Add every old or humongous source slot to the remembered sets of the
+        # other regions it references, except humongous ones, which never move
+        store = manager.store
+        allocator = manager.allocator
+        addresses = store.column('address')
+        sources = sources[sources >= 0]
+        sources = sources[allocator.state[allocator.region_of(addresses[sources])] != REGION_YOUNG]
+        counts = store.column('ref_count')[sources].astype(np.int64)
+        owners = np.repeat(sources, counts)
+        targets = store.slot_of_id[gather_references(
+            store.column('ref_start'), store.column('ref_count'), store.ref_buffer, sources)]
+        found = targets >= 0
+        owners, targets = owners[found], targets[found]
+        owner_regions = allocator.region_of(addresses[owners])
+        target_regions = allocator.region_of(addresses[targets])
+        cross = ((owner_regions != target_regions)
+                 & (allocator.state[target_regions] != REGION_HUMONGOUS))
+        if not cross.any():
+            return
+        # Group the distinct (region, source id) pairs by region; sorting
+        # and dropping repeats is much cheaper than np.unique here
+        stride = int(store.column('id').max()) + 1
+        pairs = np.sort(target_regions[cross] * stride + store.column('id')[owners[cross]])
+        pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])]
+        regions, source_ids = pairs // stride, pairs % stride
+        bounds = np.flatnonzero(np.diff(regions)) + 1
+        for group in np.split(np.arange(len(pairs)), bounds):
+            self.remembered[int(regions[group[0]])].update(source_ids[group].tolist())
+
+
+class ReferenceCountingCollector(Collector):
+    """Reference counting with deferred decrements and synchronous cycle
+    collection after Bacon and Rajan.
+
+    An object's count is the number of references to it plus one if it is a
+    root. Increments are applied as soon as a reference or root is added.
+    Decrements are logged and applied in batches; every object whose count
+    reaches zero is freed then, and its own references are decremented in
+    turn. New objects that nobody references are kept in a zero count table
+    and freed at the next batch unless something references them by then.
+
+    Objects whose count dropped without reaching zero, and zero count table
+    entries that gained a reference, are candidate roots of garbage cycles.
+    collect() runs trial deletion over the subgraph reachable from the
+    candidates: it removes the references inside the subgraph from a copy of
+    the counts, keeps whatever is still referenced from outside and
+    everything that reaches, and frees the rest.
+    """
+
+    name = 'ref_counting'
+    # Logged decrements, or new unreferenced objects, that trigger a batch
+    batch_size = 4096
+
+    def __init__(self):
+        self.decrements: List[int] = []
+        self.zero_count_table: List[int] = []
+        self.candidates: Set[int] = set()
+        # Reclaimed by batches since the last collect(), reported by it
+        self.objects_freed = 0
+        self.bytes_freed = 0
+        self.pauses: List[int] = []
+
+    def on_allocate(self, manager, slots: np.ndarray):
+        store = manager.store
+        counts = store.column('rc')
+        targets = store.slot_of_id[gather_references(
+            store.column('ref_start'), store.column('ref_count'), store.ref_buffer, slots)]
+        np.add.at(counts, targets[targets >= 0], 1)
+        counts[slots] += (store.column('flags')[slots] & FLAG_ROOT) != 0
+        self.zero_count_table.extend(store.column('id')[slots[counts[slots] == 0]].tolist())
+        if len(self.zero_count_table) >= self.batch_size:
+            self.flush(manager)
+
+    def restore(self, manager):
+        # Decrements still logged when the snapshot was taken are lost, so
+        # the counts are recounted from the references and roots. Any object
+        # may then be part of a garbage cycle.
+        store = manager.store
+        targets = store.slot_of_id[gather_references(
+            store.column('ref_start'), store.column('ref_count'), store.ref_buffer,
+            np.arange(store.count))]
+        counts = store.column('rc')
+        counts[:] = np.bincount(targets[targets >= 0], minlength=store.count)
+        counts += (store.column('flags') & FLAG_ROOT) != 0
+        self.decrements = []
+        self.zero_count_table = store.column('id')[counts == 0].tolist()
+        self.candidates = set(store.column('id')[counts > 0].tolist())
+
+    def write_barrier(self, manager, source_id: Optional[int], old_target: Optional[int],
+                      new_target: Optional[int]):
+        if new_target is not None:
+            manager.store.column('rc')[manager.store.slot(new_target)] += 1
+        if old_target is not None:
+            self.decrements.append(old_target)
+            if len(self.decrements) >= self.batch_size:
+                self.flush(manager)
+
+    def flush(self, manager):
+        """Apply the logged decrements and free every object left unreferenced"""
+        start = time.perf_counter_ns()
+        store = manager.store
+        counts = store.column('rc')
+        decremented = store.slots_of(self.decrements)
+        unreferenced = store.slots_of(self.zero_count_table)
+        unreferenced = unreferenced[unreferenced >= 0]
+        self.decrements = []
+        self.zero_count_table = []
+        self.candidates.update(store.column('id')[unreferenced[counts[unreferenced] > 0]].tolist())
+
+        dead = self._cascade(manager, decremented[decremented >= 0],
+                             unreferenced[counts[unreferenced] == 0])
+        self._reclaim(manager, dead)
+        self.pauses.append(time.perf_counter_ns() - start)
+
+    def collect(self, manager) -> CollectionResult:
+        result = CollectionResult(self.name)
+        start = time.perf_counter_ns()
+        self.flush(manager)
+
+        # Cycle collection
+        traced = time.perf_counter_ns()
+        store = manager.store
+        counts = store.column('rc')
+        starts, ref_counts = store.column('ref_start'), store.column('ref_count')
+        candidates = store.slots_of(np.fromiter(self.candidates, dtype=np.int64,
+                                                count=len(self.candidates)))
+        self.candidates = set()
+        candidates = candidates[candidates >= 0]
+        subgraph = mark_reachable(starts, ref_counts, store.ref_buffer, store.slot_of_id,
+                                  candidates, store.count)
+        members = np.flatnonzero(subgraph)
+        # Trial deletion: drop every reference made from inside the subgraph
+        inside = store.slot_of_id[gather_references(starts, ref_counts, store.ref_buffer, members)]
+        inside = inside[inside >= 0]
+        trial = counts.copy()
+        np.subtract.at(trial, inside, 1)
+        external = members[trial[members] > 0]
+        live = mark_reachable(starts, ref_counts, store.ref_buffer, store.slot_of_id,
+                              external, store.count, admit=lambda slots: subgraph[slots])
+        garbage = np.flatnonzero(subgraph & ~live)
+        # References from the garbage into live objects go away with it
+        targets = store.slot_of_id[gather_references(starts, ref_counts, store.ref_buffer, garbage)]
+        targets = targets[targets >= 0]
+        targets = targets[live[targets]]
+        counts[garbage] = -1
+        dead = self._cascade(manager, targets, np.empty(0, dtype=np.int64))
+        self._reclaim(manager, np.concatenate([garbage, dead]))
+        end = time.perf_counter_ns()
+
+        result.objects_marked = len(members)
+        result.objects_freed, result.bytes_freed = self.objects_freed, self.bytes_freed
+        result.phase_times = {'decrement': traced - start, 'cycles': end - traced}
+        self.pauses[-1] = end - start
+        result.pauses = self.pauses
+        self.objects_freed = self.bytes_freed = 0
+        self.pauses = []
+        store.mark_all_reachable()
+        return result
+
+    def _cascade(self, manager, decremented: np.ndarray, zero: np.ndarray) -> np.ndarray:
+        """Apply decrements to the given slots and return every slot that
+        becomes dead, following the references of dead slots transitively"""
+        store = manager.store
+        counts = store.column('rc')
+        dead = []
+        while len(decremented) or len(zero):
+            np.subtract.at(counts, decremented, 1)
+            hit = np.unique(decremented)
+            self.candidates.update(store.column('id')[hit[counts[hit] > 0]].tolist())
+            zero = np.unique(np.concatenate([zero, hit[counts[hit] == 0]]))
+            # Dead slots get a negative count so they are never freed twice
+            counts[zero] = -1
+            dead.append(zero)
+            decremented = store.slot_of_id[gather_references(
+                store.column('ref_start'), store.column('ref_count'), store.ref_buffer, zero)]
+            decremented = decremented[decremented >= 0]
+            zero = np.empty(0, dtype=np.int64)
+        return np.concatenate(dead) if dead else np.empty(0, dtype=np.int64)
+
+    def _reclaim(self, manager, dead: np.ndarray):
+        store = manager.store
+        sizes = store.column('size')[dead]
+        manager.allocator.free_many(store.column('address')[dead], sizes)
+        manager.used_memory -= int(sizes.sum())
+        self.objects_freed += len(dead)
+        self.bytes_freed += int(sizes.sum())
+        store.remove_many(dead)
+
+
+COLLECTORS = {
+    collector.name: collector
+    for collector in (MarkSweepCollector, LazySweepCollector, IncrementalCollector,
+                      MarkCompactCollector, CopyingCollector, GenerationalCollector,
+                      GarbageFirstCollector, ReferenceCountingCollector)
+}
+
+
+def make_collector(collector: Union[str, Collector], workers: int = 1) -> Collector:
+    """The collector named collector, whose full-heap marks run in a pool of
+    workers processes when workers is more than 1. A collector instance is
+    returned as it is."""
+    if isinstance(collector, Collector):
+        return collector
+    try:
+        collector = COLLECTORS[collector]()
+    except KeyError:
+        raise ValueError(f"Unknown collector: {collector}") from None
+    if workers > 1:
+        if not collector.marks_heap:
+            raise ValueError(f"{collector.name} does not mark the whole heap, so cannot use workers")
+        collector.marker = ParallelMarker(workers)
+    return collector
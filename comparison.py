@@ -0,0 +1,272 @@
+"""Side-by-side comparison of MemoryManager configurations on one workload.
+
+Every configuration (a collector, an allocation policy and a GC trigger)
+runs the same seeded workload or recorded trace in its own process of a
+ProcessPoolExecutor. Each run samples the heap at the same points of the
+workload's progress, so the time series of occupancy, external and internal
+fragmentation and pauses line up across configurations. Run as a script to compare every
+combination of the given collectors, policies and triggers, for example:
+
+    python comparison.py --workload churn --objects 200000 --heap-size 400000 \
+        --collectors mark_sweep copying garbage_first --policies first_fit best_fit
+    python comparison.py --trace power_law.trace --collectors mark_sweep copying
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import CancelledError, Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from allocation_trace import TraceReader, replay
+from benchmark import WORKLOADS
+from gc_stats import GCStats
+from memory_manager import MemoryManager
+
+
+@dataclass(frozen=True)
+class Configuration:
+    collector: str = 'mark_sweep'
+    allocation_policy: str = 'first_fit'
+    # Name of a GC trigger, or None to collect only when the heap is full
+    trigger: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.collector}/{self.allocation_policy}" + (f"/{self.trigger}" if self.trigger else '')
+
+
+def _empty() -> np.ndarray:
+    return np.empty(0)
+
+
+@dataclass
+class ComparisonResult:
+    configuration: Configuration
+    # Workload progress at each sample: objects offered by a seeded
+    # workload, or records replayed from a trace. Every configuration of a
+    # comparison samples at the same points, up to where it was exhausted.
+    progress: np.ndarray = field(default_factory=_empty)
+    # Percent of the heap in use at each sample
+    occupancy: np.ndarray = field(default_factory=_empty)
+    # External fragmentation in percent at each sample
+    fragmentation: np.ndarray = field(default_factory=_empty)
+    # Internal fragmentation in percent at each sample
+    internal_fragmentation: np.ndarray = field(default_factory=_empty)
+    # Longest pause in milliseconds since the previous sample, 0 if none
+    pause_ms: np.ndarray = field(default_factory=_empty)
+    collections: int = 0
+    gc_seconds: float = 0.0
+    pause_ms_max: float = 0.0
+    # Wall time of the whole run
+    seconds: float = 0.0
+    # True if the heap filled with live objects before the workload ended
+    exhausted: bool = False
+    # Why the configuration could not run, such as mark_compact on a buddy heap
+    error: Optional[str] = None
+
+    def to_json(self) -> Dict:
+        return {
+            'collector': self.configuration.collector,
+            'allocation_policy': self.configuration.allocation_policy,
+            'trigger': self.configuration.trigger,
+            'progress': self.progress.tolist(),
+            'occupancy': self.occupancy.tolist(),
+            'fragmentation': self.fragmentation.tolist(),
+            'internal_fragmentation': self.internal_fragmentation.tolist(),
+            'pause_ms': self.pause_ms.tolist(),
+            'collections': self.collections,
+            'gc_seconds': self.gc_seconds,
+            'pause_ms_max': self.pause_ms_max,
+            'seconds': self.seconds,
+            'exhausted': self.exhausted,
+            'error': self.error,
+        }
+
+
+# In the worker processes of spawn_executor, the event that cancels the
+# configurations running in them
+_cancel = None
+
+
+def _watch(cancel):
+    global _cancel
+    _cancel = cancel
+
+
+class _Sampler:
+    """Records the manager's state each time the workload reaches a sample
+    point"""
+
+    def __init__(self, manager: MemoryManager):
+        self.manager = manager
+        self.rows: List[tuple] = []
+        self.collections_seen = 0
+
+    def sample(self, progress: int):
+        if _cancel is not None and _cancel.is_set():
+            raise CancelledError
+        manager = self.manager
+        stats = manager.stats
+        pauses = [pause for record in itertools.islice(stats.records, self.collections_seen, None)
+                  for pause in record.pause_times()]
+        self.collections_seen = stats.collections
+        self.rows.append((progress, manager.used_memory / manager.total_memory * 100,
+                          manager.fragmentation(), manager.internal_fragmentation(),
+                          max(pauses, default=0) / 1e6))
+
+
+def run_configuration(configuration: Configuration, heap_size: int, workload: str = 'churn',
+                      objects: int = 100_000, seed: int = 0, trace_path: Optional[str] = None,
+                      samples: int = 200) -> ComparisonResult:
+    """Run one configuration on a seeded workload, or on the trace at
+    trace_path if given, sampling the heap samples times along the way.
+
+    A seeded workload is offered in samples equal batches and sampled after
+    each; like run_benchmark, the heap is collected whenever a batch does not
+    fit, and objects that still do not fit are dropped. A trace is replayed
+    in samples equal chunks of records.
+    """
+    start = time.perf_counter()
+    result = ComparisonResult(configuration)
+    try:
+        manager = MemoryManager(heap_size, seed=seed,
+                                allocation_policy=configuration.allocation_policy,
+                                collector=configuration.collector, trigger=configuration.trigger)
+    except ValueError as error:
+        result.error = str(error)
+        return result
+    # Every collection is sampled here, wherever it was started
+    stats = manager.stats = GCStats(window=None)
+    sampler = _Sampler(manager)
+
+    if trace_path is not None:
+        trace = TraceReader(trace_path)
+        replayed = replay(trace, manager, chunk_records=max(1, -(-len(trace) // samples)),
+                          progress=sampler.sample)
+        result.exhausted = replayed.exhausted
+    else:
+        model = WORKLOADS[workload](seed)
+        batch_size = max(1, -(-objects // samples))
+        offered = 0
+        while offered < objects:
+            requested = min(batch_size, objects - offered)
+            count = model.step(manager, requested)
+            offered += requested
+            if count < requested:
+                collection = manager.run_garbage_collection()
+                if count == 0 and collection.kind == 'full' and not collection.objects_freed:
+                    result.exhausted = True
+                    break
+            sampler.sample(offered)
+
+    if sampler.rows:
+        progress, occupancy, fragmentation, internal, pause_ms = (np.array(column)
+                                                                  for column in zip(*sampler.rows))
+        result.progress = progress.astype(np.int64)
+        result.occupancy, result.fragmentation, result.pause_ms = occupancy, fragmentation, pause_ms
+        result.internal_fragmentation = internal
+    result.collections = stats.collections
+    result.gc_seconds = stats.total_ns / 1e9
+    result.pause_ms_max = max(stats.pauses(), default=0) / 1e6
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def compare(configurations: Sequence[Configuration], heap_size: int, workload: str = 'churn',
+            objects: int = 100_000, seed: int = 0, trace_path: Optional[str] = None,
+            samples: int = 200, workers: Optional[int] = None,
+            executor: Optional[Executor] = None) -> List[ComparisonResult]:
+    """Run every configuration on the same workload concurrently, in up to
+    workers processes, and return the results in the configurations' order.
+
+    Worker processes are spawned rather than forked, so comparisons can be
+    started from threaded programs like the GUI. Given an executor, such as
+    one from spawn_executor, the configurations run in it instead, and
+    CancelledError is raised if the caller cancels them.
+    """
+    if executor is not None:
+        return _run_all(executor, configurations, heap_size, workload, objects, seed,
+                        trace_path, samples)
+    workers = min(len(configurations), workers or os.cpu_count() or 1)
+    if not workers:
+        return []
+    with spawn_executor(workers) as pool:
+        return _run_all(pool, configurations, heap_size, workload, objects, seed,
+                        trace_path, samples)
+
+
+def spawn_executor(workers: Optional[int] = None, cancel=None) -> ProcessPoolExecutor:
+    """Process pool whose workers are spawned, for compare. Setting cancel,
+    an Event of the spawn context, stops the configurations running in the
+    pool at their next sample; shutting the pool down with cancel_futures
+    drops the ones still queued."""
+    return ProcessPoolExecutor(workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_watch, initargs=(cancel,))
+
+
+def _run_all(executor: Executor, configurations: Sequence[Configuration], *args) -> List[ComparisonResult]:
+    futures = [executor.submit(run_configuration, configuration, *args)
+               for configuration in configurations]
+    return [future.result() for future in futures]
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    import argparse
+
+    from allocators import ALLOCATORS
+    from collectors import COLLECTORS
+    from gc_triggers import TRIGGERS
+
+    parser = argparse.ArgumentParser(description="Compare MemoryManager configurations "
+                                                 "on one workload, in parallel")
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), default='churn')
+    parser.add_argument('--trace', help="replay this allocation trace instead of a workload")
+    parser.add_argument('--objects', type=int, default=100_000)
+    parser.add_argument('--heap-size', type=int,
+                        help="defaults to 400000, or the recorded heap size of a trace")
+    parser.add_argument('--collectors', nargs='+', choices=sorted(COLLECTORS), default=['mark_sweep'])
+    parser.add_argument('--policies', nargs='+', choices=sorted(ALLOCATORS), default=['first_fit'])
+    parser.add_argument('--triggers', nargs='+', choices=['none', *sorted(TRIGGERS)], default=['none'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--workers', type=int, help="defaults to the number of CPUs")
+    parser.add_argument('--output', help="write the results and their time series as JSON to this file")
+    args = parser.parse_args(argv)
+
+    heap_size = args.heap_size or (TraceReader(args.trace).total_memory if args.trace else 400_000)
+    configurations = [Configuration(collector, policy, None if trigger == 'none' else trigger)
+                      for collector, policy, trigger in itertools.product(
+                          args.collectors, args.policies, args.triggers)]
+    start = time.perf_counter()
+    results = compare(configurations, heap_size, args.workload, args.objects, args.seed,
+                      args.trace, args.samples, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'configuration':<40}{'GCs':>6}{'GC s':>8}{'max ms':>8}{'mean used %':>12}"
+          f"{'mean frag %':>12}{'mean int %':>11}{'run s':>8}")
+    for result in results:
+        if result.error is not None:
+            print(f"skipped {result.configuration.label}: {result.error}", file=sys.stderr)
+            continue
+        print(f"{result.configuration.label:<40}{result.collections:>6}{result.gc_seconds:>8.3f}"
+              f"{result.pause_ms_max:>8.2f}{result.occupancy.mean() if len(result.progress) else 0:>12.1f}"
+              f"{result.fragmentation.mean() if len(result.progress) else 0:>12.1f}"
+              f"{result.internal_fragmentation.mean() if len(result.progress) else 0:>11.1f}"
+              f"{result.seconds:>8.2f}{'  exhausted' if result.exhausted else ''}")
+    print(f"{len(results)} configurations in {elapsed:.2f} s")
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'heap_size': heap_size, 'workload': None if args.trace else args.workload,
+                       'trace': args.trace, 'objects': args.objects, 'seed': args.seed,
+                       'results': [result.to_json() for result in results]}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
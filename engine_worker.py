@@ -0,0 +1,226 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import CancelledError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from benchmark import ChurnWorkload
+from comparison import compare, spawn_executor
+from gc_triggers import make_trigger
+from heap_snapshot import load_snapshot, save_snapshot
+from memory_manager import MemoryManager
+from visualization import MemoryVisualizer
+
+
+class EngineWorker(QObject):
+    """Owns the MemoryManager and runs every engine operation on the thread it
+    is moved to.
+
+    The GUI drives it through queued signals and asks for the heap's state
+    with request_snapshot, which answers through snapshot_ready only if
+    anything changed since the last one. However many operations run in
+    between, the GUI sees at most one state per request. The state holds the
+    census, the page table and the visualizer's bounded view of the objects
+    rather than a copy of the heap, so what a frame copies does not grow
+    with the heap.
+    """
+
+    snapshot_ready = pyqtSignal(dict)
+    message = pyqtSignal(str)
+    # Continuous allocation stopped because the heap is full of live objects
+    continuous_stopped = pyqtSignal()
+
+    # Continuous allocation runs in slices of this many milliseconds, between
+    # which the worker handles the GUI's signals
+    slice_ms = 10
+    # Objects allocated per workload step in continuous allocation
+    batch_size = 16
+
+    def __init__(self, total_memory: int, trigger: Optional[str] = None):
+        super().__init__()
+        # Name of the GC trigger each new manager gets, None for none; an
+        # empty name is none too, as in set_trigger
+        self.trigger = trigger or None
+        self.manager = MemoryManager(total_memory=total_memory, collect_stats=True,
+                                     trigger=self.trigger)
+        self.dirty = True
+        self.workload = None
+        # Created on first use so that it belongs to the worker's thread
+        self.timer = None
+
+    @pyqtSlot('qint64')
+    def allocate(self, size: int):
+        self.dirty = True
+        if not self.manager.allocate_object(size):
+            # A trigger may have collected before giving up; show that first
+            # so its report does not replace the message
+            self.request_snapshot()
+            self.message.emit("Failed to allocate memory: Memory full!")
+
+    @pyqtSlot()
+    def collect(self):
+        self.manager.run_garbage_collection()
+        self.dirty = True
+
+    @pyqtSlot()
+    def clear(self):
+        self.start_over(self.manager.total_memory)
+        self.message.emit("Memory cleared successfully")
+
+    @pyqtSlot('qint64')
+    def resize(self, total_memory: int):
+        """Start over with an empty heap of total_memory bytes"""
+        self.start_over(total_memory)
+        self.message.emit("Heap resized; memory cleared")
+
+    def start_over(self, total_memory: int):
+        # Reinitialize the memory manager with the same configuration
+        manager = self.manager
+        self.manager = MemoryManager(
+            total_memory=total_memory,
+            allocation_policy=manager.allocation_policy,
+            collector=manager.collector.name,
+            collect_stats=True,
+            trigger=self.trigger)
+        manager.close()
+        if self.workload is not None:
+            self.workload.roots.clear()
+        self.dirty = True
+
+    @pyqtSlot(str)
+    def save(self, path: str):
+        try:
+            save_snapshot(self.manager, path)
+        except (OSError, ValueError) as error:
+            self.message.emit(f"Failed to save heap: {error}")
+            return
+        self.message.emit(f"Heap saved to {path}")
+
+    @pyqtSlot(str)
+    def load(self, path: str):
+        try:
+            manager = load_snapshot(path).restore(collect_stats=True, trigger=self.trigger)
+        except (OSError, ValueError) as error:
+            self.message.emit(f"Failed to load heap: {error}")
+            return
+        self.manager.close()
+        self.manager = manager
+        if self.workload is not None:
+            self.workload.roots.clear()
+        self.dirty = True
+        self.message.emit(f"Heap loaded from {path}")
+
+    @pyqtSlot(str)
+    def set_trigger(self, trigger: str):
+        """Let the manager collect on its own with the named trigger, or only
+        when asked if the name is empty"""
+        self.trigger = trigger or None
+        self.manager.trigger = make_trigger(self.trigger)
+
+    @pyqtSlot(bool, 'qint64')
+    def set_continuous(self, enabled: bool, max_size: int):
+        """Start or stop allocating objects of up to max_size as fast as the
+        engine allows, collecting whenever the heap is full"""
+        if self.timer is None:
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.allocate_slice)
+        if enabled:
+            # Objects only reference others of their batch and roots are
+            # dropped as new ones arrive, so the live set stays small and the
+            # heap reaches a steady state instead of filling up
+            self.workload = ChurnWorkload(seed=int(time.time()), root_probability=0.05,
+                                          live_roots=8, max_size=max_size)
+            self.timer.start(0)
+        else:
+            self.timer.stop()
+            self.workload = None
+
+    @pyqtSlot()
+    def allocate_slice(self):
+        deadline = time.perf_counter() + self.slice_ms / 1000
+        manager = self.manager
+        while time.perf_counter() < deadline:
+            allocated = self.workload.step(manager, self.batch_size)
+            if allocated == self.batch_size:
+                continue
+            result = manager.run_garbage_collection()
+            if not allocated and result.kind == 'full' and not result.objects_freed:
+                self.set_continuous(False, 0)
+                # Show the final state before the message, so the message
+                # is not replaced by the last collection's report
+                self.dirty = True
+                self.request_snapshot()
+                self.message.emit("Continuous allocation stopped: Memory full!")
+                self.continuous_stopped.emit()
+                break
+        self.dirty = True
+
+    @pyqtSlot()
+    def request_snapshot(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        state = self.manager.get_memory_state()
+        state.update(MemoryVisualizer.heap_view(state.pop('store'), state['total_memory']))
+        stats = self.manager.stats
+        state['collections'] = stats.collections
+        state['last_collection'] = stats.last if stats.collections else None
+        state['max_pause'] = stats.max_pause()
+        self.snapshot_ready.emit(state)
+
+
+class ComparisonWorker(QObject):
+    """Runs strategy comparisons on the thread it is moved to, so the GUI
+    stays responsive while the configurations run in worker processes.
+
+    The worker processes are started with the first comparison and kept for
+    the next ones until close, which may be called from any thread and
+    stops a running comparison at the configurations' next samples.
+    """
+
+    finished = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._closed = False
+        self._cancel = multiprocessing.get_context('spawn').Event()
+
+    @pyqtSlot(dict)
+    def run(self, options: dict):
+        """Run comparison.compare with options and report its results"""
+        try:
+            results = compare(executor=self._pool(), **options)
+        except BrokenProcessPool as error:
+            with self._lock:
+                self._executor = None
+            self.failed.emit(f"Comparison failed: {error}")
+            return
+        except (CancelledError, RuntimeError):
+            # Closed while the comparison ran
+            return
+        except (OSError, ValueError) as error:
+            self.failed.emit(f"Comparison failed: {error}")
+            return
+        self.finished.emit(results)
+
+    def close(self):
+        """Cancel the running comparison and shut the worker processes down"""
+        with self._lock:
+            self._closed = True
+            self._cancel.set()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _pool(self):
+        with self._lock:
+            if self._closed:
+                raise CancelledError
+            if self._executor is None:
+                self._executor = spawn_executor(cancel=self._cancel)
+            return self._executor
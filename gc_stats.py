@@ -0,0 +1,79 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from collectors import CollectionResult
+
+# Histogram bucket k counts durations in [2**k, 2**(k+1)) nanoseconds
+BUCKETS = 64
+
+
+def _bucket(duration_ns: int) -> int:
+    return min(max(int(duration_ns), 1).bit_length() - 1, BUCKETS - 1)
+
+
+class GCStats:
+    """Rolling statistics over the last window collections, or all of them
+    when window is None.
+
+    Histograms of pause times and of each phase's time are updated as
+    collections are added and evicted, so every query is cheap however many
+    collections have run. Totals cover every collection ever added.
+    """
+
+    def __init__(self, window: Optional[int] = 1024):
+        self.records: Deque[CollectionResult] = deque(maxlen=window)
+        self.pause_histogram = np.zeros(BUCKETS, dtype=np.int64)
+        self.phase_histograms: Dict[str, np.ndarray] = {}
+        self.collections = 0
+        self.total_ns = 0
+        self.total_objects_freed = 0
+        self.total_bytes_freed = 0
+
+    def add(self, result: CollectionResult):
+        if len(self.records) == self.records.maxlen:
+            self._count(self.records[0], -1)
+        self.records.append(result)
+        self._count(result, 1)
+        self.collections += 1
+        self.total_ns += result.wall_time
+        self.total_objects_freed += result.objects_freed
+        self.total_bytes_freed += result.bytes_freed
+
+    @property
+    def last(self) -> CollectionResult:
+        return self.records[-1]
+
+    def pauses(self) -> List[int]:
+        """Every pause in the window, in nanoseconds"""
+        return [pause for record in self.records for pause in record.pause_times()]
+
+    def pause_percentile(self, q: float) -> float:
+        """The q-th percentile pause of the window in nanoseconds"""
+        pauses = self.pauses()
+        return float(np.percentile(pauses, q)) if pauses else 0.0
+
+    def max_pause(self) -> int:
+        return max(self.pauses(), default=0)
+
+    def summary(self) -> Dict[str, float]:
+        pauses = self.pauses()
+        p50, p90, p99 = np.percentile(pauses, [50, 90, 99]).tolist() if pauses else (0, 0, 0)
+        return {
+            'collections': self.collections,
+            'total_ms': self.total_ns / 1e6,
+            'objects_freed': self.total_objects_freed,
+            'bytes_freed': self.total_bytes_freed,
+            'pause_ms_p50': p50 / 1e6,
+            'pause_ms_p90': p90 / 1e6,
+            'pause_ms_p99': p99 / 1e6,
+            'pause_ms_max': max(pauses, default=0) / 1e6,
+        }
+
+    def _count(self, result: CollectionResult, sign: int):
+        for pause in result.pause_times():
+            self.pause_histogram[_bucket(pause)] += sign
+        for phase, duration in result.phase_times.items():
+            histogram = self.phase_histograms.setdefault(phase, np.zeros(BUCKETS, dtype=np.int64))
+            histogram[_bucket(duration)] += sign
@@ -0,0 +1,163 @@
+"""Policies that decide when a MemoryManager collects on its own.
+
+A manager with a trigger asks it before every allocation whether to collect
+first, and when an allocation still does not fit it collects and retries
+once before failing. Every collection, whether the trigger started it or
+not, is reported back so that the trigger can plan the next one.
+
+Occupancy is the heap's used memory less the garbage a collector has found
+but not freed yet, such as lazy_sweep's unswept objects.
+"""
+import time
+from typing import Optional, Union
+
+from collectors import CollectionResult
+
+
+def occupancy(manager) -> int:
+    return manager.used_memory - manager.collector.pending_bytes
+
+
+def live_bytes(result: CollectionResult) -> int:
+    """Bytes a collection left live, whether or not it freed the rest yet"""
+    return max(result.used_before - result.bytes_freed, 0)
+
+
+class Trigger:
+    name = ''
+
+    def should_collect(self, manager, size: int) -> bool:
+        """Whether to collect before allocating size more bytes"""
+        raise NotImplementedError
+
+    def on_collection(self, manager, result: CollectionResult):
+        """Called after every collection, once the manager has filled in result"""
+
+
+class OccupancyTrigger(Trigger):
+    """Collects once occupancy would pass threshold of the heap.
+
+    When a collection leaves more than that live, the next one waits until
+    occupancy is half way from there to a full heap, so a large live set
+    does not collect on every allocation.
+    """
+
+    name = 'occupancy'
+
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self.limit: Optional[int] = None
+
+    def should_collect(self, manager, size: int) -> bool:
+        if self.limit is None:
+            self.limit = int(self.threshold * manager.total_memory)
+        return occupancy(manager) + size > self.limit
+
+    def on_collection(self, manager, result: CollectionResult):
+        total = manager.total_memory
+        self.limit = max(int(self.threshold * total), (live_bytes(result) + total) // 2)
+
+
+class AllocationBudgetTrigger(Trigger):
+    """Collects after every budget share of the heap has been allocated"""
+
+    name = 'budget'
+
+    def __init__(self, budget: float = 0.25):
+        self.budget = budget
+        self.allocated_at = 0
+
+    def should_collect(self, manager, size: int) -> bool:
+        spent = manager.bytes_allocated - self.allocated_at
+        return spent > 0 and spent + size > self.budget * manager.total_memory
+
+    def on_collection(self, manager, result: CollectionResult):
+        self.allocated_at = manager.bytes_allocated
+
+
+class PacerTrigger(Trigger):
+    """Go-style pacing: the next collection starts once occupancy reaches a
+    goal set after each collection.
+
+    The goal lets the heap grow gogc percent above what the last collection
+    left live, and further if that is needed to keep collecting to at most
+    gc_fraction of the time. For the latter the pacer measures the
+    allocation rate between collections, the share of newly allocated bytes
+    that survives them and the cost of a collection per live byte, and
+    predicts the next collection's cost from the live bytes it will find.
+    The goal never drops below min_heap of the heap nor rises above the
+    whole heap. gogc=None turns the growth target off and gc_fraction=None
+    the cost target, leaving collection to allocations that do not fit.
+    """
+
+    name = 'pacer'
+
+    def __init__(self, gogc: Optional[float] = 100, gc_fraction: Optional[float] = 0.25,
+                 min_heap: float = 0.125):
+        self.gogc = gogc
+        self.gc_fraction = gc_fraction
+        self.min_heap = min_heap
+        self.goal: Optional[int] = None
+        # Measured at the last collection
+        self.live = 0
+        self.survival = 1.0
+        self.allocation_rate = 0.0
+        self.ns_per_live_byte = 0.0
+        self._allocated_at = 0
+        self._finished_at: Optional[int] = None
+
+    def should_collect(self, manager, size: int) -> bool:
+        if self.goal is None:
+            self.goal = self._goal(manager)
+        return occupancy(manager) + size > self.goal
+
+    def on_collection(self, manager, result: CollectionResult):
+        now = time.perf_counter_ns()
+        live = live_bytes(result)
+        allocated = manager.bytes_allocated - self._allocated_at
+        if allocated > 0:
+            self.survival = min(max(live - self.live, 0) / allocated, 1.0)
+            if self._finished_at is not None:
+                mutator_ns = now - result.wall_time - self._finished_at
+                if mutator_ns > 0:
+                    self.allocation_rate = allocated / mutator_ns
+        self.ns_per_live_byte = result.wall_time / max(live, self.min_heap * manager.total_memory)
+        self.live = live
+        self._allocated_at = manager.bytes_allocated
+        self._finished_at = now
+        self.goal = self._goal(manager)
+
+    def _goal(self, manager) -> int:
+        total = manager.total_memory
+        headroom = 0.0
+        if self.gogc is None and self.gc_fraction is None:
+            headroom = total
+        if self.gogc is not None:
+            headroom = self.live * self.gogc / 100
+        if self.gc_fraction is not None and self.allocation_rate:
+            # Allocating headroom bytes takes headroom / rate, and the next
+            # collection costs ns_per_live_byte * (live + survival * headroom);
+            # the headroom that makes that gc_fraction of the time is where
+            # the two lines meet
+            pace = self.allocation_rate * (1 - self.gc_fraction) / self.gc_fraction
+            growth = pace * self.ns_per_live_byte * self.survival
+            if growth >= 1:
+                headroom = total
+            else:
+                headroom = max(headroom, pace * self.ns_per_live_byte * self.live / (1 - growth))
+        return int(min(max(self.live + headroom, self.min_heap * total), total))
+
+
+TRIGGERS = {
+    trigger.name: trigger
+    for trigger in (OccupancyTrigger, AllocationBudgetTrigger, PacerTrigger)
+}
+
+
+def make_trigger(trigger: Union[str, Trigger, None]) -> Optional[Trigger]:
+    if trigger is None or isinstance(trigger, Trigger):
+        return trigger
+    try:
+        return TRIGGERS[trigger]()
+    except KeyError:
+        raise ValueError(f"Unknown GC trigger: {trigger}") from None
@@ -0,0 +1,217 @@
+"""Binary snapshots of a MemoryManager's heap.
+
+A snapshot is an 8-byte magic, the length of a JSON header, the header and
+then one raw array per object column plus the references and roots, each
+aligned to 64 bytes. The header also holds the manager's counters and the
+collector's save_state(). Columns are written straight from the object store's
+buffers, and loading memory-maps them, so opening a snapshot takes the same
+time however large the heap is. restore() turns a snapshot back into a
+manager that carries on where the saved one stopped.
+
+Run as a script to describe a snapshot or compare two:
+
+    python heap_snapshot.py info before.heap
+    python heap_snapshot.py diff before.heap after.heap
+"""
+import json
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from gc_triggers import Trigger
+from marking import gather_references
+from memory_manager import MemoryManager, RootSet
+
+MAGIC = b'GCHEAP01'
+ALIGNMENT = 64
+
+# Object store columns saved; ref_start is implied by ref_count because the
+# references are saved in slot order
+COLUMNS = ('id', 'size', 'address', 'flags', 'ref_count', 'age', 'rc', 'epoch')
+
+
+def save_snapshot(manager: MemoryManager, path: str):
+    """Write the manager's heap to path"""
+    if not manager.is_done():
+        raise ValueError("Cannot snapshot a heap while a collection is in progress")
+    store = manager.store
+    starts, counts = store.column('ref_start'), store.column('ref_count').astype(np.int64)
+    packed = np.cumsum(counts) - counts
+    if store.ref_used == store.ref_live and np.array_equal(starts, packed):
+        references = store.ref_buffer[:store.ref_used]
+    else:
+        references = gather_references(starts, counts, store.ref_buffer, np.arange(store.count))
+    arrays = {name: store.column(name) for name in COLUMNS}
+    arrays['references'] = references
+    arrays['roots'] = np.asarray(manager.root_objects, dtype=np.int64)
+
+    # Offsets are relative to the first array, which follows the header
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        layout[name] = {'dtype': values.dtype.str, 'offset': offset, 'length': len(values)}
+        offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({
+        'total_memory': manager.total_memory,
+        'used_memory': manager.used_memory,
+        'next_id': manager.next_id,
+        'bytes_allocated': manager.bytes_allocated,
+        'allocation_policy': manager.allocation_policy,
+        'collector': manager.collector.name,
+        'collector_state': manager.collector.save_state(),
+        'arrays': layout,
+    }).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    with open(path, 'wb') as snapshot:
+        snapshot.write(MAGIC + np.int64(len(header)).tobytes() + header)
+        for name, values in arrays.items():
+            snapshot.seek(data_start + layout[name]['offset'])
+            snapshot.write(np.ascontiguousarray(values).data)
+        snapshot.truncate(data_start + offset)
+
+
+class HeapSnapshot:
+    """Memory-mapped view of a snapshot file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as snapshot:
+            start = snapshot.read(len(MAGIC) + 8)
+            if len(start) < len(MAGIC) + 8 or start[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a heap snapshot")
+            header_size = int(np.frombuffer(start, dtype='<i8', offset=len(MAGIC))[0])
+            header = json.loads(snapshot.read(header_size))
+        self.path = path
+        self.total_memory: int = header['total_memory']
+        self.used_memory: int = header['used_memory']
+        self.next_id: int = header['next_id']
+        self.bytes_allocated: int = header.get('bytes_allocated', 0)
+        self.allocation_policy: str = header['allocation_policy']
+        self.collector: str = header['collector']
+        self.collector_state: Dict = header.get('collector_state', {})
+        data_start = -(-(len(MAGIC) + 8 + header_size) // ALIGNMENT) * ALIGNMENT
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            if spec['length']:
+                self.arrays[name] = np.memmap(path, dtype=dtype, mode='r', shape=(spec['length'],),
+                                              offset=data_start + spec['offset'])
+            else:
+                # Empty arrays cannot be mapped
+                self.arrays[name] = np.empty(0, dtype=dtype)
+
+    @property
+    def count(self) -> int:
+        return len(self.arrays['id'])
+
+    @property
+    def references(self) -> np.ndarray:
+        return self.arrays['references']
+
+    @property
+    def roots(self) -> np.ndarray:
+        return self.arrays['roots']
+
+    def column(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def edges(self):
+        """Source and target ids of every reference"""
+        return np.repeat(self.column('id'), self.column('ref_count')), self.references
+
+    def restore(self, seed: Optional[int] = None, collect_stats: bool = False,
+                trigger: Union[str, Trigger, None] = None) -> MemoryManager:
+        """A new manager holding this heap, with the saved configuration"""
+        manager = MemoryManager(self.total_memory, seed=seed,
+                                allocation_policy=self.allocation_policy,
+                                collector=self.collector, collect_stats=collect_stats,
+                                trigger=trigger)
+        store = manager.store
+        store.append_many(self.column('id'), self.column('size'), self.column('address'),
+                          self.column('flags'), self.column('ref_count'), self.references)
+        # Snapshots from before the epoch column leave it at zero
+        for name in ('age', 'rc', 'epoch'):
+            if name in self.arrays:
+                store.column(name)[:] = self.column(name)
+        manager.used_memory = self.used_memory
+        manager.next_id = self.next_id
+        manager.bytes_allocated = self.bytes_allocated
+        manager.root_objects = RootSet(self.roots.tolist())
+        manager.allocator.reset(store.column('address'), store.column('size'))
+        manager.collector.load_state(self.collector_state)
+        manager.collector.restore(manager)
+        return manager
+
+
+def load_snapshot(path: str) -> HeapSnapshot:
+    return HeapSnapshot(path)
+
+
+@dataclass
+class SnapshotDiff:
+    # Ids of objects only in the later snapshot
+    allocated: np.ndarray
+    # Ids of objects only in the earlier snapshot
+    freed: np.ndarray
+    # Ids of objects in both snapshots at different addresses
+    moved: np.ndarray
+    edges_added: int
+    edges_removed: int
+    roots_added: np.ndarray
+    roots_removed: np.ndarray
+
+
+def diff_snapshots(before: HeapSnapshot, after: HeapSnapshot) -> SnapshotDiff:
+    """What changed from one snapshot to a later one of the same heap"""
+    before_ids, after_ids = before.column('id'), after.column('id')
+    common, in_before, in_after = np.intersect1d(before_ids, after_ids, assume_unique=True,
+                                                 return_indices=True)
+    moved = common[before.column('address')[in_before] != after.column('address')[in_after]]
+
+    # Each reference is keyed by its source and target id; a pair may occur
+    # more than once, so edges are compared as multisets
+    stride = max(before.next_id, after.next_id)
+    before_sources, before_targets = before.edges()
+    after_sources, after_targets = after.edges()
+    keys = np.concatenate([before_sources * stride + before_targets,
+                           after_sources * stride + after_targets])
+    signs = np.concatenate([np.full(len(before_targets), -1), np.ones(len(after_targets))])
+    _, inverse = np.unique(keys, return_inverse=True)
+    net = np.bincount(inverse, weights=signs).astype(np.int64)
+
+    return SnapshotDiff(
+        allocated=np.setdiff1d(after_ids, before_ids, assume_unique=True),
+        freed=np.setdiff1d(before_ids, after_ids, assume_unique=True),
+        moved=moved,
+        edges_added=int(net[net > 0].sum()),
+        edges_removed=int(-net[net < 0].sum()),
+        roots_added=np.setdiff1d(after.roots, before.roots),
+        roots_removed=np.setdiff1d(before.roots, after.roots))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Describe or compare heap snapshots")
+    commands = parser.add_subparsers(dest='command', required=True)
+    info = commands.add_parser('info', help="describe a snapshot")
+    info.add_argument('snapshot')
+    diff = commands.add_parser('diff', help="compare a snapshot with a later one")
+    diff.add_argument('before')
+    diff.add_argument('after')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        snapshot = load_snapshot(args.snapshot)
+        print(f"{snapshot.collector} collector, {snapshot.allocation_policy} allocation")
+        print(f"heap {snapshot.total_memory}, used {snapshot.used_memory}")
+        print(f"{snapshot.count} objects, {len(snapshot.references)} references, "
+              f"{len(snapshot.roots)} roots")
+    else:
+        result = diff_snapshots(load_snapshot(args.before), load_snapshot(args.after))
+        print(f"allocated {len(result.allocated)}")
+        print(f"freed     {len(result.freed)}")
+        print(f"moved     {len(result.moved)}")
+        print(f"edges     +{result.edges_added} -{result.edges_removed}")
+        print(f"roots     +{len(result.roots_added)} -{len(result.roots_removed)}")
@@ -1,13 +1,49 @@
 import sys
+import time
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QPushButton, QLabel, QSpinBox, QGroupBox,
-                           QFrame, QComboBox, QProgressBar)
-from PyQt5.QtCore import Qt
+                           QFrame, QComboBox, QProgressBar, QFileDialog, QTabWidget,
+                           QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont, QPalette, QColor
-from memory_manager import MemoryManager
-from visualization import MemoryVisualizer
+from allocation_trace import TraceReader
+from allocators import ALLOCATORS
+from benchmark import WORKLOADS
+from collectors import COLLECTORS
+from comparison import Configuration
+from engine_worker import ComparisonWorker, EngineWorker
+from visualization import ComparisonPanel, MemoryVisualizer, format_size
 
 class MainWindow(QMainWindow):
+    # Requests to the engine worker, which runs them on its own thread
+    # Sizes are in bytes, which need more than a C int
+    allocate_requested = pyqtSignal('qint64')
+    collect_requested = pyqtSignal()
+    clear_requested = pyqtSignal()
+    save_requested = pyqtSignal(str)
+    load_requested = pyqtSignal(str)
+    continuous_toggled = pyqtSignal(bool, 'qint64')
+    heap_size_changed = pyqtSignal('qint64')
+    trigger_changed = pyqtSignal(str)
+    snapshot_requested = pyqtSignal()
+    comparison_requested = pyqtSignal(dict)
+
+    # The display asks the worker for the heap's state at most this often
+    frame_ms = 33
+    # GC triggers offered, by the name gc_triggers knows them by; manual
+    # leaves collection to the button and full heaps
+    triggers = {"Manual": '', "Occupancy": 'occupancy', "Allocation Budget": 'budget',
+                "Pacer": 'pacer'}
+    # Heap sizes offered, in bytes
+    heap_sizes = {"1 GB": 1 << 30, "4 GB": 4 << 30, "16 GB": 16 << 30, "64 GB": 64 << 30}
+    # Object size units, as powers of two of a byte
+    units = {"KB": 10, "MB": 20, "GB": 30}
+    # Workload box entry that replays a recorded trace instead
+    trace_item = "Trace File..."
+    # Checked at first in the comparison's collector and policy lists
+    compared_collectors = ('mark_sweep', 'copying', 'garbage_first')
+    compared_policies = ('first_fit',)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Garbage Collection Visualization")
@@ -81,6 +117,25 @@ class MainWindow(QMainWindow):
                 background-color: #4CAF50;
                 border-radius: 4px;
             }
+            QListWidget {
+                background-color: #3b3b3b;
+                color: #ffffff;
+                border: 1px solid #5a5a5a;
+                border-radius: 3px;
+            }
+            QTabWidget::pane {
+                border: none;
+            }
+            QTabBar::tab {
+                background-color: #3b3b3b;
+                color: #ffffff;
+                padding: 6px 15px;
+                border-top-left-radius: 5px;
+                border-top-right-radius: 5px;
+            }
+            QTabBar::tab:selected {
+                background-color: #4a4a4a;
+            }
         """)
         
         # Create central widget and main layout
@@ -127,9 +182,9 @@ class MainWindow(QMainWindow):
         
         # Create memory stats layout
         memory_stats_layout = QHBoxLayout()
-        self.total_memory_label = QLabel("Total Memory: 0 MB")
-        self.used_memory_label = QLabel("Used Memory: 0 MB")
-        self.free_memory_label = QLabel("Free Memory: 0 MB")
+        self.total_memory_label = QLabel("Total Memory: 0 B")
+        self.used_memory_label = QLabel("Used Memory: 0 B")
+        self.free_memory_label = QLabel("Free Memory: 0 B")
         
         for label in [self.total_memory_label, self.used_memory_label, self.free_memory_label]:
             label.setStyleSheet("""
@@ -159,7 +214,8 @@ class MainWindow(QMainWindow):
         self.size_spinbox.setSuffix(" MB")
         
         self.unit_combo = QComboBox()
-        self.unit_combo.addItems(["MB", "GB"])
+        self.unit_combo.addItems(list(self.units))
+        self.unit_combo.setCurrentText("MB")
         self.unit_combo.currentTextChanged.connect(self.update_size_range)
         
         size_layout.addWidget(size_label)
@@ -171,11 +227,26 @@ class MainWindow(QMainWindow):
         preset_layout = QHBoxLayout()
         preset_label = QLabel("Preset Sizes:")
         self.preset_combo = QComboBox()
-        self.preset_combo.addItems(["Custom", "Small (10 MB)", "Medium (100 MB)", "Large (500 MB)", "Huge (1 GB)"])
+        self.preset_combo.addItems(["Custom", "Tiny (64 KB)", "Small (10 MB)", "Medium (100 MB)", "Large (500 MB)", "Huge (1 GB)"])
         self.preset_combo.currentTextChanged.connect(self.apply_preset)
         
         preset_layout.addWidget(preset_label)
         preset_layout.addWidget(self.preset_combo)
+
+        trigger_label = QLabel("GC Trigger:")
+        self.trigger_combo = QComboBox()
+        self.trigger_combo.addItems(list(self.triggers))
+        self.trigger_combo.setCurrentText("Manual")
+        self.trigger_combo.currentTextChanged.connect(self.change_trigger)
+        preset_layout.addWidget(trigger_label)
+        preset_layout.addWidget(self.trigger_combo)
+
+        heap_label = QLabel("Heap Size:")
+        self.heap_combo = QComboBox()
+        self.heap_combo.addItems(list(self.heap_sizes))
+        self.heap_combo.currentTextChanged.connect(self.change_heap_size)
+        preset_layout.addWidget(heap_label)
+        preset_layout.addWidget(self.heap_combo)
         preset_layout.addStretch()
         
         # Create buttons with icons
@@ -220,9 +291,30 @@ class MainWindow(QMainWindow):
             }
         """)
         
+        self.continuous_button = QPushButton("Continuous Allocation")
+        self.continuous_button.setCheckable(True)
+        self.continuous_button.setStyleSheet("""
+            QPushButton {
+                background-color: #9C27B0;
+            }
+            QPushButton:hover {
+                background-color: #8E24AA;
+            }
+            QPushButton:checked {
+                background-color: #6A1B9A;
+            }
+        """)
+
         button_layout.addWidget(self.add_button)
         button_layout.addWidget(self.gc_button)
         button_layout.addWidget(self.clear_button)
+        button_layout.addWidget(self.continuous_button)
+
+        # Heap snapshots
+        self.save_button = QPushButton("Save Heap")
+        self.load_button = QPushButton("Load Heap")
+        button_layout.addWidget(self.save_button)
+        button_layout.addWidget(self.load_button)
         button_layout.addStretch()
         
         control_layout.addLayout(size_layout)
@@ -233,7 +325,10 @@ class MainWindow(QMainWindow):
         
         # Create visualization
         self.visualizer = MemoryVisualizer()
-        main_layout.addWidget(self.visualizer)
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.visualizer, "Heap")
+        self.tabs.addTab(self.create_comparison_tab(), "Compare Strategies")
+        main_layout.addWidget(self.tabs)
         
         # Add status label
         self.status_label = QLabel("Ready")
@@ -249,30 +344,183 @@ class MainWindow(QMainWindow):
         """)
         main_layout.addWidget(self.status_label)
         
-        # Initialize memory manager
-        self.memory_manager = MemoryManager(total_memory=1024)  # 1GB total memory
-        
+        # The memory manager lives on a worker thread, so the window stays
+        # responsive during long collections
+        self.worker = EngineWorker(total_memory=self.heap_sizes[self.heap_combo.currentText()],
+                                   trigger=self.triggers[self.trigger_combo.currentText()])
+        self.worker_thread = QThread(self)
+        self.worker.moveToThread(self.worker_thread)
+        self.allocate_requested.connect(self.worker.allocate)
+        self.collect_requested.connect(self.worker.collect)
+        self.clear_requested.connect(self.worker.clear)
+        self.save_requested.connect(self.worker.save)
+        self.load_requested.connect(self.worker.load)
+        self.continuous_toggled.connect(self.worker.set_continuous)
+        self.trigger_changed.connect(self.worker.set_trigger)
+        self.heap_size_changed.connect(self.worker.resize)
+        self.snapshot_requested.connect(self.worker.request_snapshot)
+        self.worker.snapshot_ready.connect(self.show_snapshot)
+        self.worker.message.connect(self.status_label.setText)
+        self.worker.continuous_stopped.connect(lambda: self.continuous_button.setChecked(False))
+        self.worker_thread.start()
+        # The collection last reported in the status label
+        self.collection_shown = None
+
+        # Comparisons get their own thread, so the engine keeps running
+        # while the worker processes do
+        self.comparison_worker = ComparisonWorker()
+        self.comparison_thread = QThread(self)
+        self.comparison_worker.moveToThread(self.comparison_thread)
+        self.comparison_requested.connect(self.comparison_worker.run)
+        self.comparison_worker.finished.connect(self.show_comparison)
+        self.comparison_worker.failed.connect(self.comparison_failed)
+        self.comparison_thread.start()
+        # Trace the workload box replays, and when the running comparison began
+        self.comparison_trace = None
+        self.comparison_started = 0.0
+
         # Connect signals
         self.add_button.clicked.connect(self.add_object)
         self.gc_button.clicked.connect(self.run_garbage_collection)
         self.clear_button.clicked.connect(self.clear_memory)
-        
-        # Update initial state
-        self.update_memory_info()
-        self.update_visualization()
+        self.continuous_button.toggled.connect(self.toggle_continuous)
+        self.save_button.clicked.connect(self.save_heap)
+        self.load_button.clicked.connect(self.load_heap)
+
+        # However many operations run, the display is redrawn at most once
+        # per frame with the latest state
+        self.frame_timer = QTimer(self)
+        self.frame_timer.timeout.connect(self.snapshot_requested)
+        self.frame_timer.start(self.frame_ms)
+
+    def create_comparison_tab(self):
+        """Controls for running one workload against several collectors and
+        allocation policies at once, above the plots of the results"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+
+        # Workload, object count and heap size side by side, then the
+        # collectors and policies to run it against
+        workload_layout = QHBoxLayout()
+        workload_layout.addWidget(QLabel("Workload:"))
+        self.workload_combo = QComboBox()
+        self.workload_combo.addItems([*sorted(WORKLOADS), self.trace_item])
+        self.workload_combo.currentTextChanged.connect(self.choose_workload)
+        workload_layout.addWidget(self.workload_combo)
+        workload_layout.addWidget(QLabel("Objects:"))
+        self.compare_objects_spinbox = QSpinBox()
+        self.compare_objects_spinbox.setRange(1000, 10_000_000)
+        self.compare_objects_spinbox.setSingleStep(10_000)
+        self.compare_objects_spinbox.setValue(100_000)
+        workload_layout.addWidget(self.compare_objects_spinbox)
+        workload_layout.addWidget(QLabel("Heap Size (units):"))
+        self.compare_heap_spinbox = QSpinBox()
+        self.compare_heap_spinbox.setRange(1000, 2_000_000_000)
+        self.compare_heap_spinbox.setSingleStep(100_000)
+        self.compare_heap_spinbox.setValue(400_000)
+        workload_layout.addWidget(self.compare_heap_spinbox)
+        workload_layout.addStretch()
+        layout.addLayout(workload_layout)
+
+        controls = QHBoxLayout()
+        self.collector_list = self.checklist(sorted(COLLECTORS), self.compared_collectors)
+        self.policy_list = self.checklist(sorted(ALLOCATORS), self.compared_policies)
+        for label, checklist in (("Collectors:", self.collector_list),
+                                 ("Policies:", self.policy_list)):
+            controls.addWidget(QLabel(label), alignment=Qt.AlignTop)
+            controls.addWidget(checklist)
+
+        self.compare_button = QPushButton("Compare")
+        self.compare_button.clicked.connect(self.compare_strategies)
+        controls.addWidget(self.compare_button, alignment=Qt.AlignBottom)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        self.comparison_panel = ComparisonPanel()
+        layout.addWidget(self.comparison_panel)
+        return tab
+
+    def checklist(self, names, checked):
+        checklist = QListWidget()
+        checklist.setMaximumHeight(80)
+        for name in names:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if name in checked else Qt.Unchecked)
+            checklist.addItem(item)
+        return checklist
+
+    def checked(self, checklist):
+        return [checklist.item(row).text() for row in range(checklist.count())
+                if checklist.item(row).checkState() == Qt.Checked]
+
+    def choose_workload(self, name):
+        if name != self.trace_item:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Replay Trace", "", "Allocation traces (*.trace)")
+        try:
+            trace = TraceReader(path) if path else None
+        except (OSError, ValueError) as error:
+            self.status_label.setText(f"Failed to open trace: {error}")
+            trace = None
+        if trace is None:
+            self.workload_combo.setCurrentIndex(0)
+            return
+        self.comparison_trace = path
+        # Replays start at the recorded heap size
+        self.compare_heap_spinbox.setValue(min(trace.total_memory, self.compare_heap_spinbox.maximum()))
+        self.status_label.setText(f"Comparisons replay {path} ({len(trace)} records)")
+
+    def compare_strategies(self):
+        configurations = [Configuration(collector, policy)
+                          for collector in self.checked(self.collector_list)
+                          for policy in self.checked(self.policy_list)]
+        if not configurations:
+            self.status_label.setText("Pick at least one collector and one allocation policy to compare")
+            return
+        workload = self.workload_combo.currentText()
+        self.compare_button.setEnabled(False)
+        self.comparison_started = time.perf_counter()
+        self.status_label.setText(f"Comparing {len(configurations)} configurations...")
+        self.comparison_requested.emit({
+            'configurations': configurations,
+            'heap_size': self.compare_heap_spinbox.value(),
+            'workload': workload if workload != self.trace_item else 'churn',
+            'objects': self.compare_objects_spinbox.value(),
+            'trace_path': self.comparison_trace if workload == self.trace_item else None,
+        })
+
+    def show_comparison(self, results):
+        self.compare_button.setEnabled(True)
+        replayed = self.workload_combo.currentText() == self.trace_item
+        self.comparison_panel.show_results(results, "Trace records replayed" if replayed
+                                           else "Objects offered")
+        ran = [result for result in results if result.error is None]
+        message = (f"Compared {len(ran)} configurations in "
+                   f"{time.perf_counter() - self.comparison_started:.1f} s")
+        if ran:
+            best = min(ran, key=lambda result: result.pause_ms_max)
+            message += f"; shortest longest pause: {best.configuration.label} ({best.pause_ms_max:.2f} ms)"
+        if len(ran) < len(results):
+            message += f"; {len(results) - len(ran)} could not run"
+        self.status_label.setText(message)
+
+    def comparison_failed(self, message):
+        self.compare_button.setEnabled(True)
+        self.status_label.setText(message)
 
     def update_size_range(self, unit):
-        if unit == "MB":
-            self.size_spinbox.setRange(1, 1000)
-            self.size_spinbox.setSuffix(" MB")
-        else:
+        if unit == "GB":
             self.size_spinbox.setRange(1, 10)
-            self.size_spinbox.setSuffix(" GB")
+        else:
+            self.size_spinbox.setRange(1, 1000)
+        self.size_spinbox.setSuffix(f" {unit}")
 
     def apply_preset(self, preset):
         if preset == "Custom":
             return
         size_map = {
+            "Tiny (64 KB)": (64, "KB"),
             "Small (10 MB)": (10, "MB"),
             "Medium (100 MB)": (100, "MB"),
             "Large (500 MB)": (500, "MB"),
@@ -282,33 +530,52 @@ class MainWindow(QMainWindow):
         self.unit_combo.setCurrentText(unit)
         self.size_spinbox.setValue(size)
 
+    def object_size(self):
+        """The chosen object size in bytes"""
+        return self.size_spinbox.value() << self.units[self.unit_combo.currentText()]
+
     def add_object(self):
-        size = self.size_spinbox.value()
-        if self.unit_combo.currentText() == "GB":
-            size *= 1024  # Convert GB to MB
-        if self.memory_manager.allocate_object(size):
-            self.update_memory_info()
-            self.update_visualization()
-        else:
-            # Show error message if memory allocation fails
-            self.status_label.setText("Failed to allocate memory: Memory full!")
+        self.allocate_requested.emit(self.object_size())
 
     def run_garbage_collection(self):
-        self.memory_manager.run_garbage_collection()
-        self.update_memory_info()
-        self.update_visualization()
+        self.collect_requested.emit()
 
     def clear_memory(self):
-        # Reinitialize the memory manager with the same total memory
-        total_memory = self.memory_manager.total_memory
-        self.memory_manager = MemoryManager(total_memory=total_memory)
-        self.update_memory_info()
-        self.update_visualization()
-        self.status_label.setText("Memory cleared successfully")
-
-    def update_memory_info(self):
-        total_memory = self.memory_manager.total_memory
-        used_memory = self.memory_manager.used_memory
+        self.clear_requested.emit()
+
+    def save_heap(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Heap", "", "Heap snapshots (*.heap)")
+        if path:
+            self.save_requested.emit(path)
+
+    def load_heap(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load Heap", "", "Heap snapshots (*.heap)")
+        if path:
+            self.load_requested.emit(path)
+
+    def change_trigger(self, name):
+        self.trigger_changed.emit(self.triggers[name])
+
+    def change_heap_size(self, name):
+        self.heap_size_changed.emit(self.heap_sizes[name])
+
+    def toggle_continuous(self, enabled):
+        self.continuous_toggled.emit(enabled, self.object_size())
+
+    def show_snapshot(self, memory_state):
+        result = memory_state['last_collection']
+        if result is not None and result is not self.collection_shown:
+            self.collection_shown = result
+            self.status_label.setText(
+                f"GC #{memory_state['collections']}: pause {max(result.pause_times()) / 1e6:.2f} ms, "
+                f"reclaimed {self.format_size(result.bytes_freed)} in {result.objects_freed} objects "
+                f"(longest recent pause {memory_state['max_pause'] / 1e6:.2f} ms)")
+        self.update_memory_info(memory_state)
+        self.update_visualization(memory_state)
+
+    def update_memory_info(self, memory_state):
+        total_memory = memory_state['total_memory']
+        used_memory = memory_state['used_memory']
         free_memory = total_memory - used_memory
         
         self.total_memory_label.setText(f"Total Memory: {self.format_size(total_memory)}")
@@ -318,19 +585,22 @@ class MainWindow(QMainWindow):
         usage_percentage = (used_memory / total_memory) * 100
         self.memory_progress.setValue(int(usage_percentage))
 
-    def update_visualization(self):
-        memory_state = {
-            'total_memory': self.memory_manager.total_memory,
-            'used_memory': self.memory_manager.used_memory,
-            'objects': self.memory_manager.objects,
-            'root_objects': self.memory_manager.root_objects
-        }
+    def update_visualization(self, memory_state):
         self.visualizer.update_visualization(memory_state)
 
-    def format_size(self, size_mb):
-        if size_mb >= 1024:
-            return f"{size_mb/1024:.1f} GB"
-        return f"{size_mb} MB"
+    def closeEvent(self, event):
+        self.frame_timer.stop()
+        self.worker_thread.quit()
+        self.worker_thread.wait()
+        # Cancel a running comparison, so that waiting for its thread does
+        # not wait for the comparison to finish
+        self.comparison_worker.close()
+        self.comparison_thread.quit()
+        self.comparison_thread.wait()
+        super().closeEvent(event)
+
+    def format_size(self, size):
+        return format_size(size)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -0,0 +1,122 @@
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+
+def gather_references(starts: np.ndarray, counts: np.ndarray, targets: np.ndarray,
+                      frontier: np.ndarray) -> np.ndarray:
+    """Return the concatenated reference runs of every slot in frontier"""
+    run_starts = starts[frontier]
+    run_counts = counts[frontier].astype(np.int64)
+    total = int(run_counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=targets.dtype)
+    # Each gathered edge sits at its run start plus its position within the run
+    run_base = np.repeat(run_starts - (np.cumsum(run_counts) - run_counts), run_counts)
+    return targets[run_base + np.arange(total)]
+
+
+def unique_in_order(slots: np.ndarray, scratch: np.ndarray) -> np.ndarray:
+    """Deduplicate slots in linear time, keeping first occurrences in order"""
+    positions = np.arange(slots.size)
+    # Which write lands when a slot repeats is unspecified, so each slot's
+    # entry is lowered until no occurrence comes before it. Writing in
+    # reverse usually leaves nothing to lower, and sorting to find first
+    # occurrences would make marking much slower.
+    scratch[slots[::-1]] = positions[::-1]
+    while True:
+        earlier = positions < scratch[slots]
+        if not earlier.any():
+            break
+        scratch[slots[earlier]] = positions[earlier]
+    return slots[scratch[slots] == positions]
+
+
+# Below this many queued slots the trace walks one slot at a time: each
+# breadth-first level costs a round of numpy calls whatever its width, which
+# dominates on deep, narrow graphs such as long linked lists
+NARROW_FRONTIER = 64
+
+
+def _frontiers(starts: np.ndarray, counts: np.ndarray, targets: np.ndarray,
+               slot_of_id: np.ndarray, roots: np.ndarray, marked: np.ndarray,
+               admit: Optional[Callable[[np.ndarray], np.ndarray]] = None):
+    # Yields runs of slots in breadth-first order, each after marking it
+    roots = np.asarray(roots, dtype=np.int64)
+    roots = roots[roots >= 0]
+    if len(marked) == 0 or roots.size == 0:
+        return
+    scratch = np.empty(len(marked), dtype=np.int64)
+
+    # Slots are marked as they are queued, so the queue never repeats one
+    frontier = unique_in_order(roots, scratch)
+    marked[frontier] = True
+    while frontier.size:
+        if frontier.size < NARROW_FRONTIER:
+            visited, frontier = walk_queue(starts, counts, targets, slot_of_id, frontier, marked, admit)
+            yield visited
+            continue
+        yield frontier
+        candidates = slot_of_id[gather_references(starts, counts, targets, frontier)]
+        candidates = candidates[candidates >= 0]
+        candidates = candidates[~marked[candidates]]
+        if admit is not None:
+            candidates = candidates[admit(candidates)]
+        frontier = unique_in_order(candidates, scratch)
+        marked[frontier] = True
+
+
+def walk_queue(starts: np.ndarray, counts: np.ndarray, targets: np.ndarray, slot_of_id: np.ndarray,
+               queue: np.ndarray, marked: np.ndarray,
+               admit: Optional[Callable[[np.ndarray], np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Scan queued slots one at a time, first in first out, until the queue
+    is empty or NARROW_FRONTIER long. Returns the slots scanned and the
+    queue left, which together continue the breadth-first order."""
+    queue = deque(queue.tolist())
+    visited = []
+    # item() reads a scalar as a Python number without making a numpy one
+    start_of, count_of, target_at = starts.item, counts.item, targets.item
+    slot_of, is_marked = slot_of_id.item, marked.item
+    while queue and len(queue) < NARROW_FRONTIER:
+        slot = queue.popleft()
+        visited.append(slot)
+        start = start_of(slot)
+        for position in range(start, start + count_of(slot)):
+            child = slot_of(target_at(position))
+            if child < 0 or is_marked(child):
+                continue
+            if admit is not None and not admit(np.array([child]))[0]:
+                continue
+            marked[child] = True
+            queue.append(child)
+    return np.array(visited, dtype=np.int64), np.array(queue, dtype=np.int64)
+
+
+def mark_reachable(starts: np.ndarray, counts: np.ndarray, targets: np.ndarray,
+                   slot_of_id: np.ndarray, roots: np.ndarray, num_slots: int,
+                   admit: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> np.ndarray:
+    """Mark every slot reachable from roots and return the mark bitmap.
+
+    targets holds object ids and slot_of_id maps them to slots (-1 for objects
+    that no longer exist). admit, when given, filters which slots the trace
+    may enter. Marking walks the graph one frontier at a time with an
+    explicit worklist, so the cost is linear in the slots and edges visited
+    and there is no recursion. Narrow frontiers are walked one slot at a
+    time, so deep chains do not pay a round of numpy calls per link.
+    """
+    marked = np.zeros(num_slots, dtype=bool)
+    for _ in _frontiers(starts, counts, targets, slot_of_id, roots, marked, admit):
+        pass
+    return marked
+
+
+def breadth_first_order(starts: np.ndarray, counts: np.ndarray, targets: np.ndarray,
+                        slot_of_id: np.ndarray, roots: np.ndarray,
+                        num_slots: int) -> np.ndarray:
+    """Reachable slots in the order a Cheney scan would copy them"""
+    marked = np.zeros(num_slots, dtype=bool)
+    frontiers = list(_frontiers(starts, counts, targets, slot_of_id, roots, marked))
+    if not frontiers:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(frontiers)
@@ -1,94 +1,376 @@
-import random
-from dataclasses import dataclass
-from typing import List, Dict
+import time
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Union
+
+import numpy as np
+
+from allocation_trace import (ADD_REF, ADD_ROOT, COLLECT, REMOVE_REF, REMOVE_ROOT, START,
+                              STEP, TraceWriter)
+from collectors import CollectionResult, Collector, make_collector
+from gc_stats import GCStats
+from gc_triggers import Trigger, make_trigger
+from object_store import FLAG_REACHABLE, FLAG_ROOT, ObjectStore, ObjectTable
+
+
+class RootSet:
+    """The root ids in the order they became roots, with O(1) membership,
+    add and discard. Converts to an id array for the collectors, which is
+    cached until the set changes."""
+
+    def __init__(self, obj_ids: Iterable[int] = ()):
+        self._ids = dict.fromkeys(obj_ids)
+        self._array: Optional[np.ndarray] = None
+
+    def add(self, obj_id: int):
+        self._ids[obj_id] = None
+        self._array = None
+
+    def update(self, obj_ids: Iterable[int]):
+        self._ids.update(dict.fromkeys(obj_ids))
+        self._array = None
+
+    def discard(self, obj_id: int):
+        self._ids.pop(obj_id, None)
+        self._array = None
+
+    def __contains__(self, obj_id) -> bool:
+        return obj_id in self._ids
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __array__(self, dtype=None, copy=None):
+        if self._array is None:
+            self._array = np.fromiter(self._ids, dtype=np.int64, count=len(self._ids))
+        return self._array.astype(dtype or np.int64, copy=bool(copy))
 
-@dataclass
-class MemoryObject:
-    id: int
-    size: int
-    is_reachable: bool
-    references: List[int]
 
 class MemoryManager:
-    def __init__(self, total_memory: int = 1000):
+    def __init__(self, total_memory: int = 1000, seed: Optional[int] = None,
+                 allocation_policy: str = 'first_fit',
+                 collector: Union[str, Collector] = 'mark_sweep',
+                 trace_path: Optional[str] = None, collect_stats: bool = False,
+                 trigger: Union[str, Trigger, None] = None, workers: int = 1):
         self.total_memory = total_memory
         self.used_memory = 0
-        self.objects: Dict[int, MemoryObject] = {}
+        # Bytes ever allocated, which allocation-driven triggers measure
+        self.bytes_allocated = 0
+        self.allocation_policy = allocation_policy
+        # With workers above 1, a collector given by name marks the heap in
+        # a pool of that many processes, which close() shuts down
+        self.collector = make_collector(collector, workers)
+        self.allocator = self.collector.create_allocator(allocation_policy, total_memory)
+        self.store = ObjectStore(heap_size=total_memory)
+        self.objects = ObjectTable(self.store)
         self.next_id = 1
-        self.root_objects: List[int] = []
+        self.root_objects = RootSet()
+        self.rng = np.random.default_rng(seed)
+        self.collector.attach(self)
+        self.last_collection: Optional[CollectionResult] = None
+        # Records every operation for replay when set
+        self.trace = TraceWriter(trace_path, total_memory) if trace_path else None
+        # Rolling statistics over past collections when enabled
+        self.stats: Optional[GCStats] = GCStats() if collect_stats else None
+        # Decides when to collect without being asked; with none, allocations
+        # that do not fit fail until someone collects
+        self.trigger = make_trigger(trigger)
+        # Occupancy when the current collection started, and the time its
+        # steps have taken so far
+        self._collection_start = (0, 0)
+        self._collection_ns = 0
 
     def allocate_object(self, size: int) -> bool:
-        if self.used_memory + size > self.total_memory:
+        # With a trigger the manager may collect first, and collects and
+        # retries once before the allocation fails
+        collected = self.trigger is not None and self.trigger.should_collect(self, size)
+        if collected:
+            self.run_garbage_collection()
+        address = self._allocate_block(size)
+        if address < 0 and self.trigger is not None and not collected:
+            self.run_garbage_collection()
+            address = self._allocate_block(size)
+        if address < 0:
             return False
 
         # Create new object
         obj_id = self.next_id
         self.next_id += 1
-        
+
         # Randomly decide if this object is reachable
-        is_reachable = random.random() < 0.7  # 70% chance of being reachable
-        
+        rng = self.rng
+        is_reachable = rng.random() < 0.7  # 70% chance of being reachable
+
         # Create random references to other objects
+        # Live ids are packed into the store's id column, so a pick is O(1)
         references = []
-        if self.objects:
-            num_refs = random.randint(0, 3)
-            for _ in range(num_refs):
-                ref_id = random.choice(list(self.objects.keys()))
-                references.append(ref_id)
-
-        new_object = MemoryObject(
-            id=obj_id,
-            size=size,
-            is_reachable=is_reachable,
-            references=references
-        )
-
-        self.objects[obj_id] = new_object
-        self.used_memory += size
+        live_ids = self.store.column('id')
+        if len(live_ids):
+            num_refs = int(rng.integers(0, 4))
+            references = live_ids[rng.integers(0, len(live_ids), size=num_refs)].tolist()
 
         # Randomly add to root objects
-        if random.random() < 0.3:  # 30% chance of being a root object
-            self.root_objects.append(obj_id)
+        is_root = rng.random() < 0.3  # 30% chance of being a root object
+
+        flags = (FLAG_REACHABLE if is_reachable else 0) | (FLAG_ROOT if is_root else 0)
+        slot = self.store.append(obj_id, size, address, flags, references)
+        self.used_memory += size
+        self.bytes_allocated += size
+        if is_root:
+            self.root_objects.add(obj_id)
+        if self.trace is not None:
+            self.trace.allocations(np.array([obj_id]), np.array([size]), np.array([flags]),
+                                   np.array([len(references)]), np.array(references, dtype=np.int64))
+        self.collector.on_allocate(self, np.array([slot]))
+
+        return True
+
+    def allocate_many(self, sizes: Sequence[int], reachable_probability: float = 0.7,
+                      root_probability: float = 0.3, max_references: int = 3) -> np.ndarray:
+        """Allocate a batch of objects with the same random model as allocate_object.
+
+        Objects are allocated in order until one does not fit; the ids of the
+        objects that were allocated are returned.
+        """
+        sizes = np.asarray(sizes, dtype=np.int64)
+        n = len(sizes)
+        rng = self.rng
+        obj_ids = np.arange(self.next_id, self.next_id + n, dtype=np.int64)
+        is_reachable = rng.random(n) < reachable_probability
+        is_root = rng.random(n) < root_probability
+
+        # Object i may reference anything live before it, including earlier
+        # objects of this batch
+        existing = self.store.column('id')
+        candidates = np.arange(len(existing), len(existing) + n)
+        ref_counts = rng.integers(0, max_references + 1, size=n)
+        ref_counts[candidates == 0] = 0
+        owners = np.repeat(candidates, ref_counts)
+        picks = (rng.random(len(owners)) * owners).astype(np.int64)
+        ref_targets = np.concatenate([existing, obj_ids])[picks]
+
+        return self.allocate_with_references(sizes, ref_counts, ref_targets, is_root, is_reachable)
+
+    def allocate_with_references(self, sizes: Sequence[int], ref_counts: np.ndarray,
+                                 ref_targets: np.ndarray, is_root: np.ndarray,
+                                 is_reachable: Optional[np.ndarray] = None) -> np.ndarray:
+        """Allocate a batch of objects with the given references and roots.
+
+        Object i references the ref_counts[i] ids that follow those of the
+        objects before it in ref_targets; it may reference earlier objects of
+        the batch by the ids they will get, next_id onwards. Objects are
+        allocated in order until one does not fit, and the ids of the objects
+        that were allocated are returned.
+        """
+        sizes = np.asarray(sizes, dtype=np.int64)
+        collected = (self.trigger is not None
+                     and self.trigger.should_collect(self, int(sizes.sum())))
+        if collected:
+            self.run_garbage_collection()
+        addresses = self._allocate_blocks(sizes)
+        if len(addresses) < len(sizes) and self.trigger is not None and not collected:
+            # The blocks are given back first, because the collection may
+            # move objects or rebuild the free space around the live ones
+            self.allocator.free_many(addresses, sizes[:len(addresses)])
+            self.run_garbage_collection()
+            addresses = self._allocate_blocks(sizes)
+        n = len(addresses)
+        sizes = sizes[:n]
+        ref_counts = np.asarray(ref_counts, dtype=np.int64)[:n]
+        ref_targets = np.asarray(ref_targets, dtype=np.int64)[:int(ref_counts.sum())]
+        is_root = np.asarray(is_root, dtype=bool)[:n]
+        is_reachable = (np.ones(n, dtype=bool) if is_reachable is None
+                        else np.asarray(is_reachable, dtype=bool)[:n])
+        obj_ids = np.arange(self.next_id, self.next_id + n, dtype=np.int64)
 
+        flags = (np.where(is_reachable, FLAG_REACHABLE, 0)
+                 | np.where(is_root, FLAG_ROOT, 0)).astype(np.uint8)
+        slots = self.store.append_many(obj_ids, sizes, addresses, flags, ref_counts, ref_targets)
+        self.next_id += n
+        self.used_memory += int(sizes.sum())
+        self.bytes_allocated += int(sizes.sum())
+        self.root_objects.update(obj_ids[is_root].tolist())
+        if self.trace is not None:
+            self.trace.allocations(obj_ids, sizes, flags, ref_counts, ref_targets)
+        self.collector.on_allocate(self, slots)
+        return obj_ids
+
+    def _allocate_block(self, size: int) -> int:
+        # Allocation needs a contiguous hole, not just enough free memory
+        address = self.allocator.allocate(size)
+        while address < 0 and self.collector.reclaim(self, size):
+            address = self.allocator.allocate(size)
+        return address
+
+    def _allocate_blocks(self, sizes: np.ndarray) -> np.ndarray:
+        addresses = self.allocator.allocate_many(sizes)
+        # A batch that stops short may fit once deferred garbage is freed;
+        # asking for room for all of the rest lets it go into one hole
+        while (len(addresses) < len(sizes)
+               and self.collector.reclaim(self, int(sizes[len(addresses):].sum()))):
+            addresses = np.concatenate([addresses,
+                                        self.allocator.allocate_many(sizes[len(addresses):])])
+        return addresses
+
+    def add_reference(self, source_id: int, target_id: int):
+        source = self.store.slot(source_id)
+        if source < 0 or self.store.slot(target_id) < 0:
+            raise KeyError(source_id if source < 0 else target_id)
+        self.store.add_reference(source, target_id)
+        if self.trace is not None:
+            self.trace.event(ADD_REF, source_id, target_id)
+        self.collector.write_barrier(self, source_id, None, target_id)
+
+    def remove_reference(self, source_id: int, target_id: int) -> bool:
+        source = self.store.slot(source_id)
+        if source < 0:
+            raise KeyError(source_id)
+        if not self.store.remove_reference(source, target_id):
+            return False
+        if self.trace is not None:
+            self.trace.event(REMOVE_REF, source_id, target_id)
+        self.collector.write_barrier(self, source_id, target_id, None)
         return True
 
-    def run_garbage_collection(self):
-        # Mark phase
-        marked = set()
-        
-        def mark_object(obj_id: int):
-            if obj_id in marked:
-                return
-            marked.add(obj_id)
-            obj = self.objects[obj_id]
-            for ref in obj.references:
-                if ref in self.objects:  # Check if reference exists
-                    mark_object(ref)
-
-        # Start marking from root objects
-        for root_id in self.root_objects:
-            if root_id in self.objects:  # Check if root object exists
-                mark_object(root_id)
-
-        # Sweep phase
-        objects_to_remove = []
-        for obj_id, obj in self.objects.items():
-            if obj_id not in marked:
-                objects_to_remove.append(obj_id)
-                self.used_memory -= obj.size
-
-        # Remove unreachable objects
-        for obj_id in objects_to_remove:
-            del self.objects[obj_id]
-            
-        # Update is_reachable flag for remaining objects
-        for obj_id, obj in self.objects.items():
-            obj.is_reachable = obj_id in marked
-
-    def get_memory_state(self):
+    def add_root(self, obj_id: int):
+        slot = self.store.slot(obj_id)
+        if slot < 0:
+            raise KeyError(obj_id)
+        if self.store.column('flags')[slot] & FLAG_ROOT:
+            return
+        self.store.set_flags(slot, FLAG_ROOT)
+        self.root_objects.add(obj_id)
+        if self.trace is not None:
+            self.trace.event(ADD_ROOT, obj_id)
+        self.collector.write_barrier(self, None, None, obj_id)
+
+    def remove_root(self, obj_id: int) -> bool:
+        slot = self.store.slot(obj_id)
+        if slot < 0 or not self.store.column('flags')[slot] & FLAG_ROOT:
+            return False
+        self.store.clear_flags(slot, FLAG_ROOT)
+        self.root_objects.discard(obj_id)
+        if self.trace is not None:
+            self.trace.event(REMOVE_ROOT, obj_id)
+        self.collector.write_barrier(self, None, obj_id, None)
+        return True
+
+    def run_garbage_collection(self) -> CollectionResult:
+        if self.trace is not None:
+            self.trace.event(COLLECT)
+        used_before, objects_before = self.used_memory, self.store.count
+        start = time.perf_counter_ns()
+        result = self.collector.collect(self)
+        self._finish_collection(result, used_before, objects_before,
+                                time.perf_counter_ns() - start)
+        return result
+
+    def start_collection(self):
+        """Begin a collection that is advanced with step()"""
+        if self.trace is not None:
+            self.trace.event(START)
+        self._collection_start = (self.used_memory, self.store.count)
+        start = time.perf_counter_ns()
+        self.collector.start(self)
+        self._collection_ns = time.perf_counter_ns() - start
+
+    def step(self, budget_ms: float) -> bool:
+        """Do up to budget_ms of collection work and return whether it is done"""
+        if self.trace is not None:
+            self.trace.event(STEP, int(budget_ms * 1_000_000))
+        start = time.perf_counter_ns()
+        result = self.collector.step(self, int(budget_ms * 1_000_000))
+        self._collection_ns += time.perf_counter_ns() - start
+        if result is not None:
+            self._finish_collection(result, *self._collection_start, self._collection_ns)
+        return self.is_done()
+
+    def is_done(self) -> bool:
+        return not self.collector.in_progress
+
+    def _finish_collection(self, result: CollectionResult, used_before: int,
+                           objects_before: int, wall_time: int):
+        result.used_before, result.objects_before = used_before, objects_before
+        result.used_after, result.objects_after = self.used_memory, self.store.count
+        result.wall_time = wall_time
+        self.last_collection = result
+        if self.stats is not None:
+            self.stats.add(result)
+        if self.trigger is not None:
+            self.trigger.on_collection(self, result)
+
+    def close_trace(self):
+        """Write out and close the trace, if one is being recorded"""
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def close(self):
+        """Close the trace and shut down the collector's worker processes"""
+        self.close_trace()
+        self.collector.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def fragmentation(self) -> float:
+        """External fragmentation: share of free memory outside the largest hole"""
+        free_memory = self.allocator.free_bytes
+        if free_memory == 0:
+            return 0.0
+        return (1 - self.allocator.largest_free_block() / free_memory) * 100
+
+    def internal_fragmentation(self) -> float:
+        """Share of allocated blocks lost to rounding up request sizes"""
+        allocated = self.used_memory + self.allocator.internal_waste
+        if allocated == 0:
+            return 0.0
+        return self.allocator.internal_waste / allocated * 100
+
+    def census(self) -> Dict[str, int]:
+        """Object counts and bytes by state, plus heap occupancy, from running
+        counters, so the cost does not depend on the heap's size"""
+        census = self.store.census()
+        census.update({
+            'objects': self.store.count,
+            'total_memory': self.total_memory,
+            'used_memory': self.used_memory,
+            'free_memory': self.allocator.free_bytes,
+            'largest_free_block': self.allocator.largest_free_block(),
+            'size_classes': self.store.size_class_counts.copy(),
+            'page_size': self.store.page_size,
+            'occupied_pages': self.store.occupied_pages,
+        })
+        return census
+
+    def page_table(self) -> Dict[str, np.ndarray]:
+        """Summary of every page of the heap, read from the store's page
+        table: the bytes of each state, the share of the page in use and the
+        state with the most bytes, -1 for empty pages"""
+        state_bytes = self.store.page_states()
+        used = state_bytes.sum(axis=0)
+        return {
+            'page_size': self.store.page_size,
+            'state_bytes': state_bytes,
+            'occupancy': used / self.store.page_capacities(),
+            'dominant': np.where(used > 0, state_bytes.argmax(axis=0), -1),
+        }
+
+    def get_memory_state(self, snapshot: bool = False):
+        """The heap's state. With snapshot the objects are copied, so the state
+        stays valid while the manager keeps running, for example on another
+        thread."""
         return {
             'total_memory': self.total_memory,
             'used_memory': self.used_memory,
-            'objects': self.objects,
-            'root_objects': self.root_objects
-        } 
\ No newline at end of file
+            'largest_free_block': self.allocator.largest_free_block(),
+            'fragmentation': self.fragmentation(),
+            'internal_fragmentation': self.internal_fragmentation(),
+            'census': self.census(),
+            'pages': self.page_table(),
+            'store': self.store.copy() if snapshot else self.store,
+        }
@@ -0,0 +1,593 @@
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from marking import gather_references
+
+# Bits of the per-object flags column
+FLAG_REACHABLE = 1
+FLAG_ROOT = 2
+FLAG_YOUNG = 4
+# Set on grey and black objects during incremental marking
+FLAG_MARKED = 8
+
+# States an object can be shown in. The census counts objects by their
+# root and reachable bits, which KEY_STATES maps to a state.
+STATES = ('root', 'reachable', 'unreachable')
+CENSUS_KEYS = FLAG_ROOT | FLAG_REACHABLE
+KEY_STATES = np.array([2, 1, 2, 0])
+# Census size class k holds objects of size [2**k, 2**(k+1))
+SIZE_CLASSES = 64
+# The page table splits the heap into at most this many pages, of the
+# smallest power-of-two size that covers it
+MAX_PAGES = 4096
+
+
+def object_states(flags):
+    """Index into STATES of each object given its flags"""
+    return KEY_STATES[flags & CENSUS_KEYS]
+
+
+def size_classes(sizes):
+    return np.frexp(np.maximum(sizes, 1))[1] - 1
+
+
+def page_shift(heap_size: int) -> int:
+    """log2 of the page size of a heap of heap_size units"""
+    return (max(-(-heap_size // MAX_PAGES), 1) - 1).bit_length()
+
+
+class ObjectStore:
+    """Columnar (struct-of-arrays) storage for every live object.
+
+    Live objects are packed into slots [0, count). References are stored as
+    target ids in one flat buffer, with each slot owning a run described by
+    its ref_start and ref_count columns.
+
+    Given the heap's size, the store also keeps a page table: the bytes of
+    each census key in every fixed-size page of the heap, so views of the
+    whole heap cost the same however large it is. Objects may span pages.
+    Collectors that move objects do so with move() to keep it current.
+    """
+
+    COLUMNS = {
+        'id': np.int64,
+        'size': np.int64,
+        'address': np.int64,
+        'flags': np.uint8,
+        'ref_start': np.int64,
+        'ref_count': np.int32,
+        # Collections survived, used by the generational collector
+        'age': np.uint8,
+        # Reference count, used by the reference counting collector
+        'rc': np.int32,
+        # Number of the collection that last marked the object, used by the
+        # lazy sweeping collector
+        'epoch': np.uint32,
+    }
+
+    def __init__(self, capacity: int = 1024, heap_size: int = 0):
+        self.count = 0
+        self._columns = {name: np.zeros(capacity, dtype=dtype)
+                         for name, dtype in self.COLUMNS.items()}
+        # Maps an object id to its slot, -1 once the object is gone. After
+        # evacuate, ids of objects that are gone may still hold a slot, which
+        # slot() and slots_of() check against the id column; only ids of
+        # live objects may be looked up here directly
+        self.slot_of_id = np.full(capacity, -1, dtype=np.int64)
+        self.ref_buffer = np.zeros(capacity, dtype=np.int64)
+        self.ref_used = 0
+        self.ref_live = 0
+        # Running census of the live objects, kept by every method that adds
+        # or removes objects or changes their root or reachable bits
+        # Objects and bytes per census key, as ints because single objects
+        # update them far more often than batches do
+        self.key_counts = [0] * (CENSUS_KEYS + 1)
+        self.key_bytes = [0] * (CENSUS_KEYS + 1)
+        self.size_class_counts = np.zeros(SIZE_CLASSES, dtype=np.int64)
+        # Bytes per census key and page, with no pages when the heap's size
+        # is not given
+        self.heap_size = heap_size
+        self.page_shift = page_shift(heap_size)
+        self.page_size = 1 << self.page_shift
+        self.page_count = -(-heap_size // self.page_size)
+        self.page_bytes = np.zeros((CENSUS_KEYS + 1, self.page_count), dtype=np.int64)
+        # Bytes in each page whatever their state, and how many pages hold any
+        self.page_used = np.zeros(self.page_count, dtype=np.int64)
+        self.occupied_pages = 0
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a writable view of a column over the live slots"""
+        return self._columns[name][:self.count]
+
+    def slot(self, obj_id: int) -> int:
+        if 0 <= obj_id < len(self.slot_of_id):
+            slot = int(self.slot_of_id[obj_id])
+            if 0 <= slot < self.count and self._columns['id'][slot] == obj_id:
+                return slot
+        return -1
+
+    def slots_of(self, obj_ids) -> np.ndarray:
+        """Vectorized slot lookup, -1 for ids that are not live"""
+        obj_ids = np.asarray(obj_ids, dtype=np.int64)
+        slots = np.full(obj_ids.shape, -1, dtype=np.int64)
+        known = (obj_ids >= 0) & (obj_ids < len(self.slot_of_id))
+        slots[known] = self.slot_of_id[obj_ids[known]]
+        stale = (slots >= self.count) | (self._columns['id'][np.clip(slots, 0, None)] != obj_ids)
+        slots[stale] = -1
+        return slots
+
+    def append(self, obj_id: int, size: int, address: int, flags: int = 0,
+               references: Iterable[int] = ()) -> int:
+        slot = self.count
+        if slot == len(self._columns['id']):
+            self._grow_columns(2 * slot)
+        if obj_id >= len(self.slot_of_id):
+            self._grow_id_index(obj_id + 1)
+
+        columns = self._columns
+        columns['id'][slot] = obj_id
+        columns['size'][slot] = size
+        columns['address'][slot] = address
+        columns['flags'][slot] = flags
+        columns['ref_start'][slot] = self.ref_used
+        columns['ref_count'][slot] = 0
+        columns['age'][slot] = 0
+        columns['rc'][slot] = 0
+        columns['epoch'][slot] = 0
+        self.slot_of_id[obj_id] = slot
+        self.count += 1
+        self._count_one(flags, size, address, 1)
+        self.set_references(slot, references)
+        return slot
+
+    def append_many(self, obj_ids: np.ndarray, sizes: np.ndarray, addresses: np.ndarray,
+                    flags: np.ndarray, ref_counts: np.ndarray,
+                    ref_targets: np.ndarray) -> np.ndarray:
+        """Append a batch of objects whose references are given as one flat run"""
+        n = len(obj_ids)
+        first = self.count
+        if first + n > len(self._columns['id']):
+            self._grow_columns(max(first + n, 2 * first))
+        if n and obj_ids.max() >= len(self.slot_of_id):
+            self._grow_id_index(int(obj_ids.max()) + 1)
+        self._reserve_references(len(ref_targets))
+
+        slots = np.arange(first, first + n)
+        columns = self._columns
+        columns['id'][slots] = obj_ids
+        columns['size'][slots] = sizes
+        columns['address'][slots] = addresses
+        columns['flags'][slots] = flags
+        columns['ref_count'][slots] = ref_counts
+        columns['ref_start'][slots] = self.ref_used + np.cumsum(ref_counts) - ref_counts
+        columns['age'][slots] = 0
+        columns['rc'][slots] = 0
+        columns['epoch'][slots] = 0
+        self.ref_buffer[self.ref_used:self.ref_used + len(ref_targets)] = ref_targets
+        self.ref_used += len(ref_targets)
+        self.ref_live += len(ref_targets)
+        self.slot_of_id[obj_ids] = slots
+        self.count += n
+        self._count(slots, 1)
+        return slots
+
+    def remove(self, slot: int):
+        """Free one slot by moving the last live slot into it"""
+        last = self.count - 1
+        columns = self._columns
+        obj_id = columns['id'][slot]
+        self.ref_live -= int(columns['ref_count'][slot])
+        self._count_one(int(columns['flags'][slot]), int(columns['size'][slot]),
+                        int(columns['address'][slot]), -1)
+        if slot != last:
+            for values in columns.values():
+                values[slot] = values[last]
+            self.slot_of_id[columns['id'][slot]] = slot
+        self.slot_of_id[obj_id] = -1
+        self.count = last
+
+    def remove_many(self, slots: np.ndarray):
+        """Swap-remove a batch of slots; the cost depends only on the batch size"""
+        slots = np.unique(slots)
+        n = self.count
+        new_count = n - len(slots)
+        columns = self._columns
+        self.ref_live -= int(columns['ref_count'][slots].sum())
+        self.slot_of_id[columns['id'][slots]] = -1
+        self._count(slots, -1)
+
+        # Surviving slots beyond the new end fill the holes below it
+        holes = slots[slots < new_count]
+        tail = np.arange(new_count, n)
+        movers = tail[~np.isin(tail, slots, assume_unique=True)]
+        for values in columns.values():
+            values[holes] = values[movers]
+        self.slot_of_id[columns['id'][holes]] = holes
+        self.count = new_count
+
+    def references(self, slot: int) -> np.ndarray:
+        start = self._columns['ref_start'][slot]
+        return self.ref_buffer[start:start + self._columns['ref_count'][slot]]
+
+    def set_references(self, slot: int, references: Iterable[int]):
+        references = np.fromiter(references, dtype=np.int64)
+        old_count = int(self._columns['ref_count'][slot])
+        # The new run always goes at the end of the buffer; the old run
+        # becomes garbage that compact_references reclaims
+        self._reserve_references(len(references))
+        self.ref_buffer[self.ref_used:self.ref_used + len(references)] = references
+        self._columns['ref_start'][slot] = self.ref_used
+        self._columns['ref_count'][slot] = len(references)
+        self.ref_used += len(references)
+        self.ref_live += len(references) - old_count
+        self._maybe_compact_references()
+
+    def add_reference(self, slot: int, target_id: int):
+        columns = self._columns
+        start = int(columns['ref_start'][slot])
+        count = int(columns['ref_count'][slot])
+        if start + count != self.ref_used:
+            # Only the run at the end of the buffer can grow in place, so move
+            # this one there first; its old copy becomes garbage
+            self._reserve_references(count + 1)
+            self.ref_buffer[self.ref_used:self.ref_used + count] = self.ref_buffer[start:start + count]
+            start = self.ref_used
+            columns['ref_start'][slot] = start
+            self.ref_used += count
+        else:
+            self._reserve_references(1)
+        self.ref_buffer[start + count] = target_id
+        columns['ref_count'][slot] = count + 1
+        self.ref_used += 1
+        self.ref_live += 1
+        self._maybe_compact_references()
+
+    def remove_reference(self, slot: int, target_id: int) -> bool:
+        """Remove one reference to target_id from the slot's run"""
+        run = self.references(slot)
+        matches = np.flatnonzero(run == target_id)
+        if not len(matches):
+            return False
+        run[matches[0]] = run[-1]
+        self._columns['ref_count'][slot] -= 1
+        self.ref_live -= 1
+        return True
+
+    def retain(self, keep: np.ndarray):
+        """Drop every slot where keep is False, preserving slot order"""
+        self.select(np.flatnonzero(keep))
+
+    def select(self, slots: np.ndarray):
+        """Keep only the given slots, moved to the front in the given order"""
+        n = self.count
+        alive = np.zeros(n, dtype=bool)
+        alive[slots] = True
+        dead_ids = self._columns['id'][:n][~alive]
+        self.ref_live -= int(self._columns['ref_count'][:n][~alive].sum())
+        self._count(np.flatnonzero(~alive), -1)
+
+        new_count = len(slots)
+        for values in self._columns.values():
+            values[:new_count] = values[:n][slots]
+        self.count = new_count
+        self.slot_of_id[dead_ids] = -1
+        self.slot_of_id[self._columns['id'][:new_count]] = np.arange(new_count)
+
+        self._maybe_compact_references()
+
+    def evacuate(self, slots: np.ndarray, addresses: np.ndarray):
+        """Keep only the given slots, moved to the front in the given order,
+        at the given addresses and reachable.
+
+        Unlike select, this only touches the survivors: the running counters
+        are recounted from them, and the ids of the objects left behind are
+        not cleared from slot_of_id.
+        """
+        new_count = len(slots)
+        columns = self._columns
+        for values in columns.values():
+            values[:new_count] = values[slots]
+        self.count = new_count
+        columns['address'][:new_count] = addresses
+        columns['flags'][:new_count] |= FLAG_REACHABLE
+        survivors = np.arange(new_count)
+        self.slot_of_id[columns['id'][:new_count]] = survivors
+        self.ref_live = int(columns['ref_count'][:new_count].sum())
+
+        self.key_counts = [0] * (CENSUS_KEYS + 1)
+        self.key_bytes = [0] * (CENSUS_KEYS + 1)
+        self.size_class_counts[:] = 0
+        # The page table is bounded by MAX_PAGES whatever the heap's size
+        self.page_bytes[:] = 0
+        self.page_used[:] = 0
+        self.occupied_pages = 0
+        self._count(survivors, 1)
+
+        self._maybe_compact_references()
+
+    def move(self, slots: np.ndarray, addresses: np.ndarray):
+        """Give the objects in slots new addresses"""
+        columns = self._columns
+        if 2 * len(slots) > self.count:
+            # Recounting every object is cheaper than taking most of them
+            # out and putting them back
+            columns['address'][slots] = addresses
+            self.page_bytes[:] = 0
+            self.page_used[:] = 0
+            self.occupied_pages = 0
+            self._count_pages(columns['flags'][:self.count] & CENSUS_KEYS,
+                              columns['address'][:self.count], columns['size'][:self.count], 1)
+            return
+        keys = columns['flags'][slots] & CENSUS_KEYS
+        sizes = columns['size'][slots]
+        self._count_pages(keys, columns['address'][slots], sizes, -1)
+        columns['address'][slots] = addresses
+        self._count_pages(keys, columns['address'][slots], sizes, 1)
+
+    def set_flags(self, slots, bits: int):
+        """Set bits in the flags of one slot or an array of slots"""
+        self._change_flags(slots, bits, 0)
+
+    def clear_flags(self, slots, bits: int):
+        self._change_flags(slots, 0, bits)
+
+    def mark_all_reachable(self):
+        """Set every object's reachable bit"""
+        self._columns['flags'][:self.count] |= FLAG_REACHABLE
+        for counters in (self.key_counts, self.key_bytes, self.page_bytes):
+            counters[FLAG_REACHABLE] += counters[0]
+            counters[FLAG_ROOT | FLAG_REACHABLE] += counters[FLAG_ROOT]
+            counters[0] = counters[FLAG_ROOT] = 0
+
+    def census(self) -> Dict[str, int]:
+        """Objects and bytes in each state, read from the running counters"""
+        census = dict.fromkeys([name for state in STATES for name in (state, f'{state}_bytes')], 0)
+        for state, count, key_bytes in zip(KEY_STATES.tolist(), self.key_counts, self.key_bytes):
+            census[STATES[state]] += count
+            census[f'{STATES[state]}_bytes'] += key_bytes
+        return census
+
+    def page_states(self) -> np.ndarray:
+        """Bytes of each state in every page, one row per state"""
+        states = np.zeros((len(STATES), self.page_count), dtype=np.int64)
+        np.add.at(states, KEY_STATES, self.page_bytes)
+        return states
+
+    def page_capacities(self) -> np.ndarray:
+        """Size of every page; the last one may be cut short by the heap's end"""
+        capacities = np.full(self.page_count, self.page_size, dtype=np.int64)
+        if self.page_count:
+            capacities[-1] = self.heap_size - (self.page_count - 1) * self.page_size
+        return capacities
+
+    def _change_flags(self, slots, set_bits: int, clear_bits: int):
+        flags = self._columns['flags']
+        if isinstance(slots, (int, np.integer)):
+            old = int(flags[slots])
+            new = (old | set_bits) & ~clear_bits
+            flags[slots] = new
+            if (old ^ new) & CENSUS_KEYS:
+                size = int(self._columns['size'][slots])
+                address = int(self._columns['address'][slots])
+                self.key_counts[old & CENSUS_KEYS] -= 1
+                self.key_bytes[old & CENSUS_KEYS] -= size
+                self.key_counts[new & CENSUS_KEYS] += 1
+                self.key_bytes[new & CENSUS_KEYS] += size
+                self._page_one(old & CENSUS_KEYS, size, address, -1)
+                self._page_one(new & CENSUS_KEYS, size, address, 1)
+            return
+        old = flags[slots]
+        flags[slots] = (old | set_bits) & ~np.uint8(clear_bits)
+        if (set_bits | clear_bits) & CENSUS_KEYS:
+            old_keys, new_keys = old & CENSUS_KEYS, flags[slots] & CENSUS_KEYS
+            sizes = self._columns['size'][slots]
+            self._count_keys(old_keys, sizes, -1)
+            self._count_keys(new_keys, sizes, 1)
+            # Only objects whose key changed move between page table rows
+            changed = old_keys != new_keys
+            if changed.any():
+                addresses = self._columns['address'][slots][changed]
+                self._count_pages(old_keys[changed], addresses, sizes[changed], -1)
+                self._count_pages(new_keys[changed], addresses, sizes[changed], 1)
+
+    def _count(self, slots: np.ndarray, sign: int):
+        sizes = self._columns['size'][slots]
+        keys = self._columns['flags'][slots] & CENSUS_KEYS
+        self._count_keys(keys, sizes, sign)
+        self.size_class_counts += sign * np.bincount(size_classes(sizes), minlength=SIZE_CLASSES)
+        self._count_pages(keys, self._columns['address'][slots], sizes, sign)
+
+    def _count_keys(self, keys: np.ndarray, sizes: np.ndarray, sign: int):
+        counts = np.bincount(keys, minlength=CENSUS_KEYS + 1).tolist()
+        key_bytes = np.bincount(keys, weights=sizes, minlength=CENSUS_KEYS + 1).tolist()
+        for key in range(CENSUS_KEYS + 1):
+            self.key_counts[key] += sign * counts[key]
+            self.key_bytes[key] += sign * int(key_bytes[key])
+
+    def _count_one(self, flags: int, size: int, address: int, sign: int):
+        key = flags & CENSUS_KEYS
+        self.key_counts[key] += sign
+        self.key_bytes[key] += sign * size
+        self.size_class_counts[max(size, 1).bit_length() - 1] += sign
+        self._page_one(key, size, address, sign)
+
+    def _page_one(self, key: int, size: int, address: int, sign: int):
+        if not self.page_count:
+            return
+        shift = self.page_shift
+        first, last = address >> shift, (address + max(size, 1) - 1) >> shift
+        if first == last:
+            self.page_bytes[key, first] += sign * size
+            before = self.page_used[first]
+            self.page_used[first] = after = before + sign * size
+            self.occupied_pages += int(after > 0) - int(before > 0)
+            return
+        counted = np.full(last - first + 1, sign * self.page_size, dtype=np.int64)
+        counted[0] = sign * (((first + 1) << shift) - address)
+        counted[-1] = sign * (address + size - (last << shift))
+        self.page_bytes[key, first:last + 1] += counted
+        used = self.page_used[first:last + 1]
+        before = np.count_nonzero(used)
+        used += counted
+        self.occupied_pages += int(np.count_nonzero(used)) - before
+
+    def _count_pages(self, keys: np.ndarray, addresses: np.ndarray, sizes: np.ndarray, sign: int):
+        """Add or remove objects' bytes in the page table"""
+        if not self.page_count or not len(sizes):
+            return
+        shift, pages = self.page_shift, self.page_count
+        rows = keys.astype(np.int64) * pages
+        first = addresses >> shift
+        last = (addresses + sizes - 1) >> shift
+        cells = len(self.page_bytes) * pages
+        # Every object counted in its first page, then the few that span
+        # pages corrected: their first page only holds them from their
+        # address up, their last page up to their end, and each page in
+        # between is full
+        counted = np.bincount(rows + first, weights=sizes, minlength=cells)
+        span = np.flatnonzero(last > first)
+        if len(span):
+            rows, first, last = rows[span], first[span], last[span]
+            starts, ends = addresses[span], addresses[span] + sizes[span]
+            counted -= np.bincount(rows + first, weights=ends - ((first + 1) << shift),
+                                   minlength=cells)
+            counted += np.bincount(rows + last, weights=ends - (last << shift), minlength=cells)
+            # Pages in between as a step up after the first page and down at
+            # the last, summed along each row
+            steps = (np.bincount(rows + first + 1, minlength=cells)
+                     - np.bincount(rows + last, minlength=cells))
+            counted += (np.cumsum(steps.reshape(-1, pages), axis=1) * self.page_size).ravel()
+        counted = counted.astype(np.int64).reshape(-1, pages)
+        if sign < 0:
+            counted = -counted
+        self.page_bytes += counted
+        # Only the pages the objects touch can change between empty and not
+        touched = np.flatnonzero(counted.any(axis=0))
+        used = self.page_used[touched]
+        before = np.count_nonzero(used)
+        used += counted[:, touched].sum(axis=0)
+        self.page_used[touched] = used
+        self.occupied_pages += int(np.count_nonzero(used)) - before
+
+    def compact_references(self):
+        """Rewrite the reference buffer so it only holds live runs"""
+        n = self.count
+        starts = self._columns['ref_start'][:n]
+        counts = self._columns['ref_count'][:n].astype(np.int64)
+        live_refs = gather_references(starts, counts, self.ref_buffer, np.arange(n))
+        self.ref_buffer = np.zeros(max(len(live_refs), 1024), dtype=np.int64)
+        self.ref_buffer[:len(live_refs)] = live_refs
+        starts[:] = np.cumsum(counts) - counts
+        self.ref_used = self.ref_live = len(live_refs)
+
+    def _maybe_compact_references(self):
+        if self.ref_used > 2 * self.ref_live + 1024:
+            self.compact_references()
+
+    def copy(self) -> 'ObjectStore':
+        """An independent copy of the live objects, with compacted references"""
+        n = self.count
+        copy = ObjectStore(max(n, 1), self.heap_size)
+        for name, values in self._columns.items():
+            copy._columns[name][:n] = values[:n]
+        copy.count = n
+        copy.slot_of_id = self.slot_of_id.copy()
+        copy.ref_buffer = self.ref_buffer.copy()
+        copy.ref_used, copy.ref_live = self.ref_used, self.ref_live
+        copy.key_counts = list(self.key_counts)
+        copy.key_bytes = list(self.key_bytes)
+        copy.size_class_counts = self.size_class_counts.copy()
+        copy.page_bytes = self.page_bytes.copy()
+        copy.page_used = self.page_used.copy()
+        copy.occupied_pages = self.occupied_pages
+        copy.compact_references()
+        return copy
+
+    def nbytes(self) -> int:
+        return (sum(values.nbytes for values in self._columns.values())
+                + self.slot_of_id.nbytes + self.ref_buffer.nbytes)
+
+    def _grow_columns(self, capacity: int):
+        for name, values in self._columns.items():
+            grown = np.zeros(capacity, dtype=values.dtype)
+            grown[:self.count] = values[:self.count]
+            self._columns[name] = grown
+
+    def _grow_id_index(self, minimum: int):
+        grown = np.full(max(minimum, 2 * len(self.slot_of_id)), -1, dtype=np.int64)
+        grown[:len(self.slot_of_id)] = self.slot_of_id
+        self.slot_of_id = grown
+
+    def _reserve_references(self, extra: int):
+        needed = self.ref_used + extra
+        if needed > len(self.ref_buffer):
+            grown = np.zeros(max(needed, 2 * len(self.ref_buffer)), dtype=np.int64)
+            grown[:self.ref_used] = self.ref_buffer[:self.ref_used]
+            self.ref_buffer = grown
+
+
+class MemoryObject:
+    """Lightweight view of one object in an ObjectStore"""
+
+    __slots__ = ('_store', 'id')
+
+    def __init__(self, store: ObjectStore, obj_id: int):
+        self._store = store
+        self.id = obj_id
+
+    @property
+    def _slot(self) -> int:
+        slot = self._store.slot(self.id)
+        if slot < 0:
+            raise KeyError(self.id)
+        return slot
+
+    @property
+    def size(self) -> int:
+        return int(self._store.column('size')[self._slot])
+
+    @property
+    def address(self) -> int:
+        return int(self._store.column('address')[self._slot])
+
+    @property
+    def is_reachable(self) -> bool:
+        return bool(self._store.column('flags')[self._slot] & FLAG_REACHABLE)
+
+    @is_reachable.setter
+    def is_reachable(self, value: bool):
+        if value:
+            self._store.set_flags(self._slot, FLAG_REACHABLE)
+        else:
+            self._store.clear_flags(self._slot, FLAG_REACHABLE)
+
+    @property
+    def references(self) -> List[int]:
+        return self._store.references(self._slot).tolist()
+
+    def __repr__(self):
+        return (f"MemoryObject(id={self.id}, size={self.size}, "
+                f"is_reachable={self.is_reachable}, references={self.references})")
+
+
+class ObjectTable(Mapping):
+    """Read-only id -> MemoryObject mapping over an ObjectStore"""
+
+    def __init__(self, store: ObjectStore):
+        self._store = store
+
+    def __getitem__(self, obj_id: int) -> MemoryObject:
+        if self._store.slot(obj_id) < 0:
+            raise KeyError(obj_id)
+        return MemoryObject(self._store, obj_id)
+
+    def __contains__(self, obj_id) -> bool:
+        return isinstance(obj_id, (int, np.integer)) and self._store.slot(obj_id) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._store.column('id').tolist())
+
+    def __len__(self) -> int:
+        return self._store.count
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from allocation_trace import ALLOC, TraceReader, replay
+from memory_manager import MemoryManager
+
+
+@pytest.fixture
+def rooted_trace(tmp_path):
+    # Every object stays a root, so a smaller heap runs out part way through
+    path = str(tmp_path / 'rooted.trace')
+    manager = MemoryManager(10_000, seed=5, trace_path=path)
+    for _ in range(100):
+        manager.allocate_object(50)
+        manager.add_root(manager.next_id - 1)
+    manager.close_trace()
+    return TraceReader(path)
+
+
+@pytest.mark.parametrize('chunk_records', [1 << 20, 7])
+def test_exhausted_replay_counts_the_records_it_applied(rooted_trace, chunk_records):
+    manager = MemoryManager(1000, seed=5)
+    result = replay(rooted_trace, manager, chunk_records=chunk_records)
+    assert result.exhausted
+    # Replay stops at the allocation of the 21st object, the first that
+    # does not fit
+    allocations = np.flatnonzero(rooted_trace.records['op'] == ALLOC)
+    assert manager.store.count == 20
+    assert result.records == allocations[20]
+
+
+def test_full_replay_counts_every_record(rooted_trace):
+    result = replay(rooted_trace, MemoryManager(10_000, seed=5))
+    assert not result.exhausted
+    assert result.records == len(rooted_trace)
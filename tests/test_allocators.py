@@ -0,0 +1,104 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from allocators import ALLOCATORS, REGION_FREE, BuddyAllocator, SegregatedFitAllocator
+from memory_manager import MemoryManager
+
+
+@pytest.mark.parametrize('policy', ['first_fit', 'next_fit', 'best_fit', 'segregated_fit', 'buddy'])
+def test_oversize_allocation_fails(policy):
+    manager = MemoryManager(1000, allocation_policy=policy)
+    assert not manager.allocate_object(2000)
+    assert manager.allocate_object(10)
+
+
+def test_segregated_fit_rejects_sizes_without_a_class():
+    allocator = SegregatedFitAllocator(1000)
+    assert allocator.allocate(0) < 0
+    assert allocator.allocate(1 << 20) < 0
+    assert allocator.allocate(1000) == 0
+
+
+def test_buddy_memory_does_not_follow_heap_size():
+    tracemalloc.start()
+    allocator = BuddyAllocator(1 << 36)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 1 << 20
+    assert allocator.largest_free_block() == 1 << 36
+
+
+def test_buddy_coalesces_back_to_one_block():
+    allocator = BuddyAllocator(1 << 16)
+    rng = np.random.default_rng(12)
+    live = {}
+    for _ in range(5000):
+        if live and rng.random() < 0.45:
+            address = list(live)[int(rng.integers(len(live)))]
+            allocator.free(address, live.pop(address))
+            continue
+        size = int(rng.integers(1, 3000))
+        address = allocator.allocate(size)
+        if address >= 0:
+            block = allocator.block_size(size)
+            assert address % block == 0
+            assert all(address + block <= other or other + allocator.block_size(other_size) <= address
+                       for other, other_size in live.items())
+            live[address] = size
+    for address, size in live.items():
+        allocator.free(address, size)
+    assert allocator.largest_free_block() == allocator.free_bytes == 1 << 16
+
+
+@pytest.mark.parametrize('policy', ['best_fit', 'segregated_fit'])
+def test_size_indexed_fits(policy):
+    allocator = ALLOCATORS[policy](1 << 16)
+    rng = np.random.default_rng(7)
+    live = {}
+    for _ in range(4000):
+        if live and rng.random() < 0.45:
+            address = list(live)[int(rng.integers(len(live)))]
+            allocator.free(address, live.pop(address))
+        else:
+            size = int(rng.integers(1, 500))
+            holes = dict(allocator._by_start)
+            address = allocator.allocate(size)
+            fitting = [hole for hole in holes.values() if hole >= size]
+            if not fitting:
+                assert address < 0
+                continue
+            assert holes[address] >= size
+            if policy == 'best_fit':
+                assert holes[address] == min(fitting)
+            elif holes[address].bit_length() == size.bit_length():
+                # Within the request's own class the lowest fitting hole wins
+                assert address == min(start for start, hole in holes.items()
+                                      if hole >= size and hole.bit_length() == size.bit_length())
+            live[address] = size
+        assert allocator.largest_free_block() == max(allocator._by_start.values(), default=0)
+
+
+def _largest_region_block(allocator):
+    # Recount from the region states and the open tails
+    largest = 0
+    run = 0
+    for region, state in enumerate(allocator.state.tolist()):
+        run = run + int(allocator.capacity[region]) if state == REGION_FREE else 0
+        largest = max(largest, run)
+    for region, top in zip(allocator._region, allocator._top):
+        if region >= 0:
+            largest = max(largest, int(allocator.capacity[region]) - top)
+    return largest
+
+
+def test_region_largest_free_block_follows_the_regions():
+    manager = MemoryManager(100_000, seed=2, collector='garbage_first')
+    allocator = manager.allocator
+    for _ in range(6):
+        for size in manager.rng.integers(1, 3000, 60).tolist():
+            manager.allocate_object(size)
+            assert allocator.largest_free_block() == _largest_region_block(allocator)
+        manager.run_garbage_collection()
+        assert allocator.largest_free_block() == _largest_region_block(allocator)
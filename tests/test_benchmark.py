@@ -0,0 +1,8 @@
+from benchmark import run_benchmark
+
+
+def test_internal_fragmentation_is_reported():
+    rows = {policy: run_benchmark('uniform', 2000, 100_000, allocation_policy=policy, trace_memory=False)
+            for policy in ('first_fit', 'buddy')}
+    assert rows['first_fit']['internal_fragmentation'] == 0
+    assert 0 < rows['buddy']['internal_fragmentation'] < 50
@@ -0,0 +1,64 @@
+import numpy as np
+
+from memory_manager import MemoryManager
+
+
+def _allocate(manager, sizes, roots):
+    # Objects without references, rooted where roots is True
+    return manager.allocate_with_references(np.asarray(sizes), np.zeros(len(sizes), dtype=np.int64),
+                                            [], np.asarray(roots)).tolist()
+
+
+def test_mark_compact_leaves_one_hole_and_counts_what_moved():
+    manager = MemoryManager(10_000, seed=0, collector='mark_compact')
+    rng = np.random.default_rng(1)
+    sizes = rng.integers(10, 200, 60)
+    live = rng.random(60) < 0.5
+    ids = _allocate(manager, sizes, live)
+    assert len(ids) == 60
+    store = manager.store
+    # Survivors slide down in address order, so the ones after the first
+    # dead object move
+    moved = int(sizes[live & (np.cumsum(~live) > 0)].sum())
+
+    result = manager.run_garbage_collection()
+    assert result.bytes_moved == moved
+    live_bytes = int(sizes[live].sum())
+    assert manager.used_memory == live_bytes
+    assert manager.allocator.holes() == 1
+    assert manager.allocator.largest_free_block() == 10_000 - live_bytes
+    assert manager.allocator.allocate(10_000 - live_bytes) == live_bytes
+    addresses = [int(store.column('address')[store.slot(obj_id)]) for obj_id in np.array(ids)[live]]
+    assert addresses == (np.cumsum(sizes[live]) - sizes[live]).tolist()
+
+
+def test_minor_collection_traces_the_nursery_and_the_remembered_set():
+    manager = MemoryManager(100_000, seed=0, collector='generational')
+    collector = manager.collector
+    old_root, old_garbage = _allocate(manager, [100, 100], [True, True])
+    # Two collections promote them
+    manager.run_garbage_collection()
+    manager.run_garbage_collection()
+    store = manager.store
+    old = store.slots_of([old_root, old_garbage])
+    assert np.all(store.column('address')[old] >= manager.allocator.nursery_size)
+    manager.remove_root(old_garbage)
+
+    kept, remembered, dead, root = _allocate(manager, [50] * 4, [False, False, False, True])
+    manager.add_reference(old_root, kept)
+    # Old objects are not traced in a minor collection, so one that is
+    # garbage still keeps what it references
+    manager.add_reference(old_garbage, remembered)
+    assert collector.remembered == {old_root, old_garbage}
+
+    result = manager.run_garbage_collection()
+    assert result.kind == 'minor'
+    assert result.objects_marked == 3
+    assert result.objects_freed == 1
+    assert store.slot(dead) < 0
+    assert all(store.slot(obj_id) >= 0 for obj_id in (old_root, old_garbage, kept, remembered, root))
+
+    result = collector.collect_full(manager)
+    assert result.kind == 'full'
+    assert store.slot(old_garbage) < 0 and store.slot(remembered) < 0
+    assert all(store.slot(obj_id) >= 0 for obj_id in (old_root, kept, root))
@@ -0,0 +1,21 @@
+import multiprocessing
+from concurrent.futures import CancelledError
+
+import pytest
+
+from comparison import Configuration, compare, run_configuration, spawn_executor
+
+
+def test_internal_fragmentation_is_sampled():
+    result = run_configuration(Configuration(allocation_policy='buddy'), 100_000, objects=5000, samples=10)
+    assert len(result.internal_fragmentation) == len(result.progress) == 10
+    assert 0 < result.internal_fragmentation.min()
+    assert result.to_json()['internal_fragmentation'] == result.internal_fragmentation.tolist()
+
+
+def test_cancelled_comparison_stops():
+    cancel = multiprocessing.get_context('spawn').Event()
+    cancel.set()
+    with spawn_executor(1, cancel) as executor:
+        with pytest.raises(CancelledError):
+            compare([Configuration()], 100_000, objects=10_000_000, executor=executor)
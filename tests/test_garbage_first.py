@@ -0,0 +1,118 @@
+import numpy as np
+
+from allocators import REGION_FREE, REGION_HUMONGOUS, REGION_OLD, REGION_YOUNG
+from memory_manager import MemoryManager
+from object_store import FLAG_ROOT
+
+
+def _allocate(manager, count, size=40, roots=0.1, references=2):
+    rng = manager.rng
+    live = manager.store.column('id')
+    ref_counts = rng.integers(0, references + 1, count)
+    pool = np.concatenate([live, np.arange(manager.next_id, manager.next_id + count)])
+    owners = np.repeat(np.arange(len(live), len(live) + count), ref_counts)
+    # Each object references objects allocated before it
+    targets = pool[(rng.random(len(owners)) * np.maximum(owners, 1)).astype(np.int64)]
+    return manager.allocate_with_references(np.full(count, size), ref_counts, targets,
+                                            rng.random(count) < roots)
+
+
+def _reachable(manager):
+    store = manager.store
+    seen = set(manager.root_objects)
+    queue = list(seen)
+    while queue:
+        for target in store.references(store.slot(queue.pop())).tolist():
+            if target not in seen:
+                seen.add(target)
+                queue.append(target)
+    return seen
+
+
+def _full(manager):
+    manager.collector.mark_pending = True
+    return manager.run_garbage_collection()
+
+
+def _old_heap(seed=0):
+    # A heap whose old regions are each left part garbage by a marking
+    manager = MemoryManager(400_000, seed=seed, collector='garbage_first')
+    _allocate(manager, 4000)
+    _full(manager)
+    assert manager.collector.candidates
+    return manager
+
+
+def _assert_remembered(manager):
+    # Every reference from an old object into another region that may be
+    # evacuated is in that region's remembered set
+    store = manager.store
+    allocator = manager.allocator
+    addresses = store.column('address')
+    for slot, source_id in enumerate(store.column('id').tolist()):
+        source = allocator.region_of(int(addresses[slot]))
+        if allocator.state[source] == REGION_YOUNG:
+            continue
+        for target_id in store.references(slot).tolist():
+            target = allocator.region_of(int(addresses[store.slot(target_id)]))
+            if target != source and allocator.state[target] != REGION_HUMONGOUS:
+                assert source_id in manager.collector.remembered[target]
+
+
+def test_mixed_collection_keeps_live_objects_and_their_references():
+    manager = _old_heap()
+    _allocate(manager, 1000)
+    expected = _reachable(manager)
+    result = manager.run_garbage_collection()
+    assert result.kind == 'mixed'
+    store = manager.store
+    assert expected <= set(store.column('id').tolist())
+    # Every reference still leads to a live object in a region in use
+    allocator = manager.allocator
+    for slot in range(store.count):
+        assert np.all(store.slots_of(store.references(slot)) >= 0)
+    regions = allocator.region_of(store.column('address'))
+    assert not np.any(allocator.state[regions] == REGION_FREE)
+    order = np.argsort(store.column('address'))
+    ends = (store.column('address') + store.column('size'))[order]
+    assert np.all(ends[:-1] <= store.column('address')[order][1:])
+    _assert_remembered(manager)
+
+
+def test_pause_target_bounds_the_old_regions_chosen():
+    manager = _old_heap()
+    collector = manager.collector
+    allocator = manager.allocator
+    candidates = list(collector.candidates)
+    # One nanosecond per live byte and nothing else, so the target is in bytes
+    collector.ns_per_byte, collector.ns_per_entry, collector.ns_overhead = 1.0, 0.0, 0.0
+    minimum = -(-collector.candidate_count // collector.mixed_count_target)
+    no_young = np.empty(0, dtype=np.int64)
+
+    collector.pause_target_ms = 0
+    assert len(collector._choose_old(manager, no_young)) == minimum
+
+    count = minimum + 3
+    collector.candidates = list(candidates)
+    collector.pause_target_ms = int(allocator.live[candidates[:count]].sum()) / 1e6
+    chosen = collector._choose_old(manager, no_young)
+    assert chosen.tolist() == candidates[:count]
+    assert np.all(allocator.state[chosen] == REGION_OLD)
+
+
+def test_remembered_sets_follow_removed_references():
+    manager = _old_heap()
+    store = manager.store
+    old_id = int(store.column('id')[np.flatnonzero(store.column('flags') & FLAG_ROOT)[0]])
+    kept, dropped = _allocate(manager, 2, roots=0, references=0).tolist()
+    manager.add_reference(old_id, kept)
+    manager.add_reference(old_id, dropped)
+    _assert_remembered(manager)
+    assert manager.remove_reference(old_id, dropped)
+    _assert_remembered(manager)
+
+    assert manager.run_garbage_collection().kind in ('minor', 'mixed')
+    # The young object is only reached through the remembered set
+    assert store.slot(kept) >= 0
+    assert store.slot(dropped) < 0
+    _assert_remembered(manager)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from gc_triggers import AllocationBudgetTrigger, OccupancyTrigger, PacerTrigger
+from memory_manager import MemoryManager
+
+
+def _allocate(manager, sizes, roots=False):
+    # Objects without references, rooted or garbage as asked
+    sizes = np.asarray(sizes)
+    return manager.allocate_with_references(sizes, np.zeros(len(sizes), dtype=np.int64), [],
+                                            np.full(len(sizes), roots))
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_allocation_collects_and_retries_before_failing(batch):
+    # A pacer without targets never asks for a collection before the heap
+    # is full
+    manager = MemoryManager(10_000, collector='mark_sweep', collect_stats=True,
+                            trigger=PacerTrigger(gogc=None, gc_fraction=None))
+    _allocate(manager, [1000] * 9)
+    _allocate(manager, [500], roots=True)
+    assert manager.stats.collections == 0
+
+    def allocate(size):
+        if batch:
+            return len(_allocate(manager, [size // 2, size - size // 2], roots=True)) == 2
+        return manager.allocate_object(size)
+
+    # Only fits once the garbage is collected
+    assert allocate(2000)
+    assert manager.stats.collections == 1
+    # Still does not fit after the collection it makes
+    assert not allocate(9600)
+    assert manager.stats.collections == 2
+
+    # Without a trigger nothing collects and the allocation fails
+    manager = MemoryManager(10_000, collector='mark_sweep', collect_stats=True)
+    _allocate(manager, [1000] * 9)
+    assert not allocate(2000)
+    assert manager.stats.collections == 0
+
+
+def test_occupancy_trigger_backs_off_above_a_large_live_set():
+    manager = MemoryManager(10_000, collector='mark_sweep', collect_stats=True,
+                            trigger=OccupancyTrigger(0.5))
+    _allocate(manager, [100] * 50)
+    assert manager.stats.collections == 0
+    _allocate(manager, [100])
+    assert manager.stats.collections == 1
+    assert manager.trigger.limit == 5000
+    # The 50th live object finds the limit reached again, and the collection
+    # leaves 4900 bytes live, so the next waits for half way to full
+    for _ in range(60):
+        _allocate(manager, [100], roots=True)
+    assert manager.stats.collections == 2
+    assert manager.last_collection.used_after == 4900
+    assert manager.trigger.limit == 7450
+
+
+def test_budget_trigger_collects_after_each_share():
+    manager = MemoryManager(10_000, collector='mark_sweep', collect_stats=True,
+                            trigger=AllocationBudgetTrigger(0.25))
+    for _ in range(100):
+        _allocate(manager, [100])
+    # 10000 bytes allocated in shares of 2500
+    assert manager.stats.collections == 3
+
+
+@pytest.mark.parametrize('collector', ['mark_sweep', 'lazy_sweep'])
+def test_pacer_goal_follows_the_live_heap(collector):
+    manager = MemoryManager(100_000, seed=1, collector=collector,
+                            trigger=PacerTrigger(gogc=100, gc_fraction=None, min_heap=0.1))
+    pacer = manager.trigger
+    rng = np.random.default_rng(3)
+    goals = set()
+    for _ in range(300):
+        _allocate(manager, rng.integers(10, 200, 10), roots=rng.random() < 0.3)
+        if rng.random() < 0.1:
+            for root in list(manager.root_objects)[::2]:
+                manager.remove_root(root)
+        result = manager.last_collection
+        if result is not None and result.objects_after:
+            live = result.used_before - result.bytes_freed
+            assert pacer.live == live
+            assert pacer.goal == int(min(max(2 * live, 10_000), 100_000))
+            goals.add(pacer.goal)
+    assert len(goals) > 3
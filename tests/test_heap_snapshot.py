@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from benchmark import WORKLOADS
+from heap_snapshot import COLUMNS, diff_snapshots, load_snapshot, save_snapshot
+from memory_manager import MemoryManager
+
+
+def _heap(collector):
+    manager = MemoryManager(200_000, seed=10, collector=collector)
+    WORKLOADS['churn'](seed=10).step(manager, 2000)
+    return manager
+
+
+@pytest.mark.parametrize('collector', ['mark_sweep', 'lazy_sweep', 'copying', 'generational',
+                                       'ref_counting'])
+def test_save_load_restore_round_trip(tmp_path, collector):
+    manager = _heap(collector)
+    # Garbage a lazy sweep has found but not swept yet, and a generational
+    # collection count under way
+    manager.run_garbage_collection()
+    WORKLOADS['churn'](seed=11).step(manager, 500)
+    path = str(tmp_path / 'heap')
+    save_snapshot(manager, path)
+    snapshot = load_snapshot(path)
+    assert snapshot.count == manager.store.count
+    for name in COLUMNS:
+        assert np.array_equal(snapshot.column(name), manager.store.column(name))
+    assert snapshot.roots.tolist() == list(manager.root_objects)
+
+    restored = snapshot.restore(seed=10)
+    store, original = restored.store, manager.store
+    assert restored.collector.name == collector
+    assert ((restored.used_memory, restored.next_id, restored.bytes_allocated)
+            == (manager.used_memory, manager.next_id, manager.bytes_allocated))
+    assert restored.collector.save_state() == manager.collector.save_state()
+    assert restored.collector.pending_bytes == manager.collector.pending_bytes
+    assert store.census() == original.census()
+    assert np.array_equal(store.page_bytes, original.page_bytes)
+    for slot in range(store.count):
+        assert np.array_equal(store.references(slot), original.references(slot))
+    # Both carry on identically, through a generational full collection
+    for _ in range(8):
+        assert (restored.run_garbage_collection().objects_freed
+                == manager.run_garbage_collection().objects_freed)
+        assert np.array_equal(np.sort(store.column('id')), np.sort(original.column('id')))
+        assert restored.used_memory == manager.used_memory
+
+
+def test_diff_snapshots(tmp_path):
+    manager = _heap('copying')
+    before, after = str(tmp_path / 'before'), str(tmp_path / 'after')
+    save_snapshot(manager, before)
+    ids_before = set(manager.store.column('id').tolist())
+    source = next(iter(manager.root_objects))
+    target = next(obj_id for obj_id in ids_before if obj_id not in manager.root_objects)
+    manager.add_reference(source, target)
+    manager.add_root(target)
+    manager.run_garbage_collection()
+    manager.allocate_object(10)
+    save_snapshot(manager, after)
+
+    diff = diff_snapshots(load_snapshot(before), load_snapshot(after))
+    ids_after = set(manager.store.column('id').tolist())
+    assert set(diff.freed.tolist()) == ids_before - ids_after
+    assert set(diff.allocated.tolist()) == ids_after - ids_before
+    assert diff.roots_added.tolist() == [target]
+    assert diff.edges_added >= 1
+    # The copying collector moved the survivors
+    assert len(diff.moved)
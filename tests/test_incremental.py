@@ -0,0 +1,37 @@
+import numpy as np
+
+from memory_manager import MemoryManager
+from object_store import FLAG_MARKED
+
+
+def _heap(count=2000):
+    manager = MemoryManager(100_000, seed=1, collector='incremental')
+    for _ in range(count):
+        manager.allocate_object(10)
+    return manager
+
+
+def test_blocking_collection_is_one_pause():
+    manager = _heap()
+    result = manager.run_garbage_collection()
+    assert len(result.pauses) == 1
+    assert result.objects_freed
+
+
+def test_finishing_a_collection_in_progress_adds_one_pause():
+    manager = _heap()
+    manager.start_collection()
+    manager.step(0)
+    steps = len(manager.collector.result.pauses)
+    result = manager.run_garbage_collection()
+    assert len(result.pauses) == steps + 1
+
+
+def test_marks_are_cleared_when_a_collection_finishes():
+    manager = _heap()
+    expected = _heap().run_garbage_collection().objects_freed
+    manager.start_collection()
+    while not manager.step(0):
+        pass
+    assert manager.last_collection.objects_freed == expected
+    assert not np.any(manager.store.column('flags') & FLAG_MARKED)
@@ -0,0 +1,65 @@
+import numpy as np
+
+from benchmark import run_benchmark
+from memory_manager import MemoryManager
+
+
+def _garbage_heap(room=0):
+    # 100 objects of 100 bytes, only the first a root; the third references
+    # the fourth
+    manager = MemoryManager(10_000 + room, seed=0, collector='lazy_sweep')
+    ref_counts = np.zeros(100, dtype=np.int64)
+    ref_counts[2] = 1
+    is_root = np.zeros(100, dtype=bool)
+    is_root[0] = True
+    ids = manager.allocate_with_references(np.full(100, 100), ref_counts, [manager.next_id + 3], is_root)
+    result = manager.run_garbage_collection()
+    assert result.objects_freed == 99
+    assert manager.store.count == 100
+    return manager, ids.tolist()
+
+
+def _allocate(manager, size):
+    # One object without references, which would revive garbage
+    return len(manager.allocate_with_references([size], [0], [], [False])) == 1
+
+
+def test_allocation_sweeps_before_it_fails():
+    manager, ids = _garbage_heap()
+    collector = manager.collector
+    collector.sweep_chunk_size = 1
+    assert manager.allocator.free_bytes == 0
+    # Two neighbouring dead objects make room, and sweeping stops there
+    assert _allocate(manager, 150)
+    assert collector.objects_swept == 2
+    assert manager.store.slot(ids[1]) < 0 and manager.store.slot(ids[3]) >= 0
+    assert collector.deferred_ns > 0
+    assert _allocate(manager, 9000)
+    assert collector.objects_swept < 99
+    # An allocation that does not fit fails once everything is swept
+    assert not _allocate(manager, 1000)
+    assert collector.objects_swept == 99
+
+
+def test_pointing_at_garbage_keeps_it():
+    manager, ids = _garbage_heap(room=100)
+    store = manager.store
+    manager.add_root(ids[5])
+    manager.add_reference(ids[0], ids[2])
+    # References from garbage do not make their targets live
+    manager.add_reference(ids[7], ids[8])
+    new_id = int(manager.allocate_with_references([50], [1], [ids[9]], [False])[0])
+    manager.collector.reclaim(manager, manager.total_memory + 1)
+    assert manager.collector.sweep_position == len(manager.collector.doomed)
+    alive = {obj_id for obj_id in ids + [new_id] if store.slot(obj_id) >= 0}
+    assert alive == {ids[0], ids[2], ids[3], ids[5], ids[9], new_id}
+    assert manager.used_memory == int(store.column('size').sum())
+    # The new object was not a root, so it and the object it revived die
+    # in the next collection
+    assert manager.run_garbage_collection().objects_freed == 2
+
+
+def test_deferred_sweeping_is_reported():
+    row = run_benchmark('churn', 20_000, 50_000, collector='lazy_sweep', trace_memory=False)
+    assert row['collections'] > 0
+    assert row['deferred_seconds'] > 0
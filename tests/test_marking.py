@@ -0,0 +1,57 @@
+from collections import deque
+
+import numpy as np
+
+from marking import breadth_first_order, mark_reachable, unique_in_order
+
+
+def test_unique_in_order_keeps_first_occurrences():
+    rng = np.random.default_rng(7)
+    scratch = np.empty(1000, dtype=np.int64)
+    for size in (0, 1, 10, 5000):
+        slots = rng.integers(0, 1000, size)
+        _, first = np.unique(slots, return_index=True)
+        assert unique_in_order(slots, scratch).tolist() == slots[np.sort(first)].tolist()
+
+
+def _chain(length):
+    # Slot i references id i + 1; ids equal slots, and the last slot ends it
+    counts = np.ones(length, dtype=np.int32)
+    counts[-1] = 0
+    return np.arange(length, dtype=np.int64), counts, np.arange(1, length + 1), np.arange(length + 1)
+
+
+def test_marks_a_deep_chain():
+    starts, counts, targets, slot_of_id = _chain(100_000)
+    marked = mark_reachable(starts, counts, targets, slot_of_id, np.array([0]), 100_000)
+    assert marked.all()
+    marked = mark_reachable(starts, counts, targets, slot_of_id, np.array([50_000]), 100_000)
+    assert marked.sum() == 50_000 and not marked[:50_000].any()
+
+
+def test_breadth_first_order_matches_a_queue():
+    rng = np.random.default_rng(11)
+    for _ in range(20):
+        # Wide and narrow frontiers alike, and references to freed objects
+        count = int(rng.integers(1, 3000))
+        counts = rng.integers(0, 4, count).astype(np.int32)
+        starts = (np.cumsum(counts) - counts).astype(np.int64)
+        targets = rng.integers(0, count + 50, int(counts.sum()))
+        slot_of_id = np.concatenate([np.arange(count), np.full(50, -1)])
+        roots = rng.integers(0, count, int(rng.integers(1, 200)))
+
+        seen = np.zeros(count, dtype=bool)
+        queue = deque()
+        for root in roots.tolist():
+            if not seen[root]:
+                seen[root] = True
+                queue.append(root)
+        expected = []
+        while queue:
+            slot = queue.popleft()
+            expected.append(slot)
+            for child in slot_of_id[targets[starts[slot]:starts[slot] + counts[slot]]].tolist():
+                if child >= 0 and not seen[child]:
+                    seen[child] = True
+                    queue.append(child)
+        assert breadth_first_order(starts, counts, targets, slot_of_id, roots, count).tolist() == expected
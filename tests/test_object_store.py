@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from memory_manager import MemoryManager
+from object_store import CENSUS_KEYS, FLAG_ROOT, STATES
+
+
+def _occupied(store):
+    return int(np.count_nonzero(store.page_bytes.any(axis=0)))
+
+
+@pytest.mark.parametrize('collector', ['mark_sweep', 'copying', 'mark_compact', 'incremental'])
+def test_occupied_pages_follow_the_page_table(collector):
+    manager = MemoryManager(200_000, seed=3, collector=collector)
+    store = manager.store
+    for _ in range(5):
+        for size in manager.rng.integers(1, 2000, 200).tolist():
+            manager.allocate_object(size)
+        assert store.occupied_pages == _occupied(store)
+        manager.run_garbage_collection()
+        assert store.occupied_pages == _occupied(store)
+        assert np.array_equal(store.page_used, store.page_bytes.sum(axis=0))
+    assert manager.census()['occupied_pages'] == store.copy().occupied_pages == _occupied(store)
+
+
+def test_evacuation_forgets_the_objects_left_behind():
+    manager = MemoryManager(200_000, seed=6, collector='copying')
+    store = manager.store
+    for size in manager.rng.integers(1, 500, 400).tolist():
+        manager.allocate_object(size)
+    before = store.column('id').copy()
+    manager.run_garbage_collection()
+    survivors = store.column('id')
+    gone = np.setdiff1d(before, survivors)
+    assert len(gone) and len(survivors)
+    assert all(store.slot(obj_id) < 0 for obj_id in gone.tolist())
+    assert np.all(store.slots_of(gone) < 0)
+    assert store.slots_of(survivors).tolist() == list(range(store.count))
+    with pytest.raises(KeyError):
+        manager.add_root(int(gone[0]))
+    flags = store.column('flags')
+    census = manager.census()
+    assert census['unreachable'] == 0
+    assert census['root'] == np.count_nonzero(flags & FLAG_ROOT)
+    assert census['root'] + census['reachable'] == store.count
+    assert census['root_bytes'] + census['reachable_bytes'] == int(store.column('size').sum())
+    assert store.size_class_counts.sum() == store.count
+    assert np.array_equal(store.page_used, store.page_bytes.sum(axis=0))
+    assert store.occupied_pages == _occupied(store)
+
+
+def _recount_pages(store):
+    # Bytes of each census key in every page, one object and page at a time
+    counted = np.zeros_like(store.page_bytes)
+    flags = store.column('flags') & CENSUS_KEYS
+    for address, size, key in zip(store.column('address').tolist(), store.column('size').tolist(),
+                                  flags.tolist()):
+        end = address + size
+        while address < end:
+            page = address // store.page_size
+            page_end = min((page + 1) * store.page_size, end)
+            counted[key, page] += page_end - address
+            address = page_end
+    return counted
+
+
+@pytest.mark.parametrize('collector', ['mark_sweep', 'lazy_sweep', 'copying', 'generational',
+                                       'garbage_first'])
+def test_page_table_matches_a_recount(collector):
+    manager = MemoryManager(300_000, seed=9, collector=collector)
+    store = manager.store
+    for _ in range(4):
+        for size in manager.rng.integers(1, 3000, 100).tolist():
+            manager.allocate_object(size)
+        assert np.array_equal(store.page_bytes, _recount_pages(store))
+        manager.run_garbage_collection()
+        assert np.array_equal(store.page_bytes, _recount_pages(store))
+    census = manager.census()
+    states = store.page_states()
+    for row, state in enumerate(STATES):
+        assert states[row].sum() == census[f'{state}_bytes']
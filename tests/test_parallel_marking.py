@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from benchmark import WORKLOADS
+from collectors import make_collector
+from marking import mark_reachable
+from memory_manager import MemoryManager
+from parallel_marking import ParallelMarker
+
+
+def _heap(collector='mark_sweep', workers=1):
+    manager = MemoryManager(2_000_000, seed=6, collector=collector, workers=workers)
+    WORKLOADS['tree'](seed=6).step(manager, 20_000)
+    return manager
+
+
+def _mark_arrays(manager):
+    store = manager.store
+    return (store.column('ref_start'), store.column('ref_count'), store.ref_buffer[:store.ref_used],
+            store.slot_of_id, store.slots_of(manager.root_objects), store.count)
+
+
+def test_parallel_mark_equals_serial_mark():
+    arrays = _mark_arrays(_heap())
+    with ParallelMarker(2) as marker:
+        # Send every level to the pool, however small
+        marker.min_parallel_edges = 0
+        assert np.array_equal(marker.mark(*arrays), mark_reachable(*arrays))
+        assert marker._pool is not None
+    assert marker._pool is None
+
+
+@pytest.mark.parametrize('collector', ['mark_sweep', 'lazy_sweep', 'mark_compact'])
+def test_manager_with_workers_collects_like_a_serial_one(collector):
+    serial = _heap(collector)
+    with _heap(collector, workers=2) as parallel:
+        parallel.collector.marker.min_parallel_edges = 0
+        assert parallel.run_garbage_collection().objects_freed == serial.run_garbage_collection().objects_freed
+        assert np.array_equal(parallel.store.column('id'), serial.store.column('id'))
+        marker = parallel.collector.marker
+        assert marker._pool is not None
+    assert marker._pool is None
+
+
+def test_workers_need_a_collector_that_marks_the_heap():
+    assert make_collector('mark_sweep', workers=2).marker.workers == 2
+    with pytest.raises(ValueError):
+        make_collector('copying', workers=2)
+
+
+def test_segment_is_kept_until_the_heap_outgrows_it():
+    manager = _heap()
+    with ParallelMarker(2) as marker:
+        marker.mark(*_mark_arrays(manager))
+        segment = marker._segment.name
+        marker.mark(*_mark_arrays(manager))
+        assert marker._segment.name == segment
+        WORKLOADS['tree'](seed=7).step(manager, 60_000)
+        assert np.array_equal(marker.mark(*_mark_arrays(manager)), mark_reachable(*_mark_arrays(manager)))
+        assert marker._segment.name != segment
+    assert marker._segment is None
+
+
+def test_narrow_levels_stay_out_of_the_pool():
+    length = 20_000
+    counts = np.ones(length, dtype=np.int32)
+    counts[-1] = 0
+    with ParallelMarker(2) as marker:
+        marker.min_parallel_edges = 0
+        marked = marker.mark(np.arange(length, dtype=np.int64), counts, np.arange(1, length + 1),
+                             np.arange(length + 1), np.array([0]), length)
+        assert marked.all()
+        assert marker._pool is None
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from benchmark import WORKLOADS
+from memory_manager import MemoryManager
+
+
+def test_trial_deletion_frees_a_garbage_cycle():
+    manager = MemoryManager(1000, seed=9, collector='ref_counting')
+    # Allocated without references, in the order kept, cycle, cycle, root
+    kept, first, second, root = manager.allocate_with_references(
+        [10] * 4, np.zeros(4, dtype=np.int64), np.empty(0, dtype=np.int64),
+        np.array([False, False, False, True])).tolist()
+    for source, target in [(first, second), (second, first), (second, kept),
+                           (root, first), (root, kept)]:
+        manager.add_reference(source, target)
+    manager.remove_reference(root, first)
+
+    result = manager.run_garbage_collection()
+    assert result.objects_freed == 2
+    assert sorted(manager.store.column('id').tolist()) == [kept, root]
+    # The cycle's reference to kept went away with it
+    assert manager.store.column('rc')[manager.store.slot(kept)] == 1
+    assert manager.used_memory == 20
+
+
+@pytest.mark.parametrize('workload', ['linked_list', 'tree', 'churn'])
+def test_reference_counting_frees_what_mark_sweep_frees(workload):
+    managers = [MemoryManager(1_000_000, seed=8, collector=collector)
+                for collector in ('mark_sweep', 'ref_counting')]
+    for manager in managers:
+        model = WORKLOADS[workload](seed=8)
+        for _ in range(10):
+            model.step(manager, 500)
+            obj_ids = manager.store.column('id')
+            manager.remove_root(int(obj_ids[len(obj_ids) // 2]))
+            # Closes cycles through the oldest object
+            manager.add_reference(int(obj_ids[-1]), int(obj_ids[0]))
+        manager.run_garbage_collection()
+    mark_sweep, ref_counting = (np.sort(manager.store.column('id')) for manager in managers)
+    assert np.array_equal(mark_sweep, ref_counting)
@@ -0,0 +1,35 @@
+import numpy as np
+
+from memory_manager import MemoryManager
+from visualization import MemoryVisualizer, index_of
+
+
+def test_index_of():
+    ids = np.array([7, 3, 9])
+    assert index_of(ids, np.array([9, 3, 4, 7])).tolist() == [2, 1, -1, 0]
+    assert index_of(ids[:0], np.array([1])).tolist() == [-1]
+
+
+def test_heap_view_shows_small_heaps_whole():
+    manager = MemoryManager(1000, seed=4)
+    for size in (100, 50, 200, 5):
+        manager.allocate_object(size)
+    store = manager.store
+    obj_ids = store.column('id').tolist()
+    view = MemoryVisualizer.heap_view(store, manager.total_memory)
+    graph = view['graph']
+    assert graph['ids'].tolist() == obj_ids
+    edges = sorted(zip(graph['ids'][graph['sources']].tolist(), graph['ids'][graph['targets']].tolist()))
+    assert edges == sorted((obj_id, target) for slot, obj_id in enumerate(obj_ids)
+                           for target in store.references(slot).tolist())
+    # Blocks too small to label on any map are left out
+    assert view['blocks']['ids'].tolist() == obj_ids[:3]
+
+
+def test_heap_view_clusters_large_heaps():
+    manager = MemoryManager(1 << 20, seed=4)
+    manager.allocate_many(np.full(5 * MemoryVisualizer.max_graph_nodes, 16))
+    graph = MemoryVisualizer.heap_view(manager.store, manager.total_memory)['graph']
+    census = manager.census()
+    assert graph['objects'].sum() == manager.store.count
+    assert graph['bytes'].sum() == census['root_bytes'] + census['reachable_bytes'] + census['unreachable_bytes']
@@ -6,8 +6,119 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.patches import Rectangle
 import matplotlib.colors as mcolors
+from matplotlib.collections import LineCollection
+from matplotlib.ticker import FuncFormatter
+from marking import gather_references
+from object_store import FLAG_ROOT, FLAG_YOUNG, STATES, object_states
+
+
+def format_size(size):
+    """Convert a size in bytes to human readable format"""
+    if size < 1024:
+        return f"{size} B"
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+
+
+def render_memory_map(state_bytes, page_size, total_memory, width, state_colors, free_color):
+    """One row of width RGBA pixels, each blending the state colors by how
+    much of its address range objects in that state occupy, read from the
+    page table's bytes per state and page"""
+    edges = np.linspace(0, total_memory, width + 1)
+    # Bytes of each state below every pixel edge, taking each page's bytes
+    # as spread evenly over the page
+    page_edges = np.minimum(np.arange(state_bytes.shape[1] + 1) * page_size, total_memory)
+    below = np.cumsum(state_bytes, axis=1)
+    shares = np.stack([np.diff(np.interp(edges, page_edges, np.concatenate([[0], row])))
+                       for row in below]) / np.diff(edges)
+    rgb = (1 - shares.sum(axis=0))[:, None] * free_color + shares.T @ state_colors
+    image = np.ones((1, width, 4))
+    image[0, :, :3] = np.clip(rgb, 0, 1)
+    return image
+
+
+# Points along every relationship curve, and how far the curve bows upwards
+CURVE_X = np.linspace(0, 1, 32)
+CURVE_BULGE = 0.1 * np.sin(CURVE_X * np.pi)
+
+
+def relationship_curves(y_from, y_to):
+    """Segments for a LineCollection of curves from (0, y_from) to (1, y_to)"""
+    segments = np.empty((len(y_from), len(CURVE_X), 2))
+    segments[:, :, 0] = CURVE_X
+    segments[:, :, 1] = y_from[:, None] + (y_to - y_from)[:, None] * CURVE_X + CURVE_BULGE
+    return segments
+
+
+def index_of(ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Position of each of values in ids, -1 where it is missing"""
+    if not len(ids):
+        return np.full(len(values), -1, dtype=np.int64)
+    order = np.argsort(ids)
+    found = order[np.searchsorted(ids[order], values).clip(max=len(ids) - 1)]
+    return np.where(ids[found] == values, found, -1)
+
+
+class GraphLayout:
+    """Vertical order of the relationship graph: roots first, then every other
+    object, each group in the order its objects were first shown.
+
+    An update keeps the order of the objects already placed and only places
+    objects that are new or became or stopped being roots.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Ids from the bottom of the graph up, and whether each was a root
+        # when placed
+        self.order = np.empty(0, dtype=np.int64)
+        self.roots = np.empty(0, dtype=bool)
+        self.spacing = 1.0
+
+    def update(self, ids: np.ndarray, is_root: np.ndarray) -> bool:
+        """Bring the order up to date with the objects shown, returning
+        whether it changed"""
+        slots = index_of(ids, self.order)
+        keep = slots >= 0
+        keep[keep] = is_root[slots[keep]] == self.roots[keep]
+        if keep.all() and len(self.order) == len(ids):
+            return False
+        placed = np.zeros(len(ids), dtype=bool)
+        placed[slots[keep]] = True
+        new = np.flatnonzero(~placed)
+        kept, kept_roots = self.order[keep], self.roots[keep]
+        new_roots = is_root[new]
+        self.order = np.concatenate([kept[kept_roots], ids[new[new_roots]],
+                                     kept[~kept_roots], ids[new[~new_roots]]])
+        self.roots = np.arange(len(self.order)) < kept_roots.sum() + new_roots.sum()
+        self.spacing = 1.0 / (len(ids) + 1)
+        return True
+
+    def positions(self, ids: np.ndarray) -> np.ndarray:
+        """y of every object shown"""
+        return index_of(self.order, ids) * self.spacing
+
 
 class MemoryVisualizer(QWidget):
+    # Blocks narrower than this many pixels on the memory map get no label
+    label_min_pixels = 70
+    # Nodes closer together than this many pixels on the relationship graph
+    # get no label
+    node_label_min_pixels = 20
+    # Above this many objects the relationship graph shows clusters of
+    # objects instead of single objects
+    max_graph_nodes = 500
+    # Clusters are linked by the references of at most this many objects,
+    # spread evenly over the store, so drawing them costs the same at any
+    # heap size
+    cluster_edge_sample = 20_000
+    # Widest memory map, in pixels, whose labels heap_view keeps the blocks for
+    max_map_pixels = 8192
+
     def __init__(self):
         super().__init__()
         self.figure = Figure(figsize=(10, 8), facecolor='#2b2b2b')
@@ -63,82 +174,77 @@ class MemoryVisualizer(QWidget):
             'node_border': '#ff1493', # Deep Pink for node borders
             'text_bg': '#3b3b3b'     # Background for text
         }
+        self.build_figure()
 
-    def format_size(self, size_mb):
-        """Convert size in MB to human readable format"""
-        if size_mb >= 1024:
-            return f"{size_mb/1024:.1f} GB"
-        return f"{size_mb} MB"
+    @classmethod
+    def heap_view(cls, store, total_memory: int) -> dict:
+        """What the visualizer draws of the objects in store: the 'graph',
+        either every object and reference or clusters of them, and the
+        'blocks' big enough to label on the map. It is copied, so it stays
+        valid while the heap changes, and its size is bounded whatever the
+        heap's."""
+        flags = store.column('flags')
+        sizes = store.column('size')
+        if store.count <= cls.max_graph_nodes:
+            sources, targets = cls.references(store, np.arange(store.count))
+            graph = {'ids': store.column('id').copy(), 'sizes': sizes.copy(), 'flags': flags.copy(),
+                     'sources': sources, 'targets': targets}
+        else:
+            # One cluster per state and generation, linked by the references
+            # of a sample of the objects scaled up to the whole heap
+            keys = object_states(flags) * 2 + ((flags & FLAG_YOUNG) != 0)
+            clusters = 2 * len(STATES)
+            stride = -(-store.count // cls.cluster_edge_sample)
+            sources, targets = cls.references(store, np.arange(0, store.count, stride))
+            graph = {
+                'objects': np.bincount(keys, minlength=clusters),
+                'bytes': np.bincount(keys, weights=sizes, minlength=clusters).astype(np.int64),
+                'pairs': stride * np.bincount(keys[sources] * clusters + keys[targets],
+                                              minlength=clusters ** 2),
+                'generational': bool((flags & FLAG_YOUNG).any()),
+            }
+        # No map is wide enough to label smaller blocks, and at most
+        # max_map_pixels / label_min_pixels blocks are this big
+        wide = np.flatnonzero(sizes >= total_memory * cls.label_min_pixels / cls.max_map_pixels)
+        blocks = {name: store.column(column)[wide] for name, column in
+                  (('ids', 'id'), ('addresses', 'address'), ('sizes', 'size'), ('refs', 'ref_count'))}
+        return {'graph': graph, 'blocks': blocks}
 
-    def update_visualization(self, memory_state):
-        self.figure.clear()
-        
-        # Create subplots with adjusted height ratios
+    @staticmethod
+    def references(store, slots):
+        """Source and target slots of the references held by slots"""
+        counts = store.column('ref_count')[slots].astype(np.int64)
+        sources = np.repeat(slots, counts)
+        targets = store.slot_of_id[gather_references(store.column('ref_start'), store.column('ref_count'),
+                                                     store.ref_buffer, slots)]
+        return sources[targets >= 0], targets[targets >= 0]
+
+    def format_size(self, size):
+        return format_size(size)
+
+    def build_figure(self):
+        """Create the axes and every artist once; updates only change their data"""
         gs = self.figure.add_gridspec(2, 1, height_ratios=[1.5, 1])
-        ax1 = self.figure.add_subplot(gs[0])  # Memory map
-        ax2 = self.figure.add_subplot(gs[1])  # Object relationships
-        
+        self.map_ax = self.figure.add_subplot(gs[0])  # Memory map
+        self.graph_ax = self.figure.add_subplot(gs[1])  # Object relationships
+
         # Set background color for subplots
-        for ax in [ax1, ax2]:
+        for ax in [self.map_ax, self.graph_ax]:
             ax.set_facecolor(self.colors['background'])
             ax.grid(True, color=self.colors['grid'], alpha=0.2)
-        
-        # Get memory state
-        total_memory = memory_state['total_memory']
-        used_memory = memory_state['used_memory']
-        objects = memory_state['objects']
-        root_objects = memory_state['root_objects']
-        
-        # Calculate statistics
-        object_count = len(objects)
-        fragmentation = self.calculate_fragmentation(memory_state)
-        
-        # Update info panel with formatted sizes
-        self.memory_usage_label.setText(f"Memory Usage: {self.format_size(used_memory)} / {self.format_size(total_memory)} ({used_memory/total_memory*100:.1f}%)")
-        self.object_count_label.setText(f"Objects: {object_count}")
-        self.fragmentation_label.setText(f"Fragmentation: {fragmentation:.1f}%")
-        
-        # Create memory map visualization
-        memory_map = np.zeros(total_memory)
-        current_pos = 0
-        
-        # Plot memory blocks
-        for obj_id, obj in objects.items():
-            color = self.colors['root'] if obj_id in root_objects else self.colors['reachable']
-            if not obj.is_reachable:
-                color = self.colors['unreachable']
-            
-            # Fill memory map
-            memory_map[current_pos:current_pos + obj.size] = obj_id
-            current_pos += obj.size
-            
-            # Plot object block with gradient
-            gradient = np.linspace(0, 1, 256).reshape(1, -1)
-            gradient = np.vstack((gradient, gradient))
-            ax1.imshow(gradient, aspect='auto', extent=[current_pos - obj.size, current_pos, 0, 1],
-                      cmap=plt.cm.colors.LinearSegmentedColormap.from_list('custom', [color, mcolors.to_rgba(color, 0.7)]))
-            
-            # Add object details with formatted size
-            details = f'Obj {obj_id}\nSize: {self.format_size(obj.size)}\nRefs: {len(obj.references)}'
-            ax1.text(current_pos - obj.size/2, 0.5, details, 
-                    ha='center', va='center', color=self.colors['text'],
-                    fontsize=8, bbox=dict(facecolor=self.colors['text_bg'], alpha=0.8, edgecolor='none'))
-        
-        # Plot free memory
-        if current_pos < total_memory:
-            ax1.barh(0, total_memory - current_pos, left=current_pos, 
-                    color=self.colors['free'], alpha=0.3)
-        
-        # Plot object relationships
-        self.plot_relationships(ax2, objects, root_objects)
-        
-        # Set plot properties
-        ax1.set_title('Memory Map Visualization', pad=20, color=self.colors['text'])
-        ax1.set_xlabel('Memory Address', color=self.colors['text'])
-        ax1.set_ylim(-1, 1)
-        ax1.set_xlim(0, total_memory)
-        ax1.set_yticks([])
-        
+
+        # Animated artists are left out of ordinary draws and drawn over the
+        # cached background by blit
+        self.map_image = self.map_ax.imshow(np.zeros((1, 1, 4)), aspect='auto', extent=[0, 1, 0, 1],
+                                            interpolation='nearest', animated=True)
+        self.map_labels = []
+        self.map_ax.set_title('Memory Map Visualization', pad=20, color=self.colors['text'])
+        self.map_ax.set_xlabel('Memory Address', color=self.colors['text'])
+        self.map_ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: format_size(int(x))))
+        self.map_ax.set_ylim(-1, 1)
+        self.map_ax.set_yticks([])
+        self.map_ax.set_autoscale_on(False)
+
         # Add legend
         legend_elements = [
             Rectangle((0, 0), 1, 1, facecolor=self.colors['root'], label='Root Objects'),
@@ -146,87 +252,238 @@ class MemoryVisualizer(QWidget):
             Rectangle((0, 0), 1, 1, facecolor=self.colors['unreachable'], label='Unreachable Objects'),
             Rectangle((0, 0), 1, 1, facecolor=self.colors['free'], label='Free Memory')
         ]
-        ax1.legend(handles=legend_elements, loc='upper right', bbox_to_anchor=(1, 1.15),
-                  facecolor=self.colors['text_bg'], edgecolor='none', labelcolor=self.colors['text'])
-        
+        self.map_ax.legend(handles=legend_elements, loc='upper right', bbox_to_anchor=(1, 1.15),
+                           facecolor=self.colors['text_bg'], edgecolor='none', labelcolor=self.colors['text'])
+
+        self.edges = LineCollection([], colors=self.colors['relationship'], alpha=0.3,
+                                    linewidths=1, animated=True)
+        self.graph_ax.add_collection(self.edges)
+        self.nodes = self.graph_ax.scatter([], [], s=12 ** 2, edgecolors=self.colors['node_border'],
+                                           linewidths=2, zorder=3, animated=True)
+        self.node_labels = []
+        self.graph_layout = GraphLayout()
+        # Source and target ids of the edges drawn, None when clusters are shown
+        self.edge_ids = None
+        self.graph_ax.set_title('Object Relationships', pad=20, color=self.colors['text'])
+        # Nodes are spread over [0, 1) whatever their count, so the limits
+        # never change
+        self.graph_ax.set_xlim(-0.2, 1.2)  # Increased x-axis range for better text placement
+        self.graph_ax.set_ylim(-0.1, 1.1)
+        self.graph_ax.set_xticks([])
+        self.graph_ax.set_yticks([])
+        self.graph_ax.grid(False)
+        self.graph_ax.set_autoscale_on(False)
+
         # Adjust layout
         self.figure.tight_layout()
-        self.canvas.draw()
+        self.total_memory = None
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self.on_draw)
 
-    def plot_relationships(self, ax, objects, root_objects):
-        # Create a simple graph visualization of object relationships
-        y_positions = {}
-        current_y = 0
-        
-        # Calculate total number of objects for spacing
-        total_objects = len(objects)
-        if total_objects == 0:
-            return
-            
-        # Calculate spacing between objects
-        spacing = 1.0 / (total_objects + 1)
-        
-        # Position objects vertically with even spacing
-        for obj_id in root_objects:
-            y_positions[obj_id] = current_y
-            current_y += spacing
-        
-        # Position other objects
-        for obj_id, obj in objects.items():
-            if obj_id not in y_positions:
-                y_positions[obj_id] = current_y
-                current_y += spacing
-        
-        # Plot objects and relationships
-        for obj_id, obj in objects.items():
-            # Plot object node with enhanced styling
-            color = self.colors['root'] if obj_id in root_objects else self.colors['reachable']
-            if not obj.is_reachable:
-                color = self.colors['unreachable']
-            
-            # Draw node with border
-            ax.plot(0, y_positions[obj_id], 'o', color=color, markersize=12,
-                   markeredgecolor=self.colors['node_border'], markeredgewidth=2)
-            
-            # Add object details with better formatting
-            details = f'Obj {obj_id}\n{self.format_size(obj.size)}'
-            ax.text(0.1, y_positions[obj_id], details, 
-                   ha='left', va='center', color=self.colors['text'],
-                   fontsize=8, bbox=dict(facecolor=self.colors['text_bg'], 
-                                       alpha=0.8, edgecolor='none',
-                                       pad=2))
-            
-            # Plot relationships with curved lines
-            for ref_id in obj.references:
-                if ref_id in y_positions:
-                    # Create curved line
-                    x = np.linspace(0, 1, 100)
-                    y = np.interp(x, [0, 1], [y_positions[obj_id], y_positions[ref_id]])
-                    # Add some curve to the line
-                    y += 0.1 * np.sin(x * np.pi)
-                    ax.plot(x, y, color=self.colors['relationship'], alpha=0.3, linewidth=1)
-        
-        # Set plot properties
-        ax.set_title('Object Relationships', pad=20, color=self.colors['text'])
-        ax.set_xlim(-0.2, 1.2)  # Increased x-axis range for better text placement
-        ax.set_ylim(-spacing, 1 + spacing)
-        ax.set_xticks([])
-        ax.set_yticks([])
-        ax.grid(False)
-
-    def calculate_fragmentation(self, memory_state):
+    def animated_artists(self):
+        return [self.map_image, self.edges, self.nodes, *self.map_labels, *self.node_labels]
+
+    def on_draw(self, event):
+        # Every full draw (the first, a resize, a new heap size) refreshes the
+        # background later updates are blitted over
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        for artist in self.animated_artists():
+            if artist.get_visible():
+                artist.axes.draw_artist(artist)
+
+    def update_visualization(self, memory_state):
+        # Get memory state
         total_memory = memory_state['total_memory']
         used_memory = memory_state['used_memory']
-        objects = memory_state['objects']
-        
-        if not objects:
-            return 0.0
-            
-        # Calculate total free memory
-        free_memory = total_memory - used_memory
-        
-        # Calculate fragmentation as percentage of free memory
-        if free_memory == 0:
-            return 0.0
-            
-        return (free_memory / total_memory) * 100 
\ No newline at end of file
+        census = memory_state['census']
+
+        # External fragmentation as the manager measures it, from the
+        # allocator's free space
+        fragmentation = memory_state['fragmentation']
+
+        # Update info panel with formatted sizes
+        self.memory_usage_label.setText(f"Memory Usage: {self.format_size(used_memory)} / {self.format_size(total_memory)} ({used_memory/total_memory*100:.1f}%)")
+        self.object_count_label.setText(f"Objects: {census['objects']} ({census['unreachable']} unreachable)")
+        self.fragmentation_label.setText(f"Fragmentation: {fragmentation:.1f}%")
+
+        # The address axis is the only static part that depends on the state
+        redraw = self.background is None or total_memory != self.total_memory
+        if total_memory != self.total_memory:
+            self.total_memory = total_memory
+            self.map_ax.set_xlim(0, total_memory)
+
+        self.draw_memory_map(memory_state)
+        self.plot_relationships(memory_state)
+
+        if redraw:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_animated()
+            self.canvas.blit(self.map_ax.bbox)
+            self.canvas.blit(self.graph_ax.bbox)
+
+    def show_labels(self, ax, labels, placements, **style):
+        """Reuse the text artists in labels for (x, y, text) placements,
+        creating more only when there are more placements than ever before"""
+        while len(labels) < len(placements):
+            labels.append(ax.text(0, 0, '', color=self.colors['text'], fontsize=8,
+                                  animated=True, **style))
+        for label, (x, y, text) in zip(labels, placements):
+            label.set_position((x, y))
+            label.set_text(text)
+            label.set_visible(True)
+        for label in labels[len(placements):]:
+            label.set_visible(False)
+
+    def draw_memory_map(self, memory_state):
+        # The map is a single image at the axes' pixel width drawn from the
+        # page table, which has a bounded number of pages, so its cost
+        # follows the screen size, not the heap size or the object count
+        blocks = memory_state['blocks']
+        pages = memory_state['pages']
+        total_memory = memory_state['total_memory']
+        addresses = blocks['addresses']
+        sizes = blocks['sizes']
+        width = int(min(total_memory, max(1, self.map_ax.get_window_extent().width)))
+        state_colors = np.array([mcolors.to_rgb(self.colors[state]) for state in STATES])
+        # Free memory is drawn as the free color at 30% over the background
+        free_color = (0.3 * np.array(mcolors.to_rgb(self.colors['free']))
+                      + 0.7 * np.array(mcolors.to_rgb(self.colors['background'])))
+        image = render_memory_map(pages['state_bytes'], pages['page_size'], total_memory, width,
+                                  state_colors, free_color)
+        self.map_image.set_data(image)
+        self.map_image.set_extent([0, total_memory, 0, 1])
+
+        # Label only the blocks wide enough to read
+        wide = np.flatnonzero(sizes * (width / total_memory) >= self.label_min_pixels)
+        placements = [(address + size / 2, 0.5, f'Obj {obj_id}\nSize: {self.format_size(size)}\nRefs: {refs}')
+                      for obj_id, address, size, refs in zip(blocks['ids'][wide].tolist(),
+                                                             addresses[wide].tolist(), sizes[wide].tolist(),
+                                                             blocks['refs'][wide].tolist())]
+        self.show_labels(self.map_ax, self.map_labels, placements, ha='center', va='center',
+                         bbox=dict(facecolor=self.colors['text_bg'], alpha=0.8, edgecolor='none'))
+
+    def plot_relationships(self, memory_state):
+        graph = memory_state['graph']
+        if 'objects' in graph:
+            self.plot_clusters(graph)
+            return
+
+        ids, sizes, flags = graph['ids'], graph['sizes'], graph['flags']
+        sources, targets = graph['sources'], graph['targets']
+        states = object_states(flags)
+        layout_changed = self.graph_layout.update(ids, (flags & FLAG_ROOT) != 0)
+        y = self.graph_layout.positions(ids)
+        # Edges keep their geometry until the layout or the references change
+        edge_ids = ids[np.concatenate([sources, targets])]
+        if (layout_changed or self.edge_ids is None or not np.array_equal(edge_ids, self.edge_ids)):
+            self.edge_ids = edge_ids
+            self.edges.set_segments(relationship_curves(y[sources], y[targets]))
+            self.edges.set_linewidths(1)
+        state_colors = [self.colors[state] for state in STATES]
+        self.nodes.set_offsets(np.column_stack([np.zeros(len(ids)), y]))
+        self.nodes.set_facecolor([state_colors[state] for state in states.tolist()])
+        self.nodes.set_sizes([12 ** 2])
+
+        placements = []
+        if self.graph_layout.spacing * self.graph_pixels_per_unit() >= self.node_label_min_pixels:
+            placements = [(0.1, node_y, f'Obj {obj_id}\n{self.format_size(size)}')
+                          for obj_id, node_y, size in zip(ids.tolist(), y.tolist(), sizes.tolist())]
+        self.show_labels(self.graph_ax, self.node_labels, placements, ha='left', va='center',
+                         bbox=dict(facecolor=self.colors['text_bg'], alpha=0.8, edgecolor='none', pad=2))
+
+    def plot_clusters(self, graph):
+        """Draw one node per state and generation, sized by its object count,
+        with one edge per pair of clusters weighted by the references between
+        them, as heap_view estimated them"""
+        objects, pairs = graph['objects'], graph['pairs']
+        present = np.flatnonzero(objects)
+        # Rank of each present cluster from the top
+        rank = np.zeros(len(objects), dtype=np.int64)
+        rank[present] = np.arange(len(present))
+        spacing = 1.0 / len(present)
+        y = 1 - spacing / 2 - rank * spacing
+
+        linked = np.flatnonzero(pairs)
+        self.edges.set_segments(relationship_curves(y[linked // len(objects)], y[linked % len(objects)]))
+        self.edges.set_linewidths(1 + np.log10(pairs[linked]))
+        self.edge_ids = None
+        self.graph_layout.reset()
+
+        state_colors = [self.colors[state] for state in STATES]
+        self.nodes.set_offsets(np.column_stack([np.zeros(len(present)), y[present]]))
+        self.nodes.set_facecolor([state_colors[key // 2] for key in present.tolist()])
+        self.nodes.set_sizes(12 ** 2 * (1 + np.log10(objects[present])))
+
+        placements = []
+        for key in present.tolist():
+            name = STATES[key // 2] + ((' young' if key % 2 else ' old') if graph['generational'] else '')
+            placements.append((0.1, y[key], f'{objects[key]} {name}\n{self.format_size(int(graph["bytes"][key]))}'))
+        self.show_labels(self.graph_ax, self.node_labels, placements, ha='left', va='center',
+                         bbox=dict(facecolor=self.colors['text_bg'], alpha=0.8, edgecolor='none', pad=2))
+
+    def graph_pixels_per_unit(self):
+        ylim = self.graph_ax.get_ylim()
+        return self.graph_ax.get_window_extent().height / (ylim[1] - ylim[0])
+
+
+class ComparisonPanel(QWidget):
+    """Time series of a strategy comparison, one line per configuration on
+    each of occupancy, external and internal fragmentation and pause times"""
+
+    def __init__(self):
+        super().__init__()
+        # Constrained layout keeps the labels and the legend beside the
+        # plots in view at any size
+        self.figure = Figure(figsize=(10, 10), facecolor='#2b2b2b', layout='constrained')
+        self.canvas = FigureCanvas(self.figure)
+        layout = QVBoxLayout()
+        layout.addWidget(self.canvas)
+        self.setLayout(layout)
+
+        self.axes = self.figure.subplots(4, 1, sharex=True)
+        self.occupancy_ax, self.fragmentation_ax, self.internal_ax, self.pause_ax = self.axes
+        for ax, label in zip(self.axes, ('Used %', 'Frag. %', 'Int. frag. %', 'Pause ms')):
+            ax.set_facecolor('#2b2b2b')
+            ax.grid(True, color='#404040', alpha=0.2)
+            ax.set_ylabel(label, color='#ffffff')
+        self.occupancy_ax.set_title('Strategy Comparison', color='#ffffff')
+        self.pause_ax.set_xlabel('Workload progress', color='#ffffff')
+        self.legend = None
+
+    def show_results(self, results, progress_label: str):
+        """Plot the results of comparison.compare; configurations that could
+        not run are left out"""
+        for ax in self.axes:
+            for line in list(ax.lines):
+                line.remove()
+        # Each comparison starts from the first color again
+        self.occupancy_ax.set_prop_cycle(None)
+        for result in results:
+            if result.error is not None:
+                continue
+            line, = self.occupancy_ax.plot(result.progress, result.occupancy,
+                                           label=result.configuration.label)
+            color = line.get_color()
+            self.fragmentation_ax.plot(result.progress, result.fragmentation, color=color)
+            self.internal_ax.plot(result.progress, result.internal_fragmentation, color=color)
+            # Only samples in which a collection paused the program
+            paused = result.pause_ms > 0
+            self.pause_ax.plot(result.progress[paused], result.pause_ms[paused], 'o',
+                               markersize=3, color=color)
+        self.pause_ax.set_xlabel(progress_label, color='#ffffff')
+        if self.legend is not None:
+            self.legend.remove()
+            self.legend = None
+        if self.occupancy_ax.lines:
+            self.legend = self.figure.legend(handles=self.occupancy_ax.lines, loc='outside right upper',
+                                             fontsize=8, facecolor='#3b3b3b', edgecolor='none',
+                                             labelcolor='#ffffff')
+        for ax in self.axes:
+            ax.relim()
+            ax.autoscale_view()
+        self.canvas.draw_idle()